@@ -1 +1,12 @@
 from .modest_image import ModestImage, imshow
+from .pyramid import ImagePyramid
+from .tiles import LRUCache
+from .downsample import block_reduce
+from .diskcache import OverviewStore
+from .colormap import Colormapper
+from .stats import DrawStats, ImageStats, log_stats
+from .prefetch import Prefetcher
+from .source import DataSource
+from .bands import BandStack
+from .planner import SlicePlanner, install_planner
+from .blit import ImageBlitter
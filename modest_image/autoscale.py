@@ -0,0 +1,155 @@
+"""
+Fast estimation of color limits for large arrays.
+
+Computing the exact minimum and maximum of a multi-GB memmap means reading
+all of it. The functions here instead estimate the limits from a sample of
+the array, or compute them in a single streaming pass with bounded memory,
+optionally clipping to percentiles of the data.
+"""
+from __future__ import print_function, division
+
+import numpy as np
+
+from .chunked import BAND_BYTES, bands, chunk_rows, map_bands, read_strided
+from .lazy import is_lazy, compute
+
+AUTOSCALE_MODES = ('full', 'sample', 'blocks', 'stream')
+
+# Approximate number of pixels used to estimate limits (and percentiles)
+SAMPLE_SIZE = 2 ** 20
+
+# Size of the blocks read in 'blocks' mode
+BLOCK_SIZE = 64
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def check_autoscale(mode):
+    """Raise a ValueError if ``mode`` is not a valid autoscale mode"""
+    if mode not in AUTOSCALE_MODES:
+        raise ValueError("autoscale must be one of %s" %
+                         ', '.join(repr(m) for m in AUTOSCALE_MODES))
+
+
+def _finite(values):
+    values = np.asarray(values).ravel()
+    if values.dtype.kind == 'f':
+        values = values[np.isfinite(values)]
+    return values
+
+
+def _limits(values, percentile=None):
+    values = _finite(values)
+    if values.size == 0:
+        return None, None
+    if percentile is None:
+        return values.min(), values.max()
+    lo, hi = np.percentile(values, percentile)
+    return lo, hi
+
+
+def strided_sample(data, nsamples=SAMPLE_SIZE):
+    """A sample of about ``nsamples`` pixels on a regular grid"""
+    ny, nx = data.shape[:2]
+    step = max(1, int(np.ceil(np.sqrt(ny * nx / nsamples))))
+    return read_strided(data, 0, nx, step, 0, ny, step)
+
+
+def block_sample(data, nsamples=SAMPLE_SIZE, block_size=BLOCK_SIZE, seed=0):
+    """
+    A sample of about ``nsamples`` pixels, made of contiguous blocks at
+    (reproducible) random positions. Reading a few contiguous blocks is
+    much cheaper than a regular grid for arrays stored in chunks.
+    """
+    ny, nx = data.shape[:2]
+    by, bx = min(block_size, ny), min(block_size, nx)
+    nblocks = max(1, _ceil_div(nsamples, by * bx))
+    if nblocks * by * bx >= ny * nx:
+        return np.asarray(data[:])
+    random = np.random.RandomState(seed)
+    ys = random.randint(0, ny - by + 1, nblocks)
+    xs = random.randint(0, nx - bx + 1, nblocks)
+    blocks = [data[y:y + by, x:x + bx] for y, x in zip(ys, xs)]
+    if is_lazy(data):
+        # compute all the blocks in one go
+        blocks = compute(*blocks)
+        if nblocks == 1:
+            blocks = [blocks]
+    return np.concatenate([np.asarray(b).ravel() for b in blocks])
+
+
+def stream_limits(data, percentile=None, nsamples=SAMPLE_SIZE):
+    """
+    Exact limits of ``data`` (or, if ``percentile`` is given, estimated
+    percentiles) computed in one pass over bands of rows, so that memory use
+    stays bounded. Percentiles are estimated from a strided subsample of
+    each band, collected during the same pass.
+    """
+    ny, nx = data.shape[:2]
+    step = max(1, int(np.ceil(np.sqrt(ny * nx / nsamples))))
+    row_bytes = max(1, np.dtype(data.dtype).itemsize * nx)
+    band_list = bands(0, ny, 1, chunk_rows(data),
+                      max_rows=max(1, BAND_BYTES // row_bytes))
+    results = {}
+
+    def scan(lo, hi):
+        band = np.asarray(data[lo:hi])
+        finite = _finite(band)
+        if finite.size == 0:
+            results[lo] = None
+            return
+        sample = None
+        if percentile is not None:
+            # keep rows which fall on the global sampling grid
+            first = -lo % step
+            sample = _finite(band[first::step, ::step])
+        results[lo] = finite.min(), finite.max(), sample
+
+    map_bands(scan, band_list)
+
+    found = [r for r in results.values() if r is not None]
+    if not found:
+        return None, None
+    vmin = min(r[0] for r in found)
+    vmax = max(r[1] for r in found)
+    if percentile is None:
+        return vmin, vmax
+
+    sample = np.concatenate([r[2] for r in found])
+    if sample.size == 0:
+        return vmin, vmax
+    lo, hi = np.percentile(sample, percentile)
+    return max(lo, vmin), min(hi, vmax)
+
+
+def autoscale_limits(data, mode='sample', percentile=None):
+    """
+    Estimate color limits for an array.
+
+    :param mode: 'full' computes exact limits from the whole array at once,
+                 'sample' from a regular grid of about ``SAMPLE_SIZE``
+                 pixels, 'blocks' from random blocks of pixels, and 'stream'
+                 exactly, in one pass with bounded memory.
+
+    :param percentile: Optional (lo, hi) percentiles, e.g. (1, 99), to clip
+                 the limits to instead of the minimum and maximum.
+
+    Lazy (dask) arrays are never computed in full: 'full' estimates their
+    limits from random blocks, as 'blocks' does.
+
+    :rtype: tuple of vmin, vmax (None if there are no finite values)
+    """
+    check_autoscale(mode)
+    if mode == 'full' and is_lazy(data):
+        mode = 'blocks'
+    if mode == 'stream':
+        return stream_limits(data, percentile)
+    if mode == 'sample':
+        values = strided_sample(data)
+    elif mode == 'blocks':
+        values = block_sample(data)
+    else:
+        values = data
+    return _limits(values, percentile)
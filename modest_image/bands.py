@@ -0,0 +1,216 @@
+"""
+Color composites of separate band arrays.
+
+False-color images are often made from bands stored separately (e.g. one
+memory-mapped file per filter). Stacking them into a single RGB array first
+would read every band in full, and need as much memory as all of them
+together. A BandStack instead behaves like a read-only ``(ny, nx, nbands)``
+array whose slices are read from each band on demand, so that ModestImage
+only ever reads the screen-matched window of every band. The windows are
+then stretched and composed to uint8 RGBA in one vectorized pass.
+"""
+from __future__ import print_function, division
+
+import numpy as np
+
+from .autoscale import autoscale_limits
+
+# Parameters of the non-linear stretches, as in astropy.visualization
+LOG_A = 1000.
+ASINH_A = 0.1
+
+
+def _linear(x):
+    return x
+
+
+def _sqrt(x):
+    return np.sqrt(x, out=x)
+
+
+def _log(x):
+    x *= LOG_A
+    x += 1
+    np.log(x, out=x)
+    x /= np.log(LOG_A + 1)
+    return x
+
+
+def _asinh(x):
+    x /= ASINH_A
+    np.arcsinh(x, out=x)
+    x /= np.arcsinh(1 / ASINH_A)
+    return x
+
+
+# Stretches map values normalized to [0, 1] (in place) to [0, 1]
+STRETCHES = dict(linear=_linear, sqrt=_sqrt, log=_log, asinh=_asinh)
+
+
+def check_stretch(stretch):
+    """Raise a ValueError if ``stretch`` is not a valid stretch"""
+    if stretch not in STRETCHES:
+        raise ValueError("stretch must be one of %s" %
+                         ', '.join(sorted(STRETCHES)))
+
+
+def _per_band(value, nbands, name):
+    """Expand a value given once for all bands to a list of one per band"""
+    if not isinstance(value, (list, tuple)):
+        return [value] * nbands
+    value = list(value)
+    if len(value) != nbands:
+        raise ValueError("%s must be given once, or for each of the %i "
+                         "bands" % (name, nbands))
+    return value
+
+
+class BandStack(object):
+
+    """
+    Three or four 2D arrays of the same shape, shown as the red, green,
+    blue (and alpha) channels of an image.
+
+    Each band is normalized to the range [0, 1] by its own (vmin, vmax)
+    limits, clipped, and then stretched. Pixels that are invalid (NaN or
+    infinite) in any band are transparent.
+
+    :param bands: The band arrays. Any array-likes supporting strided
+                  slicing (e.g. memmaps or h5py datasets) can be used.
+
+    :param limits: The (vmin, vmax) limits of each band, or a single pair
+                   for all bands. The limits of any band given as None are
+                   estimated from a sample of its pixels when first needed.
+
+    :param stretch: 'linear', 'sqrt', 'log' or 'asinh', for each band or
+                    for all of them.
+    """
+
+    ndim = 3
+
+    def __init__(self, bands, limits=None, stretch='linear'):
+        bands = list(bands)
+        if len(bands) not in (3, 4):
+            raise ValueError("A BandStack needs 3 or 4 bands")
+        shape = bands[0].shape
+        for band in bands:
+            if band.ndim != 2 or band.shape != shape:
+                raise ValueError("Bands must be 2D arrays of the same shape")
+        self.bands = bands
+        self.shape = tuple(shape) + (len(bands),)
+        self.dtype = np.result_type(*[np.dtype(b.dtype) for b in bands])
+        self._limits = [None] * len(bands)
+        self._stretch = ['linear'] * len(bands)
+        self.set_limits(limits)
+        self.set_stretch(stretch)
+
+    @property
+    def nbands(self):
+        return len(self.bands)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _band_key(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > 2:
+            raise IndexError("BandStacks can only be indexed along their "
+                             "two image axes")
+        return key
+
+    def __getitem__(self, key):
+        """Read the same slice of every band, stacked along a last axis"""
+        key = self._band_key(key)
+        first = np.asarray(self.bands[0][key])
+        out = np.empty(first.shape + (self.nbands,), dtype=self.dtype)
+        out[..., 0] = first
+        for i, band in enumerate(self.bands[1:], 1):
+            out[..., i] = band[key]
+        return out
+
+    def __setitem__(self, key, value):
+        key = self._band_key(key)
+        value = np.asarray(value)
+        for i, band in enumerate(self.bands):
+            band[key] = value[..., i]
+
+    def set_limits(self, limits):
+        """
+        Set the (vmin, vmax) limits of each band, or a single pair for all
+        bands. Limits given as None are estimated from the band.
+        """
+        if limits is None or (len(limits) == 2 and
+                              all(lim is not None and np.ndim(lim) == 0
+                                  for lim in limits)):
+            limits = [limits] * self.nbands
+        limits = _per_band(limits, self.nbands, 'limits')
+        self._limits = [None if lim is None else tuple(map(float, lim))
+                        for lim in limits]
+
+    def get_limits(self):
+        """
+        The (vmin, vmax) limits of each band, estimating those which were
+        not given
+        """
+        for i, lim in enumerate(self._limits):
+            if lim is None:
+                vmin, vmax = autoscale_limits(self.bands[i], 'sample')
+                if vmin is None:
+                    vmin, vmax = 0., 1.
+                self._limits[i] = (float(vmin), float(vmax))
+        return list(self._limits)
+
+    def set_stretch(self, stretch):
+        """Set the stretch of each band, or a single stretch for all"""
+        stretch = _per_band(stretch, self.nbands, 'stretch')
+        for s in stretch:
+            check_stretch(s)
+        self._stretch = stretch
+
+    def get_stretch(self):
+        return list(self._stretch)
+
+    @property
+    def key(self):
+        """Hashable summary of the limits and stretches of the bands"""
+        return (tuple(self.get_limits()), tuple(self._stretch))
+
+    def compose(self, window):
+        """
+        Compose a ``(ny, nx, nbands)`` window read from the stack, which may
+        be a masked array, to uint8 RGBA.
+
+        :rtype: uint8 array of shape ``(ny, nx, 4)``
+        """
+        limits = np.array(self.get_limits())
+        vmin, vmax = limits[:, 0], limits[:, 1]
+        span = np.where(vmax > vmin, vmax - vmin, 1)
+
+        mask = np.ma.getmaskarray(window).any(axis=-1)
+        x = np.array(np.ma.getdata(window), dtype=np.float32)
+        invalid = ~np.isfinite(x).all(axis=-1)
+        mask |= invalid
+        if invalid.any():
+            x[invalid] = 0
+
+        x -= vmin.astype(np.float32)
+        x /= span.astype(np.float32)
+        np.clip(x, 0, 1, out=x)
+
+        for i, stretch in enumerate(self._stretch):
+            if stretch != 'linear':
+                x[..., i] = STRETCHES[stretch](x[..., i].copy())
+
+        rgba = np.empty(x.shape[:2] + (4,), dtype=np.uint8)
+        x *= 255
+        x += .5
+        rgba[..., :self.nbands] = x
+        if self.nbands == 3:
+            rgba[..., 3] = 255
+        rgba[mask, 3] = 0
+        return rgba
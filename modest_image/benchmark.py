@@ -0,0 +1,380 @@
+"""
+Benchmarks of ModestImage (and AxesImage, for comparison).
+
+Each benchmark times one interactive operation (drawing from scratch,
+panning, zooming, zooming in small steps as with a scroll wheel, changing
+the color limits or setting new data) for one
+combination of image class, array size, dtype, storage (in memory or a
+memory-mapped file) and layout (origin and extent). Results can be saved as
+JSON, and compared against the results of an earlier run to catch
+performance regressions::
+
+    python -m modest_image.benchmark --output new.json --baseline old.json
+
+Run with ``--help`` for the available options.
+"""
+from __future__ import print_function, division
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import importlib
+from functools import partial
+from collections import OrderedDict
+from timeit import default_timer
+
+import numpy as np
+import matplotlib
+import matplotlib.image as mi
+from matplotlib.figure import Figure
+
+from .modest_image import ModestImage
+
+CLASSES = OrderedDict([
+    ('AxesImage', mi.AxesImage),
+    ('ModestImage', ModestImage),
+    ('resampled', partial(ModestImage, direct=False)),
+    ('tiled', partial(ModestImage, tile_size=256)),
+    ('pyramid', partial(ModestImage, pyramid=True)),
+    ('lut', partial(ModestImage, lut=True)),
+    ('overscan', partial(ModestImage, overscan=.25, quantize_strides=True)),
+])
+
+OPERATIONS = ('draw', 'move', 'zoom', 'zoom_steps', 'clim', 'set_data')
+
+# origin, extent
+LAYOUTS = OrderedDict([
+    ('lower', ('lower', None)),
+    ('upper', ('upper', None)),
+    ('lower+extent', ('lower', (-3., 7., 10., 20.))),
+    ('upper+extent', ('upper', (-3., 7., 10., 20.))),
+])
+
+STORAGES = ('memory', 'memmap')
+
+DEFAULTS = dict(classes=list(CLASSES), operations=list(OPERATIONS),
+                sizes=[1000, 4000], dtypes=['float64', 'uint16'],
+                storages=list(STORAGES), layouts=['lower', 'upper+extent'],
+                backend='agg', repeat=5)
+
+QUICK = dict(DEFAULTS, sizes=[1000], dtypes=['float64'],
+             storages=['memory'], layouts=['lower'], repeat=3)
+
+# AxesImage colormaps the whole array, which is impractical for huge ones
+AXESIMAGE_MAX_SIZE = 4096
+
+# Views, as fractions of the extent, alternated between by 'move' and 'zoom'
+MOVE_VIEWS = [(0, .5), (.25, .75)]
+ZOOM_VIEWS = [(0, 1), (.45, .55)]
+
+# Factor by which each step of 'zoom_steps' shrinks the view
+ZOOM_STEP = .9
+
+# Rows of data generated at once, in bytes
+BAND_BYTES = 2 ** 24
+
+
+def _pattern(y0, y1, size):
+    y = np.arange(y0, y1)[:, np.newaxis]
+    x = np.arange(size)[np.newaxis, :]
+    return np.sin(y / 10.) * np.cos(x / 30.)
+
+
+def _scale(values, dtype):
+    """Map values in [-1, 1] to the range of an integer dtype"""
+    if dtype.kind == 'f':
+        return values.astype(dtype)
+    info = np.iinfo(dtype)
+    lo, hi = max(info.min, -2 ** 15), min(info.max, 2 ** 15)
+    return (lo + (values + 1) / 2 * (hi - lo)).astype(dtype)
+
+
+def data_range(dtype):
+    """The (min, max) of the benchmark data for ``dtype``"""
+    dtype = np.dtype(dtype)
+    lo, hi = _scale(np.array([-1., 1.]), dtype)
+    return float(lo), float(hi)
+
+
+def make_data(size, dtype, storage='memory', directory=None):
+    """
+    A ``size`` x ``size`` test image, held in memory or (for storage
+    'memmap') in a .npy file in ``directory``, which is memory-mapped
+    read-only.
+    """
+    dtype = np.dtype(dtype)
+    if storage == 'memory':
+        return _scale(_pattern(0, size, size), dtype)
+    if storage != 'memmap':
+        raise ValueError("storage must be one of %s" % ', '.join(STORAGES))
+
+    path = os.path.join(directory, 'data_%i_%s.npy' % (size, dtype.str[1:]))
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+                                    shape=(size, size))
+    rows = max(1, BAND_BYTES // (8 * size))
+    for y0 in range(0, size, rows):
+        y1 = min(y0 + rows, size)
+        out[y0:y1] = _scale(_pattern(y0, y1, size), dtype)
+    out.flush()
+    del out
+    return np.load(path, mmap_mode='r')
+
+
+def _canvas_class(backend):
+    module = importlib.import_module('matplotlib.backends.backend_%s' %
+                                     backend.lower())
+    return module.FigureCanvas
+
+
+def make_artist(img_cls, data, layout='lower', backend='agg'):
+    """
+    A figure showing ``data`` with ``img_cls``, for the given layout.
+
+    :rtype: tuple of the artist, and the extent of the whole image
+    """
+    origin, extent = LAYOUTS[layout]
+    fig = Figure(figsize=(8, 6), dpi=100)
+    _canvas_class(backend)(fig)
+    ax = fig.add_subplot(111)
+    artist = img_cls(ax, data=data, origin=origin, extent=extent,
+                     interpolation='nearest')
+    ax.add_artist(artist)
+    ax.set_aspect('equal')
+    artist.set_clim(*data_range(data.dtype))
+    extent = artist.get_extent()
+    _set_view(artist, (0, 1), extent)
+    return artist, extent
+
+
+def _set_view(artist, view, extent):
+    """Show the fraction ``view`` of the image extent along both axes"""
+    lo, hi = view
+    x0, x1, y0, y1 = extent
+    artist.axes.set_xlim(x0 + lo * (x1 - x0), x0 + hi * (x1 - x0))
+    artist.axes.set_ylim(y0 + lo * (y1 - y0), y0 + hi * (y1 - y0))
+
+
+def _operation(name, artist, extent, data):
+    """A function ``step(i)`` performing operation ``name`` on the artist"""
+    lo, hi = data_range(data.dtype)
+    narrow = lo + (hi - lo) / 4, hi - (hi - lo) / 4
+
+    def draw(i):
+        if hasattr(artist, 'invalidate_cache'):
+            artist.invalidate_cache()
+        artist.changed()
+
+    def move(i):
+        _set_view(artist, MOVE_VIEWS[i % 2], extent)
+
+    def zoom(i):
+        _set_view(artist, ZOOM_VIEWS[(i + 1) % 2], extent)
+
+    def zoom_steps(i):
+        half = ZOOM_STEP ** (i + 1) / 2
+        _set_view(artist, (.5 - half, .5 + half), extent)
+
+    def clim(i):
+        artist.set_clim(*(narrow if i % 2 == 0 else (lo, hi)))
+
+    def set_data(i):
+        artist.set_data(data)
+
+    if name == 'move':
+        _set_view(artist, MOVE_VIEWS[1], extent)
+
+    action = dict(draw=draw, move=move, zoom=zoom, zoom_steps=zoom_steps,
+                  clim=clim, set_data=set_data)[name]
+
+    def step(i):
+        action(i)
+        artist.figure.canvas.draw()
+
+    return step
+
+
+def _time_steps(artist, extent, operation, data, repeat):
+    step = _operation(operation, artist, extent, data)
+    artist.figure.canvas.draw()
+    if hasattr(artist, 'stats'):
+        artist.stats.reset()
+
+    times = []
+    for i in range(repeat):
+        t0 = default_timer()
+        step(i)
+        times.append((default_timer() - t0) * 1000)
+    return times
+
+
+def time_operation(img_cls, operation, data, layout='lower', backend='agg',
+                   repeat=5):
+    """
+    Times, in ms, of ``repeat`` runs of an operation, each followed by a
+    draw of the figure. The figure is drawn once beforehand, untimed.
+    """
+    artist, extent = make_artist(img_cls, data, layout=layout,
+                                 backend=backend)
+    return _time_steps(artist, extent, operation, data, repeat)
+
+
+def benchmark_name(cls, operation, size, dtype, storage, layout):
+    return '/'.join([cls, operation, str(size), dtype, storage, layout])
+
+
+def run(classes=None, operations=None, sizes=None, dtypes=None,
+        storages=None, layouts=None, backend='agg', repeat=5,
+        directory=None, progress=None):
+    """
+    Run every combination of the given benchmark parameters (the defaults
+    from ``DEFAULTS`` for any not given).
+
+    :param directory: Where to write memory-mapped test images. A
+                      temporary directory (deleted afterwards) by default.
+
+    :param progress: Optional function called with each result.
+
+    :rtype: list of result dictionaries
+    """
+    opts = dict(DEFAULTS)
+    opts.update((k, v) for k, v in dict(classes=classes, sizes=sizes,
+                                        operations=operations,
+                                        dtypes=dtypes, storages=storages,
+                                        layouts=layouts).items()
+                if v is not None)
+
+    cleanup = directory is None
+    if cleanup:
+        directory = tempfile.mkdtemp(prefix='modest_image_benchmark')
+
+    results = []
+    try:
+        for size in opts['sizes']:
+            for dtype in opts['dtypes']:
+                dtype = np.dtype(dtype).name
+                for storage in opts['storages']:
+                    data = make_data(size, dtype, storage, directory)
+                    for cls in opts['classes']:
+                        if cls == 'AxesImage' and size > AXESIMAGE_MAX_SIZE:
+                            continue
+                        for layout in opts['layouts']:
+                            for operation in opts['operations']:
+                                artist, extent = make_artist(
+                                    CLASSES[cls], data, layout=layout,
+                                    backend=backend)
+                                times = _time_steps(artist, extent,
+                                                    operation, data, repeat)
+                                result = dict(
+                                    name=benchmark_name(cls, operation, size,
+                                                        dtype, storage,
+                                                        layout),
+                                    cls=cls, operation=operation, size=size,
+                                    dtype=dtype, storage=storage,
+                                    layout=layout, backend=backend,
+                                    times_ms=times,
+                                    min_ms=min(times),
+                                    median_ms=float(np.median(times)))
+                                if hasattr(artist, 'stats'):
+                                    result['hit_rate'] = artist.stats.hit_rate
+                                results.append(result)
+                                if progress is not None:
+                                    progress(result)
+                    del data
+    finally:
+        if cleanup:
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def environment():
+    """Description of the machine and library versions, for the report"""
+    return dict(python=platform.python_version(),
+                platform=platform.platform(),
+                numpy=np.__version__,
+                matplotlib=matplotlib.__version__,
+                date=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+
+
+def compare(results, baseline, tolerance=0.25, min_delta=1.0):
+    """
+    Find benchmarks which got slower than in ``baseline`` (a list of results
+    from an earlier run, matched by name).
+
+    A benchmark has regressed if its median time grew by more than a
+    fraction ``tolerance`` and more than ``min_delta`` ms (so that noise in
+    very fast operations is ignored).
+
+    :rtype: list of (name, baseline ms, new ms) tuples
+    """
+    old = dict((r['name'], r['median_ms']) for r in baseline)
+    regressions = []
+    for result in results:
+        before = old.get(result['name'])
+        if before is None:
+            continue
+        after = result['median_ms']
+        if after > before * (1 + tolerance) and after - before > min_delta:
+            regressions.append((result['name'], before, after))
+    return regressions
+
+
+def _print_result(result):
+    line = '%-60s %9.1f ms' % (result['name'], result['median_ms'])
+    if 'hit_rate' in result:
+        line += '  hits %3i%%' % (100 * result['hit_rate'])
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark ModestImage drawing operations")
+    parser.add_argument('--quick', action='store_true',
+                        help="run a small subset of the benchmarks")
+    parser.add_argument('--classes', nargs='+', choices=list(CLASSES))
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS)
+    parser.add_argument('--sizes', nargs='+', type=int)
+    parser.add_argument('--dtypes', nargs='+')
+    parser.add_argument('--storages', nargs='+', choices=STORAGES)
+    parser.add_argument('--layouts', nargs='+', choices=list(LAYOUTS))
+    parser.add_argument('--backend', default='agg')
+    parser.add_argument('--repeat', type=int)
+    parser.add_argument('--directory',
+                        help="where to write memory-mapped test images")
+    parser.add_argument('--output', help="file to save the results to")
+    parser.add_argument('--baseline',
+                        help="results of an earlier run to compare to")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed fractional slowdown (default 0.25)")
+    args = parser.parse_args(argv)
+
+    opts = dict(QUICK if args.quick else DEFAULTS)
+    for key in list(opts):
+        value = getattr(args, key, None)
+        if value is not None:
+            opts[key] = value
+
+    results = run(directory=args.directory, progress=_print_result, **opts)
+    report = dict(environment=environment(), results=results)
+
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            json.dump(report, outfile, indent=1, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)['results']
+        regressions = compare(results, baseline, tolerance=args.tolerance)
+        for name, before, after in regressions:
+            print('REGRESSION %s: %.1f ms -> %.1f ms' % (name, before, after))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
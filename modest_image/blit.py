@@ -0,0 +1,261 @@
+"""
+Blitting a ModestImage while its view changes.
+
+Panning or zooming with the mouse normally redraws the whole figure at each
+motion event: the axes, ticks, labels and other artists, as well as the
+image, which is the only thing that really changes. An ImageBlitter keeps a
+copy of the axes drawn without the image (taken with ``copy_from_bbox`` at
+the end of each full draw of the figure). While the view changes, it only
+restores that background (``restore_region``), draws the image (and any
+overlay artists given) over it, and blits the region which changed, so that
+the frame rate is limited by resampling the image rather than by drawing
+the figure::
+
+    im = imshow(ax, data)
+    blitter = ImageBlitter(im)
+    blitter.connect()   # drag to pan, scroll to zoom
+
+    # or, from the event handlers of a GUI
+    blitter.set_view(xlim, ylim)
+
+Ticks and labels are not updated while blitting: once the view has stopped
+changing for ``settle`` seconds (or the mouse button is released), a full
+draw of the figure is requested.
+
+The damaged region of each blit is the union of the regions of the axes
+covered by the image (and overlays) before and after the change, in
+display coordinates. Only this region is blitted, and it is passed to
+``damage_callback``, if given.
+"""
+from __future__ import print_function, division
+
+import numpy as np
+from matplotlib.transforms import Bbox
+
+# Seconds without a change of view after which the figure is fully redrawn
+DEFAULT_SETTLE = 0.3
+
+# Factor by which each step of the scroll wheel zooms
+ZOOM_STEP = 1.25
+
+
+def _pixel_bbox(bbox):
+    """The smallest Bbox of whole pixels containing ``bbox``"""
+    (x0, y0), (x1, y1) = bbox.get_points()
+    return Bbox.from_extents(np.floor(x0), np.floor(y0),
+                             np.ceil(x1), np.ceil(y1))
+
+
+def _union(bboxes):
+    bboxes = [b for b in bboxes if b is not None]
+    if not bboxes:
+        return None
+    return Bbox.union(bboxes)
+
+
+class ImageBlitter(object):
+
+    """
+    Redraws a ModestImage by blitting, without redrawing its figure.
+
+    While the blitter is attached, full draws of the figure draw the image
+    only once the rest of the axes has been copied as the background (and
+    saving the figure draws it as usual).
+
+    :param image: ModestImage to redraw
+    :param artists: Other artists of the axes to redraw over the image at
+                    each blit (e.g. markers or contours), which are animated
+                    too, so that full draws leave them out of the background
+    :param damage_callback: Function called with the Bbox of the region
+                            blitted, in display coordinates
+    :param settle: Seconds after the last change of view at which the
+                   figure is fully redrawn, to update the ticks (None never
+                   to do so)
+
+    :ivar damage: Region blitted last, or None
+    """
+
+    def __init__(self, image, artists=(), damage_callback=None,
+                 settle=DEFAULT_SETTLE):
+        self.image = image
+        self.artists = list(artists)
+        self.damage_callback = damage_callback
+        self.settle = settle
+        self.damage = None
+        self.drawing = False
+        self._background = None
+        self._region = None
+        self._pan = None
+        self._timer = None
+        self._mouse_cids = []
+
+        for artist in [image] + self.artists:
+            artist.set_animated(True)
+        image._blitter = self
+        self._draw_cid = self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    @property
+    def axes(self):
+        return self.image.axes
+
+    @property
+    def canvas(self):
+        return self.image.figure.canvas
+
+    def _on_draw(self, event):
+        if self.canvas.is_saving():
+            # drawn with the image, maybe at another dpi: the next blit
+            # needs a full draw
+            self._background = None
+            return
+        # The figure has just been drawn without the image: keep the axes as
+        # they are as the background, then draw the image over them
+        self._background = self.canvas.copy_from_bbox(self.axes.bbox)
+        self._region = self._draw_artists()
+
+    def _draw_artists(self):
+        """
+        Draw the image and overlays into the canvas, returning the region of
+        the axes they cover
+        """
+        renderer = self.axes.get_renderer_cache()
+        self.drawing = True
+        try:
+            for artist in [self.image] + self.artists:
+                self.axes.draw_artist(artist)
+        finally:
+            self.drawing = False
+
+        regions = []
+        for artist in [self.image] + self.artists:
+            extent = artist.get_window_extent(renderer)
+            if extent.width > 0 and extent.height > 0:
+                regions.append(extent)
+        region = _union(regions)
+        if region is None:
+            return None
+        region = Bbox.intersection(region, self.axes.bbox)
+        if region is None:
+            return None
+        return _pixel_bbox(region)
+
+    def blit(self):
+        """
+        Redraw the image (and overlays) over the background, and blit the
+        damaged region, which is returned. Before the first full draw of
+        the figure, this draws the figure instead.
+
+        :rtype: Bbox or None
+        """
+        if self._background is None:
+            self.canvas.draw()
+            damage = self.axes.bbox.frozen()
+        else:
+            self.canvas.restore_region(self._background)
+            region = self._draw_artists()
+            damage = _union([self._region, region])
+            self._region = region
+            if damage is not None:
+                self.canvas.blit(damage)
+        self.damage = damage
+        if damage is not None and self.damage_callback is not None:
+            self.damage_callback(damage)
+        return damage
+
+    def set_view(self, xlim=None, ylim=None):
+        """
+        Change the limits of the axes, and blit the image in the new view.
+        Returns the damaged region (see ``blit``).
+        """
+        # Changing the limits makes the figure stale, which, with pyplot in
+        # interactive mode, triggers a full draw: hold the callback back
+        figure = self.image.figure
+        callback, figure.stale_callback = figure.stale_callback, None
+        try:
+            if xlim is not None:
+                self.axes.set_xlim(xlim)
+            if ylim is not None:
+                self.axes.set_ylim(ylim)
+        finally:
+            figure.stale_callback = callback
+        damage = self.blit()
+        self._schedule_refresh()
+        return damage
+
+    def refresh(self):
+        """Request a full draw of the figure, updating ticks and labels"""
+        if self._timer is not None:
+            self._timer.stop()
+        self.canvas.draw_idle()
+
+    def _schedule_refresh(self):
+        if self.settle is None:
+            return
+        if self._timer is None:
+            self._timer = self.canvas.new_timer(
+                interval=int(self.settle * 1000))
+            self._timer.single_shot = True
+            self._timer.add_callback(self.refresh)
+        self._timer.stop()
+        self._timer.start()
+
+    def connect(self):
+        """Pan the image by dragging it, and zoom with the scroll wheel"""
+        if self._mouse_cids:
+            return
+        handlers = [('button_press_event', self._on_press),
+                    ('motion_notify_event', self._on_motion),
+                    ('button_release_event', self._on_release),
+                    ('scroll_event', self._on_scroll)]
+        self._mouse_cids = [self.canvas.mpl_connect(name, handler)
+                            for name, handler in handlers]
+
+    def _toolbar_active(self):
+        toolbar = getattr(self.canvas, 'toolbar', None)
+        return bool(getattr(toolbar, '_active', None))
+
+    def _on_press(self, event):
+        if (event.inaxes is not self.axes or event.button != 1 or
+                self._toolbar_active()):
+            return
+        self._pan = (event.x, event.y, self.axes.get_xlim(),
+                     self.axes.get_ylim(),
+                     self.axes.transData.inverted().frozen())
+
+    def _on_motion(self, event):
+        if self._pan is None:
+            return
+        x, y, xlim, ylim, inverse = self._pan
+        (x0, y0), (x1, y1) = inverse.transform([(x, y), (event.x, event.y)])
+        self.set_view((xlim[0] + x0 - x1, xlim[1] + x0 - x1),
+                      (ylim[0] + y0 - y1, ylim[1] + y0 - y1))
+
+    def _on_release(self, event):
+        if self._pan is None:
+            return
+        self._pan = None
+        self.refresh()
+
+    def _on_scroll(self, event):
+        if event.inaxes is not self.axes or self._toolbar_active():
+            return
+        scale = ZOOM_STEP ** -event.step
+        x, y = event.xdata, event.ydata
+        xlim, ylim = self.axes.get_xlim(), self.axes.get_ylim()
+        self.set_view([x + (v - x) * scale for v in xlim],
+                      [y + (v - y) * scale for v in ylim])
+
+    def disconnect(self):
+        """
+        Stop blitting: the image (and overlays) are drawn with the rest of
+        the figure again
+        """
+        for cid in self._mouse_cids + [self._draw_cid]:
+            self.canvas.mpl_disconnect(cid)
+        self._mouse_cids = []
+        if self._timer is not None:
+            self._timer.stop()
+        for artist in [self.image] + self.artists:
+            artist.set_animated(False)
+        self.image._blitter = None
+        self._background = None
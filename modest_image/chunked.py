@@ -0,0 +1,151 @@
+"""
+Concurrent, chunk-aware reading of windows from large array-likes.
+
+Strided reads from a ``numpy.memmap`` fault in one page at a time, and
+chunked stores such as h5py datasets or zarr arrays decode whole chunks at a
+time. Splitting a read into bands of rows that follow the chunk layout of
+the source, and reading those bands from a small pool of threads, keeps
+several of these slow operations in flight at once.
+"""
+from __future__ import print_function, division
+
+import os
+
+import numpy as np
+
+from .lazy import is_lazy, compute
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # Python 2 without the futures backport
+    ThreadPoolExecutor = None
+
+# Maximum number of threads used to read from a single array
+READ_WORKERS = 4
+
+# Rows are grouped in bands of about this many bytes for arrays which do
+# not declare their own chunking.
+BAND_BYTES = 2 ** 22
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=READ_WORKERS)
+    return _executor
+
+
+def reset_executor():
+    """
+    Forget the thread pool, e.g. in a forked child process, where the
+    threads of the parent's pool do not exist. A new pool is started when
+    next needed.
+    """
+    global _executor
+    _executor = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_executor)
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def chunk_rows(data):
+    """
+    Number of rows in each chunk of an array-like.
+
+    This is taken from the ``chunks`` attribute for chunked stores (h5py,
+    zarr and dask arrays), and otherwise chosen so that a band of rows is
+    about ``BAND_BYTES`` in size.
+    """
+    chunks = getattr(data, 'chunks', None)
+    if chunks:
+        rows = chunks[0]
+        # dask gives the size of each chunk along every axis
+        if isinstance(rows, tuple):
+            rows = rows[0]
+        return max(1, int(rows))
+    itemsize = np.dtype(data.dtype).itemsize
+    row_bytes = max(1, itemsize * int(np.prod(data.shape[1:])))
+    return max(1, BAND_BYTES // row_bytes)
+
+
+def bands(y0, n, step, rows, max_bands=4 * READ_WORKERS, max_rows=None):
+    """
+    Split ``n`` output rows, where output row ``i`` starts at source row
+    ``y0 + i * step``, into bands ``(lo, hi)`` of output rows.
+
+    Bands start where a new source chunk of ``rows`` rows starts, so that
+    no chunk is read by more than one band, and contain at least
+    ``n / max_bands`` rows, to keep the number of bands reasonable. If
+    given, no band has more than ``max_rows`` rows, regardless of chunking.
+    """
+    min_rows = _ceil_div(n, max_bands)
+    if max_rows is not None:
+        min_rows = min(min_rows, max_rows)
+    result = []
+    lo = 0
+    chunk = y0 // rows
+    for i in range(1, n):
+        c = (y0 + i * step) // rows
+        if ((c != chunk and i - lo >= min_rows) or
+                (max_rows is not None and i - lo >= max_rows)):
+            result.append((lo, i))
+            lo = i
+        chunk = c
+    result.append((lo, n))
+    return result
+
+
+def map_bands(func, band_list, parallel=True):
+    """
+    Call ``func(lo, hi)`` for each band, using the read thread pool if
+    there is more than one band.
+    """
+    if (not parallel or len(band_list) < 2 or READ_WORKERS < 2 or
+            ThreadPoolExecutor is None):
+        for lo, hi in band_list:
+            func(lo, hi)
+        return
+
+    futures = [_get_executor().submit(func, lo, hi) for lo, hi in band_list]
+    for future in futures:
+        future.result()
+
+
+def read_strided(data, x0, x1, sx, y0, y1, sy, parallel=True):
+    """
+    Read ``data[y0:y1:sy, x0:x1:sx]``, in bands of rows that follow the
+    chunking of ``data``, concurrently.
+
+    Only the requested rows and columns are read by each band, so no full
+    resolution intermediate is ever created. Lazy (dask) arrays are instead
+    sliced lazily and computed at once.
+    """
+    if is_lazy(data):
+        return compute(data[y0:y1:sy, x0:x1:sx])
+
+    # Slicing an in-memory array is free, and makes a view
+    if isinstance(data, np.ndarray) and not isinstance(data, np.memmap):
+        return data[y0:y1:sy, x0:x1:sx]
+
+    y1 = min(y1, data.shape[0])
+    x1 = min(x1, data.shape[1])
+    ny, nx = _ceil_div(y1 - y0, sy), _ceil_div(x1 - x0, sx)
+
+    band_list = bands(y0, ny, sy, chunk_rows(data))
+    if len(band_list) == 1:
+        return np.asarray(data[y0:y1:sy, x0:x1:sx])
+
+    out = np.empty((ny, nx) + tuple(data.shape[2:]), dtype=data.dtype)
+
+    def read(lo, hi):
+        out[lo:hi] = data[y0 + lo * sy:min(y0 + hi * sy, y1):sy, x0:x1:sx]
+
+    map_bands(read, band_list, parallel=parallel)
+    return out
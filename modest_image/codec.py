@@ -0,0 +1,187 @@
+"""
+Compact storage of cached windows.
+
+Windows of float64 data take 8 bytes per pixel, which limits how many can
+be kept in a cache of a given size. The PackedArray here stores a window in
+less memory, and restores it when the window is drawn again:
+
+* with a ``dtype`` of 'float32' or 'float16', floating point windows are
+  stored at that precision (values beyond the range of float16, about
+  65504, become infinite);
+* with 'uint16', they are quantized to 65535 levels between their smallest
+  and largest finite values (a scale and offset of the window's own data,
+  so that color limits can still change freely);
+* with a ``codec`` ('zlib' or 'bz2'), the bytes are compressed with that
+  module of the standard library. As in blosc, the bytes of the values are
+  shuffled first (all first bytes, then all second bytes, ...), which
+  makes them compress better, and faster.
+
+Masks are kept exactly, and integer windows are only ever compressed. The
+windows given back are of the original dtype.
+"""
+from __future__ import print_function, division
+
+import zlib
+import bz2
+
+import numpy as np
+
+CACHE_DTYPES = ('float32', 'float16', 'uint16')
+
+CACHE_CODECS = ('zlib', 'bz2')
+
+# Code of non-finite values in windows quantized to uint16
+_INVALID = 65535
+
+
+def check_cache_dtype(dtype):
+    """Raise a ValueError if ``dtype`` is not a valid cache dtype"""
+    if dtype is not None and dtype not in CACHE_DTYPES:
+        raise ValueError("cache_dtype must be None or one of %s" %
+                         ', '.join(repr(d) for d in CACHE_DTYPES))
+
+
+def check_cache_codec(codec):
+    """Raise a ValueError if ``codec`` is not a valid codec"""
+    if codec is not None and codec not in CACHE_CODECS:
+        raise ValueError("cache_codec must be None or one of %s" %
+                         ', '.join(repr(c) for c in CACHE_CODECS))
+
+
+def _compress(codec, values):
+    """Compress the shuffled bytes of a contiguous array"""
+    shuffled = values.reshape(-1).view(np.uint8).reshape(-1, values.itemsize)
+    raw = np.ascontiguousarray(shuffled.T).tobytes()
+    if codec == 'zlib':
+        return zlib.compress(raw, 1)
+    return bz2.compress(raw, 1)
+
+
+def _decompress(codec, raw, dtype):
+    """The values compressed by ``_compress``"""
+    if codec == 'zlib':
+        raw = zlib.decompress(raw)
+    else:
+        raw = bz2.decompress(raw)
+    shuffled = np.frombuffer(raw, dtype=np.uint8)
+    shuffled = shuffled.reshape(dtype.itemsize, -1)
+    return np.ascontiguousarray(shuffled.T).view(dtype).reshape(-1)
+
+
+def _stored_dtype(dtype, cache_dtype):
+    """The dtype windows of ``dtype`` are stored as, for ``cache_dtype``"""
+    if cache_dtype is None or dtype.kind != 'f':
+        return dtype
+    stored = np.dtype(cache_dtype)
+    if stored.itemsize >= dtype.itemsize:
+        return dtype
+    return stored
+
+
+class PackedArray(object):
+
+    """
+    An array (optionally masked) stored with less precision and/or
+    compressed. ``unpack`` gives back an array of the original shape and
+    dtype.
+
+    :param data: Array to pack
+    :param dtype: One of ``CACHE_DTYPES``, or None to keep the precision
+    :param codec: One of ``CACHE_CODECS``, or None not to compress
+    """
+
+    def __init__(self, data, dtype=None, codec=None):
+        check_cache_dtype(dtype)
+        check_cache_codec(codec)
+        mask = np.ma.getmask(data)
+        values = np.ma.getdata(data)
+        self.shape = values.shape
+        self.dtype = values.dtype
+        self.codec = codec
+        self.scale = self.offset = None
+
+        stored = _stored_dtype(self.dtype, dtype)
+        if stored.kind == 'u':
+            values = self._quantize(values, mask)
+        elif stored != self.dtype:
+            values = values.astype(stored)
+        self.stored_dtype = values.dtype
+
+        self.mask = None
+        if mask is not np.ma.nomask:
+            self.mask = self._encode(np.packbits(mask.ravel()))
+        self.data = self._encode(values)
+
+    def _quantize(self, values, mask):
+        valid = np.isfinite(values)
+        if mask is not np.ma.nomask:
+            valid &= ~mask
+        if valid.any():
+            lo, hi = values[valid].min(), values[valid].max()
+        else:
+            lo = hi = 0.
+        self.offset = float(lo)
+        self.scale = float(hi - lo) / (_INVALID - 1) or 1.
+        codes = np.full(values.shape, _INVALID, dtype=np.uint16)
+        scaled = (values[valid] - self.offset) / self.scale
+        codes[valid] = np.rint(scaled)
+        return codes
+
+    def _encode(self, values):
+        values = np.ascontiguousarray(values)
+        if self.codec is None:
+            return values
+        return _compress(self.codec, values)
+
+    def _decode(self, stored, dtype):
+        if self.codec is None:
+            return stored
+        return _decompress(self.codec, stored, np.dtype(dtype))
+
+    @property
+    def nbytes(self):
+        """Memory used by the packed data"""
+        nbytes = 0
+        for stored in (self.data, self.mask):
+            if isinstance(stored, np.ndarray):
+                nbytes += stored.nbytes
+            elif stored is not None:
+                nbytes += len(stored)
+        return nbytes
+
+    def unpack(self):
+        """The array, restored to its original shape and dtype"""
+        values = self._decode(self.data, self.stored_dtype)
+        values = values.reshape(self.shape)
+        if self.scale is not None:
+            invalid = values == _INVALID
+            values = values.astype(self.dtype)
+            values *= self.scale
+            values += self.offset
+            values[invalid] = np.nan
+        else:
+            values = values.astype(self.dtype)
+
+        if self.mask is None:
+            return values
+        bits = self._decode(self.mask, np.uint8)
+        mask = np.unpackbits(bits)[:values.size].reshape(self.shape)
+        return np.ma.masked_array(values, mask=mask.astype(bool))
+
+
+def pack(data, dtype=None, codec=None):
+    """
+    A PackedArray of ``data``, or ``data`` itself if neither ``dtype`` nor
+    ``codec`` would make it smaller
+    """
+    if codec is None and _stored_dtype(np.dtype(data.dtype),
+                                       dtype) == data.dtype:
+        return data
+    return PackedArray(data, dtype=dtype, codec=codec)
+
+
+def unpack(value):
+    """The array packed in ``value``, if it is a PackedArray, else ``value``"""
+    if isinstance(value, PackedArray):
+        return value.unpack()
+    return value
@@ -0,0 +1,337 @@
+"""
+Fast colormapping of image windows through lookup tables.
+
+Matplotlib colormaps an image by normalizing a masked, floating point copy
+of the data and then indexing the colormap with it, which makes several
+temporary arrays the size of the image. The Colormapper here gives the same
+colors with fewer passes over the data:
+
+* integer data of up to 16 bits go through a table holding the color of
+  every possible value, so colormapping is a single lookup per pixel;
+* other data normalized by a plain (linear) ``Normalize`` are scaled to
+  colormap indices in place, and looked up in the colormap's table;
+* anything else (e.g. a ``LogNorm``) is handed to the norm and colormap.
+
+The tables are kept until the norm or colormap change. Data that are not
+looked up directly are normalized in blocks of rows, written straight into
+the RGBA output, so the floating point temporaries stay small whatever the
+size of the window.
+
+From matplotlib 2.1, AxesImage does not normalize the data it draws
+directly: it scales them to [0.1, 0.9] (in single precision, for integer
+data) to resample them, and back again. The rounding errors of this round
+trip can move integer values across the boundary between two colors.
+Given the ``span`` of the integer data drawn (see ``data_span``), the
+Colormapper makes the same round trip before normalizing, so that it gives
+the colors AxesImage would draw for the same array without interpolation.
+AxesImage draws an array by the span of the whole array, and a view of part
+of it is colored by the span of the window sliced, so the two can still
+differ by one color on a few pixels.
+"""
+from __future__ import print_function, division
+
+from threading import Lock
+from distutils.version import LooseVersion
+
+import numpy as np
+import matplotlib
+import matplotlib.colors as mcolors
+
+_MPL_VERSION = LooseVersion(matplotlib.__version__)
+
+# Whether AxesImage rescales 2D data before resampling them, and whether it
+# clips them around the norm limits first
+RESCALES = _MPL_VERSION >= LooseVersion('2.1')
+_CLIPS = _MPL_VERSION >= LooseVersion('2.2')
+
+# Maximum number of tables kept by a Colormapper
+MAX_TABLES = 8
+
+# Number of pixels normalized at a time
+BLOCK_PIXELS = 2 ** 18
+
+
+def _norm_state(norm):
+    """
+    Hashable summary of the attributes of a norm. Attributes other than
+    scalars and arrays are compared by identity, except private ones (e.g.
+    cached transforms), which are left out.
+    """
+    state = []
+    for name, value in sorted(vars(norm).items()):
+        if value is None or np.isscalar(value):
+            state.append((name, value))
+        elif isinstance(value, np.ndarray):
+            state.append((name, value.shape, value.dtype.str,
+                          value.tobytes()))
+        elif not name.startswith('_'):
+            state.append((name, id(value)))
+    return tuple(state)
+
+
+def colormap_key(norm, cmap):
+    """
+    Hashable summary of a norm and colormap, which changes whenever the
+    colors that data map to do. Equal norms and colormaps (e.g. of images
+    sharing tiles) have equal keys.
+    """
+    norm_state = _norm_state(norm)
+    return (type(norm), norm_state, color_table(cmap).tobytes())
+
+
+def color_table(cmap):
+    """
+    The uint8 RGBA colors of a colormap, in the order: under, the ``cmap.N``
+    colors of the colormap, over, bad.
+    """
+    n = cmap.N
+    table = np.empty((n + 3, 4), dtype=np.uint8)
+    table[:-1] = cmap(np.arange(-1, n + 1), bytes=True)
+    table[-1] = cmap(np.ma.masked_all(1), bytes=True)[0]
+    return table
+
+
+def _lookup_dtype(dtype):
+    """
+    The unsigned integer type that data of ``dtype`` can be viewed as to
+    index a table of the colors of all its values, or None if there is
+    none (or the table would be too big).
+    """
+    if dtype.kind not in 'iu' or dtype.itemsize > 2:
+        return None
+    return np.dtype('u%i' % dtype.itemsize)
+
+
+def data_span(data):
+    """
+    The (min, max) of a 2D array of integers, which AxesImage rescales it by
+    before resampling it, or None if it does not (before matplotlib 2.1).
+    Floating point data are rescaled in their own precision, and are
+    colored without a span.
+    """
+    if not RESCALES or data.dtype.kind not in 'iub':
+        return None
+    a_min, a_max = data.min(), data.max()
+    if a_min is np.ma.masked:
+        return np.int32(0), np.int32(1)
+    return a_min, a_max
+
+
+def span_key(span):
+    """Hashable version of a ``data_span``"""
+    if span is None:
+        return None
+    return tuple((np.asarray(v).dtype.str, float(v)) for v in span)
+
+
+def rescaled(values, span, norm):
+    """
+    The values AxesImage passes to ``norm`` for ``values`` (an unmasked
+    array) in data of the given ``span``, when drawing them without
+    interpolation. This repeats the arithmetic of AxesImage._make_image, so
+    as to give the same rounding errors.
+    """
+    a_min, a_max = span
+    if values.dtype.kind == 'f':
+        scaled_dtype = values.dtype
+    else:
+        da = a_max.astype(np.float64) - a_min.astype(np.float64)
+        scaled_dtype = np.float64 if da > 1e8 else np.float32
+    A_scaled = np.empty(values.shape, dtype=scaled_dtype)
+    A_scaled[:] = values
+
+    if _CLIPS:
+        dv = np.float64(norm.vmax) - np.float64(norm.vmin)
+        vmid = norm.vmin + dv / 2
+        fact = 1e7 if scaled_dtype == np.float64 else 1e4
+        newmin = vmid - dv * fact
+        if newmin < a_min:
+            newmin = None
+        else:
+            a_min = np.float64(newmin)
+        newmax = vmid + dv * fact
+        if newmax > a_max:
+            newmax = None
+        else:
+            a_max = np.float64(newmax)
+        if newmax is not None or newmin is not None:
+            A_scaled = np.clip(A_scaled, newmin, newmax)
+        A_scaled -= a_min
+        a_min = a_min.astype(scaled_dtype).item()
+        a_max = a_max.astype(scaled_dtype).item()
+    else:
+        a_min = a_min.astype(scaled_dtype)
+        a_max = a_max.astype(scaled_dtype)
+        A_scaled -= a_min
+
+    if a_min != a_max:
+        A_scaled /= ((a_max - a_min) / 0.8)
+    A_scaled += 0.1
+    # (nearest neighbour resampling copies the values)
+    A_scaled -= 0.1
+    if a_min != a_max:
+        A_scaled *= ((a_max - a_min) / 0.8)
+    A_scaled += a_min
+    if isinstance(norm, mcolors.NoNorm):
+        A_scaled = A_scaled.astype(values.dtype)
+    return A_scaled
+
+
+def _drawn(data, span, norm):
+    """``data``, rescaled as AxesImage draws it if ``span`` is given"""
+    if span is None:
+        return data
+    values = rescaled(np.ma.getdata(data), span, norm)
+    mask = np.ma.getmask(data)
+    if mask is np.ma.nomask:
+        return values
+    return np.ma.masked_array(values, mask=mask)
+
+
+def value_table(dtype, norm, cmap, span=None):
+    """
+    The uint8 RGBA colors of every value of a (16 bit or smaller) integer
+    dtype, indexed by the bits of the values read as unsigned integers.
+    With a ``span``, these are the colors AxesImage draws the values with
+    in data of that span.
+    """
+    unsigned = _lookup_dtype(dtype)
+    values = np.arange(2 ** (8 * unsigned.itemsize),
+                       dtype=unsigned).view(dtype.newbyteorder('='))
+    return cmap(norm(_drawn(values, span, norm)), bytes=True)
+
+
+def _float_dtype(dtype):
+    """The precision matplotlib normalizes data of ``dtype`` at"""
+    if dtype.kind == 'f':
+        return dtype.newbyteorder('=')
+    return np.promote_types(dtype, np.float32)
+
+
+def _index_dtype(n):
+    """The smallest integer type holding the indices of ``n`` colors"""
+    return np.int16 if n + 3 <= np.iinfo(np.int16).max else np.intp
+
+
+def row_blocks(shape, block_pixels=None):
+    """
+    Slices of the rows of an array of ``shape``, in blocks of up to
+    ``block_pixels`` (by default ``BLOCK_PIXELS``) pixels
+    """
+    if block_pixels is None:
+        block_pixels = BLOCK_PIXELS
+    ny = shape[0]
+    nx = int(np.prod(shape[1:2]))
+    step = max(1, block_pixels // max(nx, 1))
+    for start in range(0, ny, step):
+        yield slice(start, min(start + step, ny))
+
+
+def linear_indices(data, norm, n):
+    """
+    Indices into a ``color_table`` of ``n`` colors for ``data``, normalized
+    by a linear Normalize exactly as matplotlib would, but in place.
+    Masked values map to the bad color.
+    """
+    mask = np.ma.getmask(data)
+    x = np.array(np.ma.getdata(data), dtype=_float_dtype(data.dtype))
+
+    (vmin,), _ = norm.process_value(norm.vmin)
+    (vmax,), _ = norm.process_value(norm.vmax)
+    if vmin == vmax:
+        x.fill(0)
+    elif vmin > vmax:
+        raise ValueError("minvalue must be less than or equal to maxvalue")
+    else:
+        if norm.clip:
+            np.clip(x, vmin, vmax, out=x)
+        x -= vmin
+        x /= (vmax - vmin)
+
+    if mask is not np.ma.nomask:
+        # masked values may be nan, which don't convert to indices
+        np.putmask(x, mask, 0)
+
+    # as in Colormap.__call__, 1 maps to the last color, and values below
+    # 0 to the under color
+    almost_one = np.nextafter(*np.array([1, 0], dtype=x.dtype))
+    np.putmask(x, x == 1.0, almost_one)
+    x *= n
+    np.clip(x, -1, n, out=x)
+    np.putmask(x, x < 0.0, -1)
+
+    indices = x.astype(_index_dtype(n))
+    indices += 1
+    if mask is not np.ma.nomask:
+        np.putmask(indices, mask, n + 2)
+    return indices
+
+
+class Colormapper(object):
+
+    """
+    Colormaps arrays to uint8 RGBA with a norm and colormap, like
+    ``ScalarMappable.to_rgba(data, bytes=True)``, using lookup tables that
+    are kept between calls until the norm or colormap change.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._tables = {}
+
+    def _table(self, key, build):
+        with self._lock:
+            table = self._tables.get(key)
+        if table is None:
+            table = build()
+            with self._lock:
+                if len(self._tables) >= MAX_TABLES:
+                    self._tables.clear()
+                self._tables[key] = table
+        return table
+
+    def __call__(self, data, norm, cmap, span=None):
+        """
+        Colormap a 2D (optionally masked) array.
+
+        :param span: ``data_span`` of the array AxesImage would draw (e.g.
+                     the window ``data`` was picked from), to give the colors
+                     AxesImage draws rather than those of ``to_rgba``
+
+        :rtype: uint8 array of shape ``data.shape + (4,)``
+        """
+        if norm.vmin is None or norm.vmax is None:
+            norm.autoscale_None(data)
+        key = colormap_key(norm, cmap)
+        dtype = np.dtype(data.dtype)
+        rgba = np.empty(data.shape + (4,), dtype=np.uint8)
+
+        unsigned = _lookup_dtype(dtype)
+        if unsigned is not None:
+            table = self._table(key + (dtype.str, span_key(span)),
+                                lambda: value_table(dtype, norm, cmap, span))
+            values = np.ma.getdata(data)
+            if not values.dtype.isnative:
+                values = values.astype(dtype.newbyteorder('='))
+            table.take(values.view(unsigned), axis=0, out=rgba, mode='clip')
+            mask = np.ma.getmask(data)
+            if mask is not np.ma.nomask:
+                rgba[mask] = cmap(np.ma.masked_all(1), bytes=True)[0]
+            return rgba
+
+        if type(norm) is mcolors.Normalize and dtype.kind in 'uif':
+            table = self._table(key, lambda: color_table(cmap))
+            for rows in row_blocks(data.shape):
+                block = _drawn(data[rows], span, norm)
+                indices = linear_indices(block, norm, cmap.N)
+                table.take(indices, axis=0, out=rgba[rows], mode='clip')
+            return rgba
+
+        for rows in row_blocks(data.shape):
+            block = _drawn(data[rows], span, norm)
+            rgba[rows] = cmap(norm(block), bytes=True)
+        return rgba
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
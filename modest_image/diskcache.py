@@ -0,0 +1,160 @@
+"""
+Persistent storage of image pyramid levels, for large files which are
+opened repeatedly.
+
+Levels are saved as ``.npy`` files in a cache directory, together with a
+small JSON index describing the file each set of levels was computed from.
+Later, the levels are memory-mapped rather than recomputed, so the first
+zoomed-out view of a file seen before only reads a small overview.
+"""
+from __future__ import print_function, division
+
+import os
+import json
+import hashlib
+import tempfile
+from threading import Lock
+
+import numpy as np
+
+INDEX_NAME = 'index.json'
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+def _root_array(a):
+    while isinstance(a.base, np.ndarray):
+        a = a.base
+    return a
+
+
+def source_info(data):
+    """
+    Describe the file an array-like reads from, or return None if it is not
+    backed by a file (or the file cannot be found).
+
+    Memory-mapped numpy arrays (including slices of them, such as FITS data
+    opened with ``memmap=True``) and h5py-like datasets (with ``file`` and
+    ``name`` attributes) are recognized.
+    """
+    info = {}
+    if isinstance(data, np.memmap) and data.filename is not None:
+        path = data.filename
+        root = _root_array(data)
+        info['offset'] = (int(getattr(root, 'offset', 0)) +
+                          data.__array_interface__['data'][0] -
+                          root.__array_interface__['data'][0])
+        info['strides'] = list(data.strides)
+    elif hasattr(data, 'file') and hasattr(data, 'name'):
+        path = getattr(data.file, 'filename', None)
+        info['name'] = data.name
+    else:
+        return None
+
+    if path is None or not os.path.exists(path):
+        return None
+
+    stat = os.stat(path)
+    info.update(path=os.path.abspath(path), mtime=stat.st_mtime,
+                size=stat.st_size, shape=list(data.shape),
+                dtype=np.dtype(data.dtype).str)
+    return info
+
+
+class OverviewStore(object):
+
+    """
+    A directory of pyramid levels, indexed by the file they came from.
+
+    :param directory: Where to keep the cache. Created if it doesn't exist.
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self._lock = Lock()
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.directory, INDEX_NAME)
+
+    def _read_index(self):
+        try:
+            with open(self._index_path) as infile:
+                return json.load(infile)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _write_index(self, index):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.json')
+        with os.fdopen(fd, 'w') as outfile:
+            json.dump(index, outfile, indent=1, sort_keys=True)
+        _replace(tmp, self._index_path)
+
+    def key(self, data, how=None):
+        """
+        The key that levels of ``data`` downsampled with ``how`` are stored
+        under, or None if ``data`` is not backed by a file.
+        """
+        info = source_info(data)
+        if info is None:
+            return None
+        info['how'] = how
+        digest = hashlib.sha1(json.dumps(info, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _level_path(self, key, k):
+        return os.path.join(self.directory, '%s_%i.npy' % (key, k))
+
+    def load(self, key, k):
+        """Memory-map level ``k`` stored under ``key``, or return None"""
+        path = self._level_path(key, k)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, mmap_mode='r')
+        except (IOError, OSError, ValueError):
+            return None
+
+    def save(self, key, k, level, data=None, how=None):
+        """
+        Store level ``k`` under ``key``. If the source array ``data`` is
+        given, it is recorded in the index, and levels stored for older
+        versions of the same file are deleted.
+        """
+        path = self._level_path(key, k)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.npy')
+        with os.fdopen(fd, 'wb') as outfile:
+            np.save(outfile, np.asarray(level))
+        _replace(tmp, path)
+
+        with self._lock:
+            index = self._read_index()
+            entry = index.setdefault(key, {'levels': []})
+            if k not in entry['levels']:
+                entry['levels'] = sorted(entry['levels'] + [k])
+            info = source_info(data) if data is not None else None
+            if info is not None:
+                entry.update(info, how=how)
+                for other in list(index):
+                    if (other != key and
+                            index[other].get('path') == info['path'] and
+                            index[other].get('mtime') != info['mtime']):
+                        self._delete(other, index.pop(other))
+            self._write_index(index)
+
+    def _delete(self, key, entry):
+        for k in entry.get('levels', []):
+            try:
+                os.remove(self._level_path(key, k))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Delete everything in the cache"""
+        with self._lock:
+            index = self._read_index()
+            for key, entry in index.items():
+                self._delete(key, entry)
+            self._write_index({})
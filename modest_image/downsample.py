@@ -0,0 +1,167 @@
+"""
+Block-reduction downsampling of image arrays.
+
+Rather than picking one pixel out of every block of ``sy x sx`` pixels
+(which is what striding does, and which makes isolated bright pixels
+disappear from zoomed-out views), the functions here combine all the pixels
+of each block with a reduction such as the mean or maximum.
+"""
+from __future__ import print_function, division
+
+import numpy as np
+
+from .chunked import bands, chunk_rows, map_bands
+from .lazy import is_lazy, compute, align_chunks
+
+# Upper bound on the number of source bytes read in one step by
+# reduce_window, so that reducing a region of a memmap never needs more than
+# a modest amount of memory.
+CHUNK_BYTES = 2 ** 25
+
+REDUCTIONS = ('mean', 'max', 'min', 'sum')
+
+_UFUNCS = {'mean': np.add, 'sum': np.add,
+           'max': np.maximum, 'min': np.minimum}
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def check_reduction(how):
+    """Raise a ValueError if ``how`` is not a valid reduction"""
+    if how is not None and how not in REDUCTIONS:
+        raise ValueError("downsample must be None or one of %s" %
+                         ', '.join(repr(r) for r in REDUCTIONS))
+
+
+def _result_dtype(dtype, how):
+    if how == 'mean':
+        return np.result_type(dtype, np.float32)
+    if how == 'sum':
+        return np.sum(np.zeros(1, dtype=dtype)).dtype
+    return dtype
+
+
+def _reduce_axis(data, step, axis, how):
+    """Reduce ``data`` over consecutive runs of ``step`` elements of axis"""
+    if step == 1:
+        return data
+
+    ufunc = _UFUNCS[how]
+    dtype = _result_dtype(data.dtype, how)
+    n = data.shape[axis]
+    nfull = n // step * step
+
+    def _slice(lo, hi):
+        return data[(slice(None),) * axis + (slice(lo, hi),)]
+
+    parts = []
+    if nfull > 0:
+        full = _slice(0, nfull)
+        shape = full.shape[:axis] + (nfull // step, step) + full.shape[axis + 1:]
+        parts.append(ufunc.reduce(full.reshape(shape), axis=axis + 1,
+                                  dtype=dtype))
+    if nfull < n:
+        rest = _slice(nfull, n)
+        parts.append(ufunc.reduce(rest, axis=axis, keepdims=True,
+                                  dtype=dtype))
+
+    result = parts[0] if len(parts) == 1 else np.concatenate(parts, axis=axis)
+
+    if how == 'mean':
+        counts = np.full(result.shape[axis], step, dtype=dtype)
+        counts[-1] = n - (result.shape[axis] - 1) * step
+        shape = [1] * result.ndim
+        shape[axis] = -1
+        result /= counts.reshape(shape)
+
+    return result
+
+
+def block_reduce(data, sy, sx, how='mean'):
+    """
+    Reduce each block of ``sy x sx`` pixels of an image to a single pixel.
+
+    The blocks start at the first row and column of ``data``, and the last
+    row and column of blocks may be smaller than the others if the image
+    dimensions are not multiples of the block size. Any trailing (color)
+    dimensions are preserved.
+
+    :param how: One of 'mean', 'max', 'min' or 'sum'
+
+    :rtype: array of shape (ceil(ny / sy), ceil(nx / sx), ...)
+    """
+    check_reduction(how)
+    data = np.asarray(data)
+    result = _reduce_axis(_reduce_axis(data, sy, 0, how), sx, 1, how)
+
+    # Integer color images need to stay integers to be understood by
+    # matplotlib as 0-255 RGB(A) values.
+    if (data.ndim == 3 and data.dtype.kind in 'ui' and
+            result.dtype != data.dtype):
+        if how == 'sum':
+            raise ValueError("'sum' downsampling is not supported for "
+                             "RGB(A) images")
+        result = np.round(result).astype(data.dtype)
+
+    return result
+
+
+def _reduce_lazy(region, sy, sx, how):
+    """
+    Block-reduce a lazy array with blocks of ``sy x sx`` pixels, reducing
+    each of its chunks in parallel
+    """
+    region = align_chunks(region, sy, sx)
+    # A tiny array tells us the data type of the result (or raises the
+    # same errors as the real one would)
+    dtype = block_reduce(np.zeros((2, 2) + region.shape[2:],
+                                  dtype=region.dtype), 2, 2, how).dtype
+    chunks = ((tuple(_ceil_div(c, sy) for c in region.chunks[0]),
+               tuple(_ceil_div(c, sx) for c in region.chunks[1])) +
+              region.chunks[2:])
+    reduced = region.map_blocks(block_reduce, sy, sx, how, dtype=dtype,
+                                chunks=chunks)
+    return compute(reduced)
+
+
+def reduce_window(data, x0, x1, sx, y0, y1, sy, how='mean',
+                  chunk_bytes=CHUNK_BYTES, parallel=True):
+    """
+    Block-reduce the region ``[y0:y1, x0:x1]`` of ``data`` with blocks of
+    ``sy x sx`` pixels.
+
+    This is the block-reduction analog of ``data[y0:y1:sy, x0:x1:sx]``, and
+    returns an array of the same shape. The region is read in bands of rows
+    that follow the chunking of ``data``, concurrently if ``parallel``, and
+    each band holds about ``chunk_bytes`` of the source array at most.
+
+    For lazy (dask) arrays, the region is reduced chunk by chunk by dask.
+    """
+    y1 = min(y1, data.shape[0])
+    x1 = min(x1, data.shape[1])
+    if is_lazy(data):
+        return _reduce_lazy(data[y0:y1, x0:x1], sy, sx, how)
+
+    ny, nx = _ceil_div(y1 - y0, sy), _ceil_div(x1 - x0, sx)
+
+    row_bytes = max(1, np.dtype(data.dtype).itemsize * (x1 - x0) *
+                    int(np.prod(data.shape[2:])))
+    max_rows = max(1, chunk_bytes // (sy * row_bytes))
+    band_list = bands(y0, ny, sy, chunk_rows(data), max_rows=max_rows)
+
+    def reduce_band(lo, hi):
+        band = data[y0 + lo * sy:min(y0 + hi * sy, y1), x0:x1]
+        return block_reduce(band, sy, sx, how)
+
+    # The first band tells us the data type of the result
+    first = reduce_band(*band_list[0])
+    out = np.empty((ny, nx) + first.shape[2:], dtype=first.dtype)
+    out[:len(first)] = first
+
+    def fill(lo, hi):
+        out[lo:hi] = reduce_band(lo, hi)
+
+    map_bands(fill, band_list[1:], parallel=parallel)
+    return out
@@ -0,0 +1,51 @@
+"""
+Support for lazily-evaluated arrays, such as dask arrays.
+
+Slicing a dask array only builds a task graph, and converting the result
+to a numpy array computes it. Doing that band by band, as for memmaps,
+would compute each overlapping chunk several times and run the threaded
+scheduler once per band. Instead, windows of lazy arrays are sliced (and
+block-reduced) as a single lazy operation, covering just the chunks in
+view, and computed at once, with dask working on the chunks in parallel.
+
+dask is optional; without it, no array is considered lazy.
+"""
+from __future__ import print_function, division
+
+import numpy as np
+
+try:
+    import dask
+    import dask.array as da
+except ImportError:
+    dask = da = None
+
+
+def is_lazy(data):
+    """Whether ``data`` is a lazily-evaluated (dask) array"""
+    return da is not None and isinstance(data, da.Array)
+
+
+def compute(*arrays):
+    """
+    Compute lazy arrays together, sharing any common chunks, and return
+    them as numpy arrays (a single array if only one is given)
+    """
+    results = [np.asarray(a) for a in dask.compute(*arrays)]
+    return results[0] if len(results) == 1 else results
+
+
+def align_chunks(data, sy, sx):
+    """
+    Rechunk ``data`` so that chunks along the image axes are whole multiples
+    of ``sy`` and ``sx`` (except the last ones), keeping them close to their
+    original size, and trailing (color) axes are in a single chunk. Blocks
+    of ``sy x sx`` pixels starting at the origin then never straddle chunks.
+    """
+    chunks = {}
+    for axis, step in ((0, sy), (1, sx)):
+        size = data.chunks[axis][0]
+        chunks[axis] = max(1, int(round(size / step))) * step
+    for axis in range(2, data.ndim):
+        chunks[axis] = -1
+    return data.rechunk(chunks)
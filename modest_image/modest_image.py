@@ -4,18 +4,114 @@ set_extent.
 """
 from __future__ import print_function, division
 
+import os
+from threading import Lock
+from timeit import default_timer
+
 import matplotlib
 rcParams = matplotlib.rcParams
 
 import matplotlib.image as mi
 import matplotlib.colors as mcolors
 import matplotlib.cbook as cbook
-from matplotlib.transforms import IdentityTransform, Affine2D
+from matplotlib.artist import allow_rasterization
+from matplotlib.transforms import IdentityTransform, Affine2D, Bbox
 
 import numpy as np
 
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # Python 2 without the futures backport
+    ThreadPoolExecutor = None
+
+from .pyramid import ImagePyramid
+from .downsample import reduce_window, check_reduction
+from .chunked import read_strided
+from .lazy import is_lazy
+from .autoscale import autoscale_limits, check_autoscale
+from .diskcache import OverviewStore
+from .colormap import Colormapper, colormap_key, data_span
+from .stats import DrawStats, ImageStats
+from .prefetch import Prefetcher, DEFAULT_PREFETCH_BYTES, covers
+from .tiles import (LRUCache, DEFAULT_TILE_SIZE, DEFAULT_CACHE_BYTES,
+                    tile_range, tile_bounds, tile_overlaps, assemble)
+from .source import DataSource
+from .bands import BandStack
+from .codec import pack, unpack, check_cache_dtype, check_cache_codec
+
 IDENTITY_TRANSFORM = IdentityTransform()
 
+# Margin, in pixels of the array, read around the view
+MARGIN = 5
+
+# Number of threads used to resample images in asynchronous mode
+ASYNC_WORKERS = 2
+_executor = None
+
+# Milliseconds between checks, from the GUI thread, for the end of a
+# background computation
+ASYNC_POLL_INTERVAL = 50
+
+
+# Number of points along each side of the grid sampling the view of an image
+# with a pixel_transform
+WARP_SAMPLES = 9
+
+# Default memory budget, in bytes, for the windows of the frames of a cube
+DEFAULT_FRAME_CACHE_BYTES = 2 ** 27
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS)
+    return _executor
+
+
+def _reset_executor():
+    # the threads of the pool do not survive in a forked child process
+    global _executor
+    _executor = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_executor)
+
+
+class _Frame(object):
+
+    """
+    One frame of a (frames, y, x) cube, as a 2D array-like which only reads
+    the parts of the frame that are sliced
+    """
+
+    def __init__(self, cube, index):
+        self.cube = cube
+        self.index = index
+        self.shape = tuple(cube.shape[1:])
+        self.dtype = cube.dtype
+        self.ndim = len(self.shape)
+        self.size = int(np.prod(self.shape))
+        chunks = getattr(cube, 'chunks', None)
+        if chunks:
+            self.chunks = chunks[1:]
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        return self.cube[(self.index,) + key]
+
+
+def frame_view(cube, index):
+    """
+    Frame ``index`` of a cube, without reading it. Indexing numpy and dask
+    arrays already does this; other array-likes (e.g. h5py datasets) are
+    wrapped.
+    """
+    if isinstance(cube, np.ndarray) or is_lazy(cube):
+        return cube[index]
+    return _Frame(cube, index)
+
 
 class ModestImage(mi.AxesImage):
 
@@ -30,26 +126,222 @@ class ModestImage(mi.AxesImage):
     computation since calculations of unresolved or clipped pixels
     are skipped.
 
+    Besides numpy arrays and memmaps, the data can be any array-like
+    supporting strided slicing, such as h5py datasets or zarr arrays.
+    Windows are read in bands of rows following the ``chunks`` layout of
+    the data (if it has one), using a small pool of threads. Dask arrays
+    are sliced and downsampled lazily, so only the chunks in view are ever
+    computed, and their color limits are estimated from a sample.
+
+    When autoscaling the color limits, ``autoscale`` selects how the limits
+    are found: 'full' (the default, scanning the whole array like
+    AxesImage), 'sample' or 'blocks' (estimating them from a sample of
+    pixels), or 'stream' (computing them in one bounded-memory pass).
+    Setting ``autoscale_percentile``, e.g. to (1, 99), clips the limits to
+    those percentiles of the data.
+
     The interface of ModestImage is the same as AxesImage. However, it
-    does not currently support setting the 'extent' property. There
-    may also be weird coordinate warping operations for images that
-    I'm not aware of. Don't expect those to work either.
+    does not currently support setting the 'extent' property.
+
+    Images whose pixels are not aligned with the axes (rotated, or warped
+    by a non-linear world coordinate system, as for sky images) can be
+    shown by setting ``pixel_transform`` to a matplotlib Transform from
+    array pixel coordinates (column, row, with pixel centers at integers)
+    to the data coordinates of the axes. The transform must be invertible.
+    The region of the array read is then the bounding box of a grid of
+    points covering the view, mapped back to pixel coordinates, and strides
+    are matched to the finest sampling the transform needs anywhere in the
+    view. Only that window is resampled by matplotlib through the
+    transform. The ``extent`` and ``origin`` are ignored in this case.
+
+    For very large (e.g. memory-mapped) arrays, setting ``pyramid=True``
+    makes ModestImage read zoomed-out views from lazily-built power-of-two
+    overviews of the data rather than striding through the full array.
+    Setting ``overview_cache`` to a directory (which implies
+    ``pyramid=True``) saves these overviews for file-backed arrays, so that
+    they can be memory-mapped rather than recomputed the next time the same
+    file is viewed.
+
+    Setting ``tile_size`` splits the view into tiles of (at most) that many
+    screen-matched pixels on a side, and keeps the colormapped tiles in a
+    least-recently-used cache (limited to ``tile_cache_size`` bytes), so that
+    panning only needs to compute the tiles which come into view. Since
+    tiles are colormapped before being handed to AxesImage, interpolation
+    happens in RGBA space rather than data space in this mode.
+
+    By default, zoomed-out views pick one pixel out of each block of pixels
+    covered by a screen pixel, which can make sparse features disappear.
+    Setting ``downsample`` to 'mean', 'max', 'min' or 'sum' instead combines
+    all the pixels in each block.
+
+    With ``asynchronous=True``, views that need a slow read of the array
+    (i.e. any decimated view not available from an already-built pyramid
+    level) are computed in a background thread. Until the result is ready,
+    the best data already in memory is drawn instead (a coarser pyramid
+    level, or the previous view), and the figure is redrawn when the
+    background computation finishes (which a timer of the canvas checks
+    for, so that the redraw is requested from the GUI thread).
+
+    The resampled window of data is kept independently of the norm and
+    colormap, so changing the color limits or colormap never re-reads the
+    array. With ``lut=True``, ModestImage also colormaps the window itself,
+    using lookup tables (a single lookup per pixel for integer data), so
+    that e.g. dragging a contrast slider costs one pass over screen-sized
+    data. As in tiled mode, interpolation then happens in RGBA space. By
+    default (``lut='auto'``), this is done for integer data shown with
+    'nearest' (or 'none') interpolation, without converting the window to
+    floating point. The colors are those AxesImage draws the window with,
+    but (from matplotlib 2.1, which rounds data by the range of the array
+    drawn) a few pixels can be one color off from the whole array drawn by
+    AxesImage.
+
+    With ``prefetch=True``, the motion of the view between draws is
+    extrapolated while panning or zooming, and the window the next view is
+    expected to need is computed in a background thread, and kept (within
+    ``prefetch_cache_size`` bytes) until it is drawn. When zooming, this
+    also builds the next pyramid level ahead of time.
+
+    A window read for one view is reused for later views it covers, as
+    long as it is no more than twice as finely sampled as they need. To
+    make this happen more often while panning and zooming, ``overscan``
+    reads that fraction of the view size beyond each edge of the view, and
+    ``quantize_strides=True`` rounds the strides down to powers of two, so
+    that small zoom steps give the same strides. The fraction of draws
+    reusing a window is ``stats.hit_rate``.
+
+    Several images can show the same array, and share its pyramids,
+    windows and tiles, by being given the same ``DataSource`` instead of the
+    array itself. These shared windows and tiles are kept in a process-wide
+    cache (see ``modest_image.source.set_cache_budget``).
+
+    Separate band arrays (e.g. one memmap per filter) can be shown as a
+    color composite by passing a list of three or four 2D arrays, or a
+    ``BandStack`` with the limits and stretch of each band, as the data.
+    Only the visible window of each band is read, and the windows are
+    composed to RGBA when drawing, so changing the stretch of a band does
+    not re-read the data.
+
+    To animate a (frames, y, x) cube, such as a time series or spectral
+    cube, pass it to ``set_cube`` and step through it with ``set_frame``.
+    Changing frame only reads the window of the new frame matching the
+    current view, and these windows are cached (within
+    ``frame_cache_size`` bytes), so looping over the frames again costs
+    nothing. With ``frame_prefetch=n``, the windows of the next n frames
+    are read in a background thread. Pyramids are not used for cubes.
+
+    To keep more windows within the memory budgets of the caches, cached
+    windows can be stored with ``cache_dtype`` 'float32', 'float16' or
+    'uint16' (quantized between the window's extreme values) instead of the
+    data's own floating point precision, and/or compressed with
+    ``cache_codec`` 'zlib' or 'bz2'. They are restored when drawn
+    again. In-memory pyramid levels are also kept at a floating point
+    ``cache_dtype``.
+
+    Views shown with 'nearest' (or 'none') interpolation on raster
+    backends, with linear axes, are drawn without the general resampling
+    of AxesImage: each row and column of the screen image is one row and
+    column of the window, so the screen pixels are picked with two index
+    arrays (exactly as the resampler would pick them), and only those are
+    colormapped. Set ``direct=False`` to always draw through AxesImage.
+
+    Windows of integer data, or of pyramid levels found to hold only
+    finite values, are drawn without masking invalid values, which saves a
+    copy of every window. Setting ``finite=True`` declares floating point
+    data to be free of NaN and infinite values, so no window is masked.
+
+    To pan and zoom interactively without redrawing the whole figure at
+    each step, attach a ``modest_image.blit.ImageBlitter``, which redraws
+    the image alone over a copy of the rest of the axes, and blits only the
+    damaged region of the canvas.
+
+    Each draw records a DrawStats, with the time spent in each phase of the
+    draw, the amount of data read and whether caches were hit. Their totals
+    are kept in ``stats``, and ``stats_callback`` (e.g.
+    ``modest_image.stats.log_stats``) is called with each of them.
     """
 
     def __init__(self, *args, **kwargs):
         self._full_res = None
         self._full_extent = kwargs.get('extent', None)
+        self._use_pyramid = False
+        self._pyramid = None
+        self._overview_store = None
+        self._downsample = None
+        self._tile_size = None
+        self._source = None
+        self._private_tiles = LRUCache(DEFAULT_CACHE_BYTES)
+        self._tiles = self._private_tiles
+        self._colormapper = Colormapper()
+        self._lut = 'auto'
+        self._span_cache = None
+        self._direct = True
+        self._blitter = None
+        self._finite = None
+        self._planned_slices = None
+        self._pixel_transform = None
+        self._cache_dtype = None
+        self._cache_codec = None
+        self._cube = None
+        self._frame = None
+        self._frame_windows = LRUCache(DEFAULT_FRAME_CACHE_BYTES)
+        self._frame_versions = {}
+        self._frame_prefetch = 0
+        self._frame_pending = set()
+        self._frame_lock = Lock()
+        self._overscan = 0.
+        self._quantize_strides = False
+        self._prefetch = False
+        self._prefetcher = Prefetcher(DEFAULT_PREFETCH_BYTES)
+        self._autoscale = 'full'
+        self._autoscale_percentile = None
+        self._asynchronous = False
+        self._async_lock = Lock()
+        self._generation = 0
+        self._async_request = None
+        self._async_future = None
+        self._async_done = None
+        self._async_timer = None
+        self._stats = ImageStats()
+        self._stats_callback = None
         super(ModestImage, self).__init__(*args, **kwargs)
         self.invalidate_cache()
 
-    def set_data(self, A):
+    def set_data(self, A, dirty=None):
         """
         Set the image array
 
-        ACCEPTS: numpy/PIL Image A
+        A can also be a DataSource, to share the data derived from the array
+        with other images using the same source, or a list of 3 or 4 band
+        arrays (or a BandStack) to show as a color composite.
+
+        If only part of the array has changed since the last call, e.g.
+        because it is being updated in place, pass the changed region as
+        ``dirty=(yslice, xslice)``. Only the cached data depending on that
+        region are then recomputed.
+
+        ACCEPTS: numpy/PIL Image A, DataSource, BandStack or list of bands
         """
+        if isinstance(A, (list, tuple)):
+            A = BandStack(A)
+        source = None
+        if isinstance(A, DataSource):
+            source, A = A, A.data
+        elif self._source is not None and A is self._source.data:
+            source = self._source
+
+        if (dirty is not None and self._full_res is not None and
+                source is self._source and
+                A.shape == self._full_res.shape and
+                A.dtype == self._full_res.dtype):
+            self._full_res = A
+            self._update_region(*dirty)
+            return
+
         self._full_res = A
         self._A = A
+        self._cube = self._frame = None
+        self._frame_windows.clear()
+        self._frame_versions.clear()
 
         if self._A.dtype != np.uint8 and not np.can_cast(self._A.dtype,
                                                          np.float):
@@ -59,10 +351,212 @@ class ModestImage(mi.AxesImage):
                 (self._A.ndim == 3 and self._A.shape[-1] not in (3, 4))):
                 raise TypeError("Invalid dimensions for image data")
 
+        self._set_source(source)
+        self._pyramid = None
+        self._clear_tiles()
+        self.invalidate_cache()
+
+    def set_cube(self, cube, frame=0):
+        """
+        Set a (frames, y, x) cube to show one frame of at a time, starting
+        with ``frame``
+
+        ACCEPTS: 3D array-like
+        """
+        if len(cube.shape) != 3:
+            raise TypeError("A cube must have 3 dimensions (frames, y, x)")
+        frame = self._frame_index(frame, cube.shape[0])
+        self.set_data(frame_view(cube, frame))
+        self._cube = cube
+        self._frame = frame
+
+    def get_cube(self):
+        """Return the cube set with set_cube, if any"""
+        return self._cube
+
+    def _frame_index(self, frame, nframes):
+        frame = int(frame)
+        if not -nframes <= frame < nframes:
+            raise IndexError("Frame %i is out of range for %i frames" %
+                             (frame, nframes))
+        return frame % nframes
+
+    def set_frame(self, frame):
+        """
+        Show another frame of the cube. The view (and so the region and
+        strides read) stays the same, and only the visible window of the new
+        frame is read, unless it is already cached.
+
+        ACCEPTS: int
+        """
+        if self._cube is None:
+            raise ValueError("No cube to take frames from: use set_cube")
+        frame = self._frame_index(frame, self._cube.shape[0])
+        if frame == self._frame:
+            return
+        self._frame = frame
+        self._full_res = frame_view(self._cube, frame)
+        # The tiles (and cached windows) of each frame are kept, so only
+        # the current view needs recomputing
         self.invalidate_cache()
+        self.stale = True
+
+    def get_frame(self):
+        """Return the index of the frame of the cube being shown"""
+        return self._frame
+
+    def set_frame_cache_size(self, nbytes):
+        """
+        Set the memory budget, in bytes, for the cached windows of the
+        frames of a cube
+
+        ACCEPTS: int
+        """
+        self._frame_windows.set_max_bytes(nbytes)
+
+    def get_frame_cache_size(self):
+        """Return the memory budget, in bytes, for cached frame windows"""
+        return self._frame_windows.max_bytes
+
+    def set_frame_prefetch(self, nframes):
+        """
+        Set how many of the next frames of a cube have their window read
+        in the background
+
+        ACCEPTS: int >= 0
+        """
+        nframes = int(nframes)
+        if nframes < 0:
+            raise ValueError("frame_prefetch must not be negative")
+        if nframes and ThreadPoolExecutor is None:
+            raise ImportError("Prefetching requires concurrent.futures "
+                              "(the 'futures' package on Python 2)")
+        self._frame_prefetch = nframes
+
+    def get_frame_prefetch(self):
+        """Return how many of the next frames of a cube are prefetched"""
+        return self._frame_prefetch
+
+    def _set_source(self, source):
+        """Start using a DataSource, or None for an array of our own"""
+        if source is self._source:
+            return
+        if self._source is not None:
+            self._source.detach(self)
+        self._source = source
+        if source is None:
+            self._tiles = self._private_tiles
+        else:
+            source.attach(self)
+            self._tiles = source.tiles
+
+    def get_source(self):
+        """Return the DataSource of the image, if it was given one"""
+        return self._source
+
+    def _clear_tiles(self):
+        """Empty the tile cache, unless it is shared with other images"""
+        if self._source is None:
+            self._tiles.clear()
+
+    def remove(self):
+        super(ModestImage, self).remove()
+        # release the shared caches if no other image uses them
+        self._set_source(None)
+
+    def update_region(self, patch, y0, x0):
+        """
+        Overwrite part of the image array with ``patch``, starting at row
+        ``y0`` and column ``x0``, and refresh the cached data that depend on
+        that region.
+        """
+        patch = np.asarray(patch)
+        y1, x1 = y0 + patch.shape[0], x0 + patch.shape[1]
+        self._full_res[y0:y1, x0:x1] = patch
+        self._update_region(slice(y0, y1), slice(x0, x1))
+
+    def _update_region(self, yslice, xslice):
+        """
+        Refresh the cached data that depend on the region [yslice, xslice]
+        of the full resolution array.
+        """
+        ny, nx = self._full_res.shape[:2]
+        y0, y1, ystep = yslice.indices(ny)
+        x0, x1, xstep = xslice.indices(nx)
+        if ystep != 1 or xstep != 1:
+            raise ValueError("Changed region must be given by contiguous "
+                             "slices")
+        if y1 <= y0 or x1 <= x0:
+            return
+
+        # A shared source refreshes all the images using it
+        if self._source is not None:
+            self._source.update(y0, y1, x0, x1)
+            return
+
+        if self._pyramid is not None:
+            self._pyramid.update(y0, y1, x0, x1, data=self._full_res)
+
+        shape = self._full_res.shape
+        self._tiles.discard(lambda key: tile_overlaps(key, y0, y1, x0, x1,
+                                                      shape))
+        self._refresh_region(y0, y1, x0, x1)
+
+    def _refresh_region(self, y0, y1, x0, x1):
+        """
+        Refresh the current view after the region [y0:y1, x0:x1] of the
+        full resolution array has changed (and the pyramid and tiles have
+        been updated).
+        """
+        self._cancel_async()
+        self._prefetcher.clear()
+        if self._cube is not None:
+            # Cached windows of this frame are stale, as are any being read
+            # in the background, which are put under the previous version
+            frame = self._frame
+            with self._frame_lock:
+                self._frame_versions[frame] = (
+                    self._frame_versions.get(frame, 0) + 1)
+            self._frame_windows.discard(lambda key: key[0] == frame)
+        bounds = self._bounds
+        if bounds is None:
+            return
+        if (x0 >= bounds[1] or x1 <= bounds[0] or
+                y0 >= bounds[3] or y1 <= bounds[2]):
+            self.stale = True
+            return
+
+        # The tiled view will be rebuilt from the tiles, only recomputing
+        # those which were discarded.
+        if self._tile_size is not None or self._is_preview:
+            self.invalidate_cache()
+            self.stale = True
+            return
+
+        # Otherwise, recompute the part of the current window covering
+        # the changed region.
+        wx0, wx1, wy0, wy1 = bounds
+        sx, sy = self._sx, self._sy
+        i0, i1 = (max(y0, wy0) - wy0) // sy, -(-(min(y1, wy1) - wy0) // sy)
+        j0, j1 = (max(x0, wx0) - wx0) // sx, -(-(min(x1, wx1) - wx0) // sx)
+        patch, _ = self._compute_window(wx0 + j0 * sx, min(wx0 + j1 * sx, wx1),
+                                        sx,
+                                        wy0 + i0 * sy, min(wy0 + i1 * sy, wy1),
+                                        sy)
+        A = self._window.copy()
+        A[i0:i1, j0:j1] = patch
+        self._A = self._window = A
+        self._colors_key = None
+        self.changed()
 
     def invalidate_cache(self):
+        self._cancel_async()
+        self._prefetcher.clear()
         self._bounds = None
+        self._window = None
+        self._colors_key = None
+        self._tile_key = None
+        self._is_preview = False
         self._imcache = None
         self._rgbacache = None
         self._oldxslice = None
@@ -71,6 +565,412 @@ class ModestImage(mi.AxesImage):
         self._pixel2world_cache = None
         self._world2pixel_cache = None
 
+    def set_pyramid(self, pyramid):
+        """
+        Set whether to read zoomed-out views from an image pyramid
+
+        ACCEPTS: bool
+        """
+        self._use_pyramid = bool(pyramid)
+        if not self._use_pyramid:
+            self._pyramid = None
+        self._clear_tiles()
+        self.invalidate_cache()
+        self.stale = True
+
+    def get_pyramid(self):
+        """Return whether an image pyramid is used for zoomed-out views"""
+        return self._use_pyramid
+
+    @property
+    def pyramid(self):
+        """
+        The ImagePyramid of the data, or None if pyramid mode is disabled.
+        Levels are built on demand, the first time they are needed.
+        """
+        if self._full_res is None or self._cube is not None:
+            return None
+        if not self._use_pyramid and self._overview_store is None:
+            return None
+        if self._source is not None:
+            return self._source.pyramid(self._downsample, self._overview_store,
+                                        self._level_dtype)
+        if self._pyramid is None:
+            self._pyramid = ImagePyramid(self._full_res, how=self._downsample,
+                                         store=self._overview_store,
+                                         level_dtype=self._level_dtype)
+        return self._pyramid
+
+    @property
+    def _level_dtype(self):
+        """The dtype pyramid levels are kept in, if not that of the data"""
+        if self._cache_dtype in ('float32', 'float16'):
+            return self._cache_dtype
+        return None
+
+    def set_overview_cache(self, directory):
+        """
+        Set the directory used to store the overviews of file-backed arrays
+        between sessions, or None to disable it. An OverviewStore instance
+        can be given instead of a directory.
+
+        ACCEPTS: str, OverviewStore or None
+        """
+        if directory is not None and not isinstance(directory, OverviewStore):
+            directory = OverviewStore(directory)
+        self._overview_store = directory
+        self._pyramid = None
+        self._clear_tiles()
+        self.invalidate_cache()
+        self.stale = True
+
+    def get_overview_cache(self):
+        """Return the OverviewStore used to keep overviews, if any"""
+        return self._overview_store
+
+    def set_downsample(self, how):
+        """
+        Set how blocks of pixels are combined in zoomed-out views. If None,
+        the array is strided, otherwise blocks are reduced with the given
+        function.
+
+        ACCEPTS: [None | 'mean' | 'max' | 'min' | 'sum']
+        """
+        check_reduction(how)
+        self._downsample = how
+        self._pyramid = None
+        self._clear_tiles()
+        self.invalidate_cache()
+        self.stale = True
+
+    def get_downsample(self):
+        """Return how blocks of pixels are combined in zoomed-out views"""
+        return self._downsample
+
+    def set_cache_dtype(self, dtype):
+        """
+        Set the precision that cached windows of floating point data (and
+        pyramid levels, for 'float32' and 'float16') are stored at, or None
+        to keep that of the data
+
+        ACCEPTS: [None | 'float32' | 'float16' | 'uint16']
+        """
+        check_cache_dtype(dtype)
+        self._cache_dtype = dtype
+        self._pyramid = None
+        self._clear_windows()
+        self._clear_tiles()
+        self.invalidate_cache()
+        self.stale = True
+
+    def get_cache_dtype(self):
+        """Return the precision cached windows are stored at"""
+        return self._cache_dtype
+
+    def set_cache_codec(self, codec):
+        """
+        Set how cached windows are compressed, or None to store them
+        uncompressed
+
+        ACCEPTS: [None | 'zlib' | 'bz2']
+        """
+        check_cache_codec(codec)
+        self._cache_codec = codec
+        self._clear_windows()
+        self.invalidate_cache()
+
+    def get_cache_codec(self):
+        """Return how cached windows are compressed"""
+        return self._cache_codec
+
+    def _pack(self, A):
+        return pack(A, dtype=self._cache_dtype, codec=self._cache_codec)
+
+    def _clear_windows(self):
+        """Forget the cached windows of frames, and prefetched windows"""
+        self._frame_windows.clear()
+        self._prefetcher.clear()
+
+    def set_tile_size(self, size):
+        """
+        Set the size of cached tiles, in screen-matched pixels, or None to
+        disable tiling
+
+        ACCEPTS: int or None
+        """
+        if size is True:
+            size = DEFAULT_TILE_SIZE
+        elif size is not None:
+            size = int(size)
+            if size < 1:
+                raise ValueError("Tile size must be positive")
+        self._tile_size = size
+        self._clear_tiles()
+        self.invalidate_cache()
+        self.stale = True
+
+    def get_tile_size(self):
+        """Return the tile size, or None if tiling is disabled"""
+        return self._tile_size
+
+    def set_tile_cache_size(self, nbytes):
+        """
+        Set the memory budget, in bytes, for cached colormapped tiles. For
+        an image using a DataSource, this is the budget of the cache shared
+        by all sources.
+
+        ACCEPTS: int
+        """
+        self._tiles.set_max_bytes(nbytes)
+
+    def get_tile_cache_size(self):
+        """Return the memory budget, in bytes, for cached tiles"""
+        return self._tiles.max_bytes
+
+    def set_lut(self, lut):
+        """
+        Set whether the resampled view is colormapped with lookup tables
+        before being handed to AxesImage. With 'auto', this is done for
+        integer data shown without interpolation.
+
+        ACCEPTS: [True | False | 'auto']
+        """
+        if lut != 'auto':
+            lut = bool(lut)
+        self._lut = lut
+        self.invalidate_cache()
+        self.stale = True
+
+    def get_lut(self):
+        """
+        Return whether the view is colormapped with lookup tables (True,
+        False or 'auto')
+        """
+        return self._lut
+
+    def set_direct(self, direct):
+        """
+        Set whether views shown without interpolation are drawn by picking
+        the screen pixels from the window directly, rather than by the
+        general resampling of AxesImage
+
+        ACCEPTS: [True | False]
+        """
+        self._direct = bool(direct)
+        self.stale = True
+
+    def get_direct(self):
+        """Return whether views may be drawn without AxesImage resampling"""
+        return self._direct
+
+    def _colormaps_window(self):
+        """Whether the window is colormapped before drawing it"""
+        if self._bands is not None:
+            return True
+        if self._lut != 'auto':
+            return self._lut
+        return (self._window.ndim == 2 and
+                self._window.dtype.kind in 'iu' and
+                self.get_interpolation() in ('nearest', 'none'))
+
+    @property
+    def stats(self):
+        """
+        ImageStats with the totals of the measurements made during draws,
+        and the DrawStats of the last draw (``stats.last``)
+        """
+        return self._stats
+
+    def set_stats_callback(self, func):
+        """
+        Set a function to be called with the DrawStats of each draw, or None
+
+        ACCEPTS: callable or None
+        """
+        self._stats_callback = func
+
+    def get_stats_callback(self):
+        """Return the function called with the DrawStats of each draw"""
+        return self._stats_callback
+
+    def set_overscan(self, overscan):
+        """
+        Set the fraction of the view size read beyond each edge of the view,
+        so that the window can be reused after panning or zooming out
+
+        ACCEPTS: float >= 0
+        """
+        overscan = float(overscan)
+        if overscan < 0:
+            raise ValueError("overscan must not be negative")
+        self._overscan = overscan
+        self.stale = True
+
+    def get_overscan(self):
+        """Return the fraction of the view size read beyond its edges"""
+        return self._overscan
+
+    def set_quantize_strides(self, quantize):
+        """
+        Set whether strides are rounded down to powers of two, so that
+        windows are reused between small zoom steps
+
+        ACCEPTS: bool
+        """
+        self._quantize_strides = bool(quantize)
+        self.stale = True
+
+    def get_quantize_strides(self):
+        """Return whether strides are rounded down to powers of two"""
+        return self._quantize_strides
+
+    def set_prefetch(self, prefetch):
+        """
+        Set whether the windows of predicted views are computed ahead of
+        time, in a background thread, while panning and zooming
+
+        ACCEPTS: bool
+        """
+        if prefetch and ThreadPoolExecutor is None:
+            raise ImportError("Prefetching requires concurrent.futures "
+                              "(the 'futures' package on Python 2)")
+        self._prefetch = bool(prefetch)
+        self._prefetcher.clear()
+
+    def get_prefetch(self):
+        """Return whether windows of predicted views are prefetched"""
+        return self._prefetch
+
+    def set_prefetch_cache_size(self, nbytes):
+        """
+        Set the memory budget, in bytes, for prefetched windows
+
+        ACCEPTS: int
+        """
+        self._prefetcher.windows.set_max_bytes(nbytes)
+
+    def get_prefetch_cache_size(self):
+        """Return the memory budget, in bytes, for prefetched windows"""
+        return self._prefetcher.windows.max_bytes
+
+    def set_finite(self, finite):
+        """
+        Set whether the data are known to contain only finite values (True),
+        may contain NaN or infinite values (False), or None to decide from
+        the dtype of the data and the contents of pyramid levels. Windows of
+        finite data are drawn without masking them.
+
+        ACCEPTS: bool or None
+        """
+        self._finite = None if finite is None else bool(finite)
+        self._clear_tiles()
+        self.invalidate_cache()
+        self.stale = True
+
+    def get_finite(self):
+        """Return whether the data are known to contain only finite values"""
+        return self._finite
+
+    def set_asynchronous(self, asynchronous):
+        """
+        Set whether slow resampling happens in a background thread
+
+        ACCEPTS: bool
+        """
+        if asynchronous and ThreadPoolExecutor is None:
+            raise ImportError("Asynchronous mode requires concurrent.futures "
+                              "(the 'futures' package on Python 2)")
+        self._asynchronous = bool(asynchronous)
+        self.invalidate_cache()
+        self.stale = True
+
+    def get_asynchronous(self):
+        """Return whether slow resampling happens in a background thread"""
+        return self._asynchronous
+
+    def set_autoscale(self, mode):
+        """
+        Set how color limits are found when autoscaling
+
+        ACCEPTS: ['full' | 'sample' | 'blocks' | 'stream']
+        """
+        check_autoscale(mode)
+        self._autoscale = mode
+
+    def get_autoscale(self):
+        """Return how color limits are found when autoscaling"""
+        return self._autoscale
+
+    def set_autoscale_percentile(self, percentile):
+        """
+        Set the (lo, hi) percentiles that autoscaled color limits are
+        clipped to, or None to use the minimum and maximum
+
+        ACCEPTS: (float, float) or None
+        """
+        if percentile is not None:
+            lo, hi = percentile
+            if not 0 <= lo < hi <= 100:
+                raise ValueError("Percentiles must satisfy 0 <= lo < hi <= 100")
+            percentile = (lo, hi)
+        self._autoscale_percentile = percentile
+
+    def get_autoscale_percentile(self):
+        """Return the percentiles that autoscaled color limits are clipped to"""
+        return self._autoscale_percentile
+
+    def _autoscale_values(self):
+        """
+        Values to autoscale the norm to: the whole array, or an estimate of
+        its limits. None if there are no finite values to estimate from, or
+        the norm is not used (for band stacks).
+        """
+        if self._bands is not None:
+            return None
+        if (self._autoscale == 'full' and self._autoscale_percentile is None
+                and not is_lazy(self._full_res)):
+            return self._full_res
+        vmin, vmax = autoscale_limits(self._full_res, self._autoscale,
+                                      self._autoscale_percentile)
+        if vmin is None:
+            return None
+        return np.array([vmin, vmax])
+
+    def autoscale(self):
+        """
+        Autoscale the scalar limits on the norm instance using the
+        full resolution array, as specified by the autoscale property
+        """
+        if self._full_res is None:
+            raise TypeError('You must first set_array for mappable')
+        values = self._autoscale_values()
+        if values is not None:
+            self.norm.autoscale(values)
+        self.changed()
+
+    def autoscale_None(self):
+        """
+        Autoscale the scalar limits on the norm instance using the
+        full resolution array, changing only limits that are None
+        """
+        if self._full_res is None:
+            raise TypeError('You must first set_array for mappable')
+        values = self._autoscale_values()
+        if values is not None:
+            self.norm.autoscale_None(values)
+        self.changed()
+
+    def _autoscale_norm(self):
+        """
+        Set any unset limits of the norm from the data before colormapping,
+        without notifying observers (as AxesImage does when drawing)
+        """
+        if self.norm.scaled():
+            return
+        values = self._autoscale_values()
+        if values is not None:
+            self.norm.autoscale_None(values)
+
     def set_extent(self, extent):
         self._full_extent = extent
         self.invalidate_cache()
@@ -80,6 +980,67 @@ class ModestImage(mi.AxesImage):
         """Override to return the full-resolution array"""
         return self._full_res
 
+    def set_pixel_transform(self, transform):
+        """
+        Set the transform from array pixel coordinates (column, row) to the
+        data coordinates of the axes, or None to place the image with its
+        extent
+
+        ACCEPTS: invertible Transform or None
+        """
+        self._pixel_transform = transform
+        self.invalidate_cache()
+        self.stale = True
+
+    def get_pixel_transform(self):
+        """Return the transform from pixel to data coordinates, if any"""
+        return self._pixel_transform
+
+    def get_transform(self):
+        if self._pixel_transform is None:
+            return super(ModestImage, self).get_transform()
+        # windows are placed in pixel coordinates, and warped by matplotlib
+        return self._pixel_transform + self.axes.transData
+
+    def _world_outline(self, x0, x1, y0, y1, samples=WARP_SAMPLES):
+        """
+        Points along the edges of the region [y0:y1, x0:x1] of the array,
+        in data coordinates. Points outside the domain of the transform are
+        left out.
+        """
+        xs = np.linspace(x0 - .5, x1 - .5, samples)
+        ys = np.linspace(y0 - .5, y1 - .5, samples)
+        edges = [np.column_stack([xs, np.full(samples, ys[0])]),
+                 np.column_stack([xs, np.full(samples, ys[-1])]),
+                 np.column_stack([np.full(samples, xs[0]), ys]),
+                 np.column_stack([np.full(samples, xs[-1]), ys])]
+        outline = self._pixel2world.transform(np.vstack(edges))
+        return outline[np.isfinite(outline).all(axis=1)]
+
+    def _update_datalim(self):
+        """
+        Include the whole (warped) image in the data limits of the axes,
+        and autoscale to it, as AxesImage.set_extent does
+        """
+        ny, nx = self._full_res.shape[:2]
+        outline = self._world_outline(0, nx, 0, ny)
+        if len(outline) == 0:
+            return
+        self.axes.update_datalim(outline)
+        (xmin, ymin), (xmax, ymax) = outline.min(axis=0), outline.max(axis=0)
+        if self.axes._autoscaleXon:
+            self.axes.set_xlim((xmin, xmax), auto=None)
+        if self.axes._autoscaleYon:
+            self.axes.set_ylim((ymin, ymax), auto=None)
+
+    def get_window_extent(self, renderer=None):
+        if self._pixel_transform is None or self._bounds is None:
+            return super(ModestImage, self).get_window_extent(renderer)
+        x0, x1, y0, y1 = self._bounds
+        outline = self.axes.transData.transform(
+            self._world_outline(x0, x1, y0, y1))
+        return Bbox.from_extents(outline.min(axis=0), outline.max(axis=0))
+
     @property
     def _pixel2world(self):
 
@@ -91,7 +1052,11 @@ class ModestImage(mi.AxesImage):
 
             extent = self._full_extent
 
-            if extent is None:
+            if self._pixel_transform is not None:
+
+                self._pixel2world_cache = self._pixel_transform
+
+            elif extent is None:
 
                 self._pixel2world_cache = IDENTITY_TRANSFORM
 
@@ -116,31 +1081,434 @@ class ModestImage(mi.AxesImage):
             self._world2pixel_cache = self._pixel2world.inverted()
         return self._world2pixel_cache
 
-    def _scale_to_res(self):
+    def _scale_to_res(self, stats=None):
         """
         Change self._A and _extent to render an image whose resolution is
         matched to the eventual rendering.
+
+        Measurements are recorded in the DrawStats ``stats``, if given.
         """
+        if stats is None:
+            stats = DrawStats()
 
         # Find out how we need to slice the array to make sure we match the
         # resolution of the display. We pass self._world2pixel which matters
-        # for cases where the extent has been set.
-        x0, x1, sx, y0, y1, sy = extract_matched_slices(axes=self.axes,
-                                                        shape=self._full_res.shape,
-                                                        transform=self._world2pixel)
-
-        # Check whether we've already calculated what we need, and if so just
-        # return without doing anything further.
-        if (self._bounds is not None and
-                sx >= self._sx and sy >= self._sy and
-                x0 >= self._bounds[0] and x1 <= self._bounds[1] and
-                y0 >= self._bounds[2] and y1 <= self._bounds[3]):
-            return
+        # for cases where the extent has been set. A SlicePlanner may have
+        # done this for all the images of the figure already.
+        with stats.phase('slices'):
+            planned, self._planned_slices = self._planned_slices, None
+            if planned is not None:
+                x0, x1, sx, y0, y1, sy = planned
+            elif self._pixel_transform is not None:
+                x0, x1, sx, y0, y1, sy = warped_slices(
+                    self.axes, self._full_res.shape, self._pixel_transform,
+                    overscan=self._overscan,
+                    quantize=self._quantize_strides)
+            else:
+                x0, x1, sx, y0, y1, sy = extract_matched_slices(
+                    axes=self.axes, shape=self._full_res.shape,
+                    transform=self._world2pixel, overscan=self._overscan,
+                    quantize=self._quantize_strides)
+
+        tiled = self._tile_size is not None
+        if tiled:
+            sx, sy = self._tile_strides(sx, sy)
+
+        # The colors of tiles depend on the colormapping, so a cached tiled
+        # view is only valid if that hasn't changed.
+        key = None
+        if tiled:
+            self._autoscale_norm()
+            key = self._colormap_key()
+
+        if self._asynchronous:
+            self._apply_async_result()
+
+        request = (x0, x1, sx, y0, y1, sy)
+
+        # Check whether we've already calculated what we need, and if so
+        # don't do anything further.
+        if key == self._tile_key and self._window_cached(*request):
+            stats.cache = 'hit'
+        elif self._asynchronous and self._needs_background(sx, sy):
+            self._request_async(request, key)
+            stats.cache = 'preview' if self._is_preview else 'pending'
+        else:
+            found = None
+            if self._prefetch:
+                with stats.phase('read'):
+                    found = self._prefetcher.find(request, key)
+            if found is not None:
+                stats.cache = 'prefetch'
+                with stats.phase('codec'):
+                    A, geometry = unpack(found[0]), found[1]
+            else:
+                stats.cache = 'miss'
+                A, geometry = self._compute_window(*request, key=key,
+                                                   stats=stats)
+            self._tile_key = key
+            self._set_window(A, *geometry)
+
+        if self._cube is not None and self._frame_prefetch and not tiled:
+            self._prefetch_frames(request)
+
+        if self._prefetch:
+            # tiled views are prefetched by warming the tile cache
+            self._prefetcher.update(request, key, self._compute_window,
+                                    _get_executor().submit,
+                                    self._full_res.shape, store=not tiled,
+                                    pack=self._pack)
+
+    def _compute_window(self, x0, x1, sx, y0, y1, sy, key=None, stats=None):
+        """
+        Compute the array to draw for the slice [y0:y1:sy, x0:x1:sx] of the
+        full resolution array, and the effective slice parameters.
+
+        If ``key`` is given, the array is assembled from colormapped tiles
+        for that colormap key. This does not modify the state of the artist,
+        so can be run in a background thread.
+        """
+        if stats is None:
+            stats = DrawStats()
+        if key is not None:
+            return self._compute_tiled(x0, x1, sx, y0, y1, sy, key, stats)
+
+        if self._cube is not None:
+            return self._frame_window(self._cube, self._frame,
+                                      (x0, x1, sx, y0, y1, sy), stats)
+
+        # Another image using the same source may have read this window
+        source = self._source
+        if source is not None:
+            window_key = ((x0, x1, sx, y0, y1, sy), self._downsample,
+                          self.pyramid is not None, self._finite,
+                          self._level_dtype)
+            found = source.windows.get(window_key)
+            if found is not None:
+                stats.cache = 'shared'
+                with stats.phase('codec'):
+                    return unpack(found[0]), found[1]
 
         # Slice the array using the slices determined previously to optimally
-        # match the display
-        self._A = self._full_res[y0:y1:sy, x0:x1:sx]
-        self._A = cbook.safe_masked_invalid(self._A)
+        # match the display. When reading from a pyramid level the slice
+        # parameters are adjusted to the (slightly larger) region actually
+        # read.
+        with stats.phase('read'):
+            A, geometry = self._read_window(x0, x1, sx, y0, y1, sy)
+        stats.bytes_read += A.nbytes
+        with stats.phase('mask'):
+            A = self._mask_invalid(A, sx, sy)
+
+        if source is not None:
+            with stats.phase('codec'):
+                packed = self._pack(A)
+            source.windows.put(window_key, (packed, geometry),
+                               nbytes=packed.nbytes)
+        return A, geometry
+
+    def _frame_key(self, frame, request):
+        return (frame, self._frame_versions.get(frame, 0), request,
+                self._downsample, self._finite)
+
+    def _frame_window(self, cube, frame, request, stats=None):
+        """
+        The window (and its slice parameters) of a frame of a cube for the
+        request (x0, x1, sx, y0, y1, sy), from the frame cache or read
+        """
+        if stats is None:
+            stats = DrawStats()
+        key = self._frame_key(frame, request)
+        found = self._frame_windows.get(key)
+        if found is not None:
+            stats.cache = 'frame'
+            with stats.phase('codec'):
+                return unpack(found[0]), found[1]
+
+        with stats.phase('read'):
+            A, geometry = self._read_window(*request,
+                                            data=frame_view(cube, frame))
+        stats.bytes_read += A.nbytes
+        with stats.phase('mask'):
+            A = self._mask_invalid(A)
+        if cube is self._cube:
+            with stats.phase('codec'):
+                packed = self._pack(A)
+            self._frame_windows.put(key, (packed, geometry), packed.nbytes)
+        return A, geometry
+
+    def _prefetch_frames(self, request):
+        """Read the windows of the next frames for ``request`` in the background"""
+        cube = self._cube
+        nframes = cube.shape[0]
+        for step in range(1, min(self._frame_prefetch, nframes - 1) + 1):
+            frame = (self._frame + step) % nframes
+            key = self._frame_key(frame, request)
+            with self._frame_lock:
+                if key in self._frame_pending or key in self._frame_windows:
+                    continue
+                self._frame_pending.add(key)
+            _get_executor().submit(self._prefetch_frame, cube, frame,
+                                   request, key)
+
+    def _prefetch_frame(self, cube, frame, request, key):
+        try:
+            self._frame_window(cube, frame, request)
+        finally:
+            with self._frame_lock:
+                self._frame_pending.discard(key)
+
+    def _mask_invalid(self, A, sx=None, sy=None):
+        """
+        Mask the invalid (NaN or infinite) values of a window, read with
+        strides (sx, sy) if known. This, and the copy of the window it
+        makes, is skipped when the window cannot contain invalid values.
+        """
+        if self._maybe_invalid(A, sx, sy):
+            return cbook.safe_masked_invalid(A)
+        A = np.asarray(A)
+        if not A.dtype.isnative:
+            A = A.byteswap().newbyteorder()
+        return A
+
+    def _maybe_invalid(self, A, sx, sy):
+        """
+        Whether a window read with strides (sx, sy) may contain invalid
+        values: never for integer data, as given by ``finite`` if set, and
+        otherwise unless the pyramid level it was read from is finite.
+        """
+        if A.dtype.kind not in 'fc':
+            return False
+        if self._finite is not None:
+            return not self._finite
+        pyramid = self.pyramid
+        if pyramid is None or sx is None:
+            return True
+        return not pyramid.finite(pyramid.level_for(sx, sy))
+
+    def _tile_strides(self, sx, sy):
+        """
+        Snap the strides to the pyramid level they will be read from, so
+        that tiles line up with the pixels of that level.
+        """
+        pyramid = self.pyramid
+        if pyramid is not None:
+            f = 2 ** pyramid.level_for(sx, sy)
+            sx, sy = sx // f * f, sy // f * f
+        return sx, sy
+
+    def _compute_tiled(self, x0, x1, sx, y0, y1, sy, key, stats):
+        """
+        Version of _compute_window which builds the view from colormapped
+        tiles
+        """
+        ny, nx = self._full_res.shape[:2]
+        size = self._tile_size
+        # Tiles of different sizes or read differently (which may share a
+        # DataSource) must not be confused
+        read_key = (size, self._downsample, self.pyramid is not None,
+                    self._frame)
+        xtiles = tile_range(x0, x1, sx, size)
+        ytiles = tile_range(y0, y1, sy, size)
+
+        rows = []
+        for ty in ytiles:
+            ty0, ty1 = tile_bounds(ty, sy, size, ny)
+            row = []
+            for tx in xtiles:
+                tile_key = (sx, sy, ty, tx) + read_key + key
+                rgba = self._tiles.get(tile_key)
+                if rgba is None:
+                    stats.tile_misses += 1
+                    tx0, tx1 = tile_bounds(tx, sx, size, nx)
+                    with stats.phase('read'):
+                        A, _ = self._read_window(tx0, tx1, sx, ty0, ty1, sy)
+                    stats.bytes_read += A.nbytes
+                    with stats.phase('mask'):
+                        A = self._mask_invalid(A, sx, sy)
+                    with stats.phase('colormap'):
+                        rgba = self._colorize(A)
+                    self._tiles.put(tile_key, rgba)
+                else:
+                    stats.tile_hits += 1
+                row.append(rgba)
+            rows.append(row)
+
+        x0 = tile_bounds(xtiles[0], sx, size, nx)[0]
+        x1 = tile_bounds(xtiles[-1], sx, size, nx)[1]
+        y0 = tile_bounds(ytiles[0], sy, size, ny)[0]
+        y1 = tile_bounds(ytiles[-1], sy, size, ny)[1]
+
+        return assemble(rows), (x0, x1, sx, y0, y1, sy)
+
+    def _needs_background(self, sx, sy):
+        """
+        Whether reading a view with strides (sx, sy) may be slow, i.e. is
+        decimated and not available from an already-built pyramid level.
+        """
+        if sx == 1 and sy == 1:
+            return False
+        pyramid = self.pyramid
+        if pyramid is None:
+            return True
+        return not pyramid.has_level(pyramid.level_for(sx, sy))
+
+    def _request_async(self, request, key):
+        """
+        Start computing a view in the background (unless that is already
+        happening), and meanwhile show a quick preview if one is available.
+        """
+        if self._async_request != (request, key):
+            self._cancel_async()
+            self._async_request = (request, key)
+            self._async_future = _get_executor().submit(
+                self._compute_async, self._generation, request, key)
+
+        pyramid = self.pyramid
+        preview = pyramid.preview(*request) if pyramid is not None else None
+        if preview is not None:
+            A, geometry = preview
+            self._tile_key = None
+            self._set_window(self._mask_invalid(A), *geometry)
+            self._is_preview = True
+
+    def _compute_async(self, generation, request, key):
+        """Run in a background thread to compute a requested view"""
+        if generation != self._generation:
+            return
+        A, geometry = self._compute_window(*request, key=key)
+        with self._async_lock:
+            if generation != self._generation:
+                return
+            self._async_done = (A, geometry, key)
+
+    def _watch_async(self):
+        """
+        Start a timer of the canvas which redraws the figure once the
+        pending background computation finishes. The timer runs in the GUI
+        thread, which is the only one allowed to request draws.
+        """
+        canvas = self.figure.canvas if self.figure is not None else None
+        if canvas is None:
+            return
+        if self._async_timer is None or self._async_timer[0] is not canvas:
+            timer = canvas.new_timer(interval=ASYNC_POLL_INTERVAL)
+            timer.add_callback(self._poll_async)
+            self._async_timer = (canvas, timer)
+        self._async_timer[1].start()
+
+    def _poll_async(self):
+        """
+        Timer callback: request a draw if the background computation has
+        finished (or failed)
+        """
+        future = self._async_future
+        if future is not None and not future.done():
+            return
+        canvas, timer = self._async_timer
+        timer.stop()
+        if (future is not None and self.figure is not None and
+                canvas is self.figure.canvas):
+            canvas.draw_idle()
+
+    def _apply_async_result(self):
+        """Use the result of a finished background computation, if any"""
+        future = self._async_future
+        if (future is not None and future.done() and not future.cancelled()
+                and future.exception() is not None):
+            # re-raise any exception from the background thread
+            self._async_future = self._async_request = None
+            future.result()
+        with self._async_lock:
+            done, self._async_done = self._async_done, None
+        if done is not None:
+            A, geometry, key = done
+            self._async_request = None
+            self._async_future = None
+            self._tile_key = key
+            self._set_window(A, *geometry)
+
+    def _cancel_async(self):
+        """Discard any pending or finished background computation"""
+        with self._async_lock:
+            self._generation += 1
+            self._async_done = None
+            if self._async_future is not None:
+                self._async_future.cancel()
+            self._async_future = None
+            self._async_request = None
+
+    @property
+    def _bands(self):
+        """The BandStack being shown, if any"""
+        if isinstance(self._full_res, BandStack):
+            return self._full_res
+        return None
+
+    def _colormap_key(self):
+        """
+        Hashable summary of the norm and colormap (or band stretches), which
+        changes whenever the colors the image data map to do.
+        """
+        if self._bands is not None:
+            return ('bands',) + self._bands.key
+        return colormap_key(self.norm, self.cmap)
+
+    def _window_span(self):
+        """
+        The ``data_span`` of the current window, by which AxesImage would
+        rescale it when drawing it
+        """
+        window = self._window
+        if self._span_cache is None or self._span_cache[0] is not window:
+            self._span_cache = (window, data_span(window))
+        return self._span_cache[1]
+
+    def _colorize(self, A, span=None):
+        """
+        Colormap a window of data to uint8 RGBA. With the ``span`` of the
+        window, the colors are those AxesImage draws the window with.
+        """
+        if self._bands is not None:
+            return self._bands.compose(A)
+        if A.ndim == 3:
+            return self.to_rgba(A, bytes=True)
+        return self._colormapper(A, self.norm, self.cmap, span=span)
+
+    def _update_colors(self):
+        """
+        Colormap the current window of data, if the norm or colormap have
+        changed since it was last done.
+        """
+        window = self._window
+        if self._tile_key is not None or (window.ndim == 3 and
+                                          self._bands is None):
+            # already colormapped
+            return
+        self._autoscale_norm()
+        key = self._colormap_key()
+        if key != self._colors_key:
+            self._A = self._colorize(window, self._window_span())
+            self._colors_key = key
+
+    def _window_cached(self, x0, x1, sx, y0, y1, sy):
+        """
+        Whether the current window already covers the requested slice at
+        sufficient resolution (but not so much more that drawing it would
+        be wasteful).
+        """
+        if self._bounds is None or self._is_preview:
+            return False
+        bx0, bx1, by0, by1 = self._bounds
+        return covers((bx0, bx1, self._sx, by0, by1, self._sy),
+                      (x0, x1, sx, y0, y1, sy))
+
+    def _set_window(self, A, x0, x1, sx, y0, y1, sy):
+        """
+        Make A, the slice [y0:y1:sy, x0:x1:sx] of the full resolution array,
+        the array to be drawn.
+        """
+        self._A = self._window = A
+        self._colors_key = None
 
         # We now determine the extent of the subset of the image, by determining
         # it first in pixel space, and converting it to the 'world' coordinates.
@@ -149,6 +1517,19 @@ class ModestImage(mi.AxesImage):
         # demonstration of why origin='upper' and extent=None needs to be
         # special-cased.
 
+        if self._pixel_transform is not None:
+            # The window is placed in pixel coordinates, with row y at y
+            # whatever the origin, and get_transform maps these to display
+            if self.origin == 'upper':
+                self._extent = (x0 - .5, x1 - .5, y1 - .5, y0 - .5)
+            else:
+                self._extent = (x0 - .5, x1 - .5, y0 - .5, y1 - .5)
+            self._sx, self._sy = sx, sy
+            self._bounds = (x0, x1, y0, y1)
+            self._is_preview = False
+            self.changed()
+            return
+
         if self.origin == 'upper' and self._full_extent is None:
             xmin, xmax, ymin, ymax = x0 - .5, x1 - .5, y1 - .5, y0 - .5
         else:
@@ -164,14 +1545,189 @@ class ModestImage(mi.AxesImage):
         self._sx = sx
         self._sy = sy
         self._bounds = (x0, x1, y0, y1)
+        self._is_preview = False
 
         self.changed()
 
+    def _read_window(self, x0, x1, sx, y0, y1, sy, data=None):
+        """
+        Read the data for the slice ``[y0:y1:sy, x0:x1:sx]`` of the full
+        resolution array (or of ``data``, if given), returning the data and
+        the effective slice parameters.
+        """
+        if data is None:
+            pyramid = self.pyramid
+            if pyramid is not None:
+                return pyramid.extract(x0, x1, sx, y0, y1, sy)
+            data = self._full_res
+        if self._downsample is not None:
+            A = reduce_window(data, x0, x1, sx, y0, y1, sy, self._downsample)
+        else:
+            A = read_strided(data, x0, x1, sx, y0, y1, sy)
+        return A, (x0, x1, sx, y0, y1, sy)
+
+    def make_image(self, renderer, magnification=1.0, unsampled=False):
+        A = self._A
+        if A.ndim == 2 and not np.ma.isMaskedArray(A):
+            # Windows which cannot hold invalid values are not masked, but
+            # AxesImage reads the mask of the data (from matplotlib 2.1).
+            # This view does not copy the window.
+            self._A = np.ma.array(A, mask=np.ma.nomask, copy=False)
+        try:
+            return super(ModestImage, self).make_image(
+                renderer, magnification=magnification, unsampled=unsampled)
+        finally:
+            self._A = A
+
+    @allow_rasterization
     def draw(self, renderer, *args, **kwargs):
         if self._full_res.shape is None:
             return
-        self._scale_to_res()
-        super(ModestImage, self).draw(renderer, *args, **kwargs)
+        if (self._blitter is not None and not self._blitter.drawing and
+                not self.figure.canvas.is_saving()):
+            # drawn by the ImageBlitter, over the rest of the figure
+            return
+        t0 = default_timer()
+        stats = DrawStats()
+        self._scale_to_res(stats)
+        if self._async_future is not None:
+            self._watch_async()
+        # If bounds is None, there is nothing to show until a background
+        # computation finishes
+        if self._bounds is not None:
+            if self._colormaps_window():
+                with stats.phase('colormap'):
+                    self._update_colors()
+            elif self._colors_key is not None:
+                # e.g. the interpolation changed: AxesImage colormaps
+                self._A = self._window
+                self._colors_key = None
+            with stats.phase('render'):
+                if self._draws_directly(renderer):
+                    self._draw_direct(renderer)
+                else:
+                    self._draw_resampled(renderer, *args, **kwargs)
+            stats.shape = self._window.shape[:2]
+            stats.strides = (self._sx, self._sy)
+            stats.bounds = self._bounds
+        stats.total = default_timer() - t0
+        self._record_stats(stats)
+
+    def _draw_resampled(self, renderer, *args, **kwargs):
+        """
+        Draw the window with AxesImage.draw, whose rasterization and agg
+        filter this draw has already started
+        """
+        rasterized, agg_filter = self._rasterized, self._agg_filter
+        self._rasterized = self._agg_filter = None
+        try:
+            super(ModestImage, self).draw(renderer, *args, **kwargs)
+        finally:
+            self._rasterized, self._agg_filter = rasterized, agg_filter
+
+    def _draws_directly(self, renderer):
+        """
+        Whether the window can be drawn with ``_draw_direct``: for raster
+        renderers, without interpolation or agg filter, and with an
+        axis-aligned affine transform to the screen
+        """
+        if (not self._direct or self._pixel_transform is not None or
+                self.get_interpolation() not in ('nearest', 'none') or
+                self.get_agg_filter() is not None or
+                renderer.option_scale_image()):
+            return False
+        trans = self.get_transform()
+        if not trans.is_affine:
+            return False
+        matrix = trans.get_matrix()
+        return matrix[0, 1] == 0 and matrix[1, 0] == 0
+
+    def _screen_image(self, magnification=1.0):
+        """
+        The RGBA image of the window at the resolution of the screen, with
+        the position of its lower left corner, or None if the image is out
+        of view.
+
+        The output image is the one AxesImage.make_image gives with nearest
+        neighbour interpolation, but since the transform is axis-aligned,
+        each of its rows (columns) is a single row (column) of the window:
+        these are picked with two index arrays, and only the picked pixels
+        are colormapped.
+        """
+        A = self._A
+        ny, nx = A.shape[:2]
+        x0, x1, y0, y1 = self.get_extent()
+        in_bbox = Bbox([[x0, y0], [x1, y1]])
+        out_bbox = in_bbox.transformed(self.get_transform())
+        clipped = Bbox.intersection(out_bbox, self.axes.bbox)
+        if clipped is None:
+            return None
+        width = clipped.width * magnification
+        height = clipped.height * magnification
+        if width == 0 or height == 0:
+            return None
+
+        # The transform from the window to the output image, as in
+        # AxesImage._make_image
+        if self.origin == 'upper':
+            t = Affine2D().translate(0, -ny).scale(1, -1)
+        else:
+            t = Affine2D()
+        t.scale(in_bbox.width / nx, in_bbox.height / ny)
+        t.translate(in_bbox.x0, in_bbox.y0)
+        t = Affine2D(np.dot(self.get_transform().get_matrix(),
+                            t.get_matrix()))
+        t.translate(-clipped.x0, -clipped.y0)
+        t.scale(magnification, magnification)
+        out_width, out_height = int(np.ceil(width)), int(np.ceil(height))
+        t.scale(out_width / width, out_height / height)
+
+        # The window pixel under the center of each output pixel
+        inverse = np.linalg.inv(t.get_matrix())
+        cols = nearest_pixels(out_width, inverse[0, 0], inverse[0, 2],
+                              span=True)
+        rows = nearest_pixels(out_height, inverse[1, 1], inverse[1, 2])
+        valid_cols = (cols >= 0) & (cols < nx)
+        valid_rows = (rows >= 0) & (rows < ny)
+
+        picked = A.take(np.clip(rows, 0, ny - 1), axis=0)
+        picked = picked.take(np.clip(cols, 0, nx - 1), axis=1)
+        if self._colors_key is None and self._tile_key is None:
+            self._autoscale_norm()
+            picked = self._colorize(picked, self._window_span())
+        rgba = np.array(picked, dtype=np.uint8, order='C')
+        if not valid_rows.all() or not valid_cols.all():
+            rgba[~valid_rows] = 0
+            rgba[:, ~valid_cols] = 0
+
+        alpha = self.get_alpha()
+        if alpha is not None and alpha != 1:
+            rgba[..., 3] = (rgba[..., 3] * np.float32(alpha)).astype(np.uint8)
+        return rgba, clipped.x0, clipped.y0
+
+    def _draw_direct(self, renderer):
+        """
+        Draw the image at the resolution of the screen, as computed by
+        ``_screen_image``, without going through AxesImage.make_image
+        """
+        if not self.get_visible():
+            self.stale = False
+            return
+        result = self._screen_image(renderer.get_image_magnification())
+        if result is not None:
+            gc = renderer.new_gc()
+            self._set_gc_clip(gc)
+            gc.set_alpha(self.get_alpha())
+            gc.set_url(self.get_url())
+            gc.set_gid(self.get_gid())
+            renderer.draw_image(gc, result[1], result[2], result[0])
+            gc.restore()
+        self.stale = False
+
+    def _record_stats(self, stats):
+        self._stats.add(stats)
+        if self._stats_callback is not None:
+            self._stats_callback(stats)
 
 
 def main():
@@ -209,6 +1765,15 @@ def imshow(axes, X, cmap=None, norm=None, aspect=None,
     """Similar to matplotlib's imshow command, but produces a ModestImage
 
     Unlike matplotlib version, must explicitly specify axes
+
+    ``X`` can also be a DataSource, shared with other images, or a list of
+    band arrays (or a BandStack) to show as a color composite.
+
+    Additional keywords are passed to ModestImage, e.g. ``pyramid``,
+    ``tile_size``, ``downsample`` or ``lut``. If vmin and vmax are not given, passing
+    ``autoscale='sample'`` (or 'blocks', 'stream') and/or
+    ``autoscale_percentile=(lo, hi)`` avoids scanning the whole array to
+    find the color limits.
     """
     if not axes._hold:
         axes.cla()
@@ -240,7 +1805,10 @@ def imshow(axes, X, cmap=None, norm=None, aspect=None,
 
     # update ax.dataLim, and, if autoscaling, set viewLim
     # to tightly fit the image, regardless of dataLim.
-    im.set_extent(im.get_extent())
+    if im.get_pixel_transform() is not None:
+        im._update_datalim()
+    else:
+        im.set_extent(im.get_extent())
 
     axes.images.append(im)
     im._remove_method = lambda h: axes.images.remove(h)
@@ -249,7 +1817,8 @@ def imshow(axes, X, cmap=None, norm=None, aspect=None,
 
 
 def extract_matched_slices(axes=None, shape=None, extent=None,
-                           transform=IDENTITY_TRANSFORM):
+                           transform=IDENTITY_TRANSFORM, overscan=0.,
+                           quantize=False):
     """Determine the slice parameters to use, matched to the screen.
 
     :param ax: Axes object to query. It's extent and pixel size
@@ -259,6 +1828,11 @@ def extract_matched_slices(axes=None, shape=None, extent=None,
                boundaries for slices will be cropped to fit within
                this shape.
 
+    :param overscan: Fraction of the size of the view to add beyond each
+               of its edges (besides a margin of MARGIN pixels)
+
+    :param quantize: Whether to round the strides down to powers of two
+
     :rtype: tulpe of x0, x1, sx, y0, y1, sy
 
     Indexing the full resolution array as array[y0:y1:sy, x0:x1:sx] returns
@@ -272,26 +1846,120 @@ def extract_matched_slices(axes=None, shape=None, extent=None,
     # Find the extent of the axes in 'world' coordinates
     xlim, ylim = axes.get_xlim(), axes.get_ylim()
 
-    # Transform the limits to pixel coordinates
-    ind0 = transform.transform([min(xlim), min(ylim)])
-    ind1 = transform.transform([max(xlim), max(ylim)])
+    # Transform the limits to pixel coordinates. The transform may flip
+    # either axis (e.g. for an extent with top < bottom), so sort the
+    # corners afterwards.
+    corners = transform.transform([(min(xlim), min(ylim)),
+                                   (max(xlim), max(ylim))])
+    ind0, ind1 = corners.min(axis=0), corners.max(axis=0)
+
+    return matched_slices(ind0, ind1, ext, shape, overscan=overscan,
+                          quantize=quantize)
+
+
+def warped_slices(axes, shape, transform, overscan=0., quantize=False,
+                  samples=WARP_SAMPLES):
+    """
+    Slice parameters (x0, x1, sx, y0, y1, sy) matched to the view of
+    ``axes``, for an array of the given shape whose pixel coordinates are
+    mapped to the data coordinates of the axes by ``transform``, which may
+    be non-affine (but must be invertible).
+
+    The region read is the bounding box, in pixel coordinates, of a grid of
+    ``samples x samples`` points covering the view. The strides are those
+    giving at least one array pixel per screen pixel where the transform
+    magnifies the array the most within the view.
+    """
+    xlim, ylim = axes.get_xlim(), axes.get_ylim()
+    gx, gy = np.meshgrid(np.linspace(min(xlim), max(xlim), samples),
+                         np.linspace(min(ylim), max(ylim), samples))
+    world = np.column_stack([gx.ravel(), gy.ravel()])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pixel = transform.inverted().transform(world)
+    pixel = pixel[np.isfinite(pixel).all(axis=1)]
+    ny, nx = shape[:2]
+    if len(pixel) == 0:
+        # None of the view maps onto the array
+        return matched_slices((0, 0), (nx, ny), (1, 1), shape)
+    ind0, ind1 = pixel.min(axis=0), pixel.max(axis=0)
+
+    # Screen pixels covered by a step of one array pixel along each axis
+    to_display = transform + axes.transData
+    steps = [to_display.transform(pixel + offset)
+             for offset in ((0, 0), (1, 0), (0, 1))]
+    scale = []
+    for step in steps[1:]:
+        with np.errstate(invalid='ignore'):
+            dist = np.hypot(*(step - steps[0]).T)
+        dist = dist[np.isfinite(dist)]
+        scale.append(dist.max() if len(dist) else 0.)
+
+    # matched_slices samples (ind1 - ind0) pixels over ext screen pixels,
+    # so an equivalent ext gives the strides found here
+    ext = [max(ind1[i] - ind0[i], 1) * max(scale[i], 1e-12)
+           for i in (0, 1)]
+    return matched_slices(ind0, ind1, ext, shape, overscan=overscan,
+                          quantize=quantize)
+
+
+def _iround(values):
+    """Round half away from zero, to integers"""
+    return (np.sign(values) * np.floor(np.abs(values) + .5)).astype(np.int64)
+
+
+def nearest_pixels(n, scale, offset, span=False):
+    """
+    The indices of the pixels of an image picked by Agg nearest neighbour
+    resampling along one axis, for ``n`` output pixels whose centers map to
+    ``scale * (i + 0.5) + offset`` in the image.
+
+    Agg works with a precision of 1/256 of a pixel. Along a row (``span``),
+    it only transforms the ends of the row, and interpolates between them
+    with a Bresenham (DDA) line, as reproduced here, so that the same
+    pixels are picked.
+
+    :rtype: int array of length ``n``
+    """
+    i = np.arange(n, dtype=np.int64)
+    if not span:
+        return _iround((scale * (i + .5) + offset) * 256) // 256
+    start = _iround((scale * .5 + offset) * 256)
+    stop = _iround((scale * (n + .5) + offset) * 256)
+    delta = stop - start
+    rem = delta % n
+    return (start + (delta * i + rem - 1) // n - (rem - 1) // n) // 256
+
+
+def matched_slices(ind0, ind1, ext, shape, overscan=0., quantize=False):
+    """
+    Slice parameters (x0, x1, sx, y0, y1, sy) to sample the region between
+    the (x, y) array coordinates ``ind0`` and ``ind1`` of an array of the
+    given shape, for display with ``ext`` (x, y) pixels. This is the
+    geometry of ``extract_matched_slices``, without an Axes.
+    """
+    ind0, ind1 = np.asarray(ind0, dtype=float), np.asarray(ind1, dtype=float)
 
     def _clip(val, lo, hi):
         return int(max(min(val, hi), lo))
 
-    # Determine the range of pixels to extract from the array, including a 5
-    # pixel margin all around. We ensure that the shape of the resulting array
-    # will always be at least (1, 1) even if there is really no overlap, to
-    # avoid issues.
-    y0 = _clip(ind0[1] - 5, 0, shape[0] - 1)
-    y1 = _clip(ind1[1] + 5, 1, shape[0])
-    x0 = _clip(ind0[0] - 5, 0, shape[1] - 1)
-    x1 = _clip(ind1[0] + 5, 1, shape[1])
+    # Determine the range of pixels to extract from the array, including a
+    # margin all around. Partially visible pixels are included. We ensure
+    # that the shape of the resulting array will always be at least (1, 1)
+    # even if there is really no overlap, to avoid issues.
+    margin = MARGIN + overscan * (ind1 - ind0)
+    lo, hi = np.floor(ind0 - margin), np.ceil(ind1 + margin)
+    y0 = _clip(lo[1], 0, shape[0] - 1)
+    y1 = _clip(hi[1], 1, shape[0])
+    x0 = _clip(lo[0], 0, shape[1] - 1)
+    x1 = _clip(hi[0], 1, shape[1])
 
     # Determine the strides that can be used when extracting the array
     sy = int(max(1, min((y1 - y0) / 5., np.ceil(abs((ind1[1] - ind0[1]) / ext[1])))))
     sx = int(max(1, min((x1 - x0) / 5., np.ceil(abs((ind1[0] - ind0[0]) / ext[0])))))
 
+    if quantize:
+        sx, sy = 2 ** int(np.log2(sx)), 2 ** int(np.log2(sy))
+
     return x0, x1, sx, y0, y1, sy
 
 
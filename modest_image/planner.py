@@ -0,0 +1,188 @@
+"""
+Planning the slices of many images at once.
+
+Before drawing, every ModestImage matches its view to the screen with
+``extract_matched_slices``: a few small transforms and some scalar
+arithmetic, which take longer than they should for so little work. In a
+figure with dozens of panels (e.g. a mosaic of linked axes), that overhead
+adds up. ``plan_slices`` computes the slices of many images in one pass,
+querying each Axes only once however many images it holds, and doing the
+arithmetic on arrays of all images together.
+
+``install_planner(figure)`` adds a SlicePlanner to a figure, which plans
+the slices of all the images in the figure at the start of each draw::
+
+    fig, axes = plt.subplots(8, 8, sharex=True, sharey=True)
+    for ax, data in zip(axes.flat, arrays):
+        imshow(ax, data)
+    install_planner(fig)
+"""
+from __future__ import print_function, division
+
+import numpy as np
+from matplotlib.artist import Artist
+
+from .modest_image import ModestImage, MARGIN
+
+
+def _axes_view(axes, renderer=None):
+    """
+    The display size of an Axes in pixels, and the corners of its view
+    limits, as used by ``extract_matched_slices``.
+
+    The aspect of the Axes is applied first, as Axes.draw does before
+    drawing the images, since it may change the box or the limits.
+    """
+    locator = axes.get_axes_locator()
+    if locator is None:
+        axes.apply_aspect()
+    elif renderer is not None:
+        axes.apply_aspect(locator(axes, renderer))
+    corners = axes.transAxes.transform([(0, 0), (1, 1)])
+    ext = corners[1] - corners[0]
+    xlim, ylim = axes.get_xlim(), axes.get_ylim()
+    return (ext[0], ext[1], min(xlim), min(ylim), max(xlim), max(ylim))
+
+
+def _affine(t, x, y):
+    """Apply the affine matrices t (n, 3, 3) to the points (x, y)"""
+    return (t[:, 0, 0] * x + t[:, 0, 1] * y + t[:, 0, 2],
+            t[:, 1, 0] * x + t[:, 1, 1] * y + t[:, 1, 2])
+
+
+def _strides(lo, hi, d, ext, quantize):
+    s = np.fmax(1, np.fmin((hi - lo) / 5., np.ceil(np.abs(d / ext))))
+    s = s.astype(int)
+    q = 2 ** np.floor(np.log2(s)).astype(int)
+    return np.where(quantize, q, s)
+
+
+def plan_slices(images, renderer=None):
+    """
+    The slice parameters (x0, x1, sx, y0, y1, sy) of each of a sequence of
+    ModestImages, as ``extract_matched_slices`` gives them when they are
+    drawn.
+
+    Images with a ``pixel_transform`` are not planned, and get None.
+
+    :param renderer: Renderer of the draw, needed to apply the aspect of
+                     Axes placed by an axes locator
+
+    :rtype: list
+    """
+    result = [None] * len(images)
+    planned = [i for i, image in enumerate(images)
+               if image.get_pixel_transform() is None]
+    if not planned:
+        return result
+
+    views, index = [], {}
+    rows = []
+    for i in planned:
+        axes = images[i].axes
+        if axes not in index:
+            index[axes] = len(views)
+            views.append(_axes_view(axes, renderer))
+        rows.append(index[axes])
+    views = np.array(views, dtype=float)[rows]
+    ext_x, ext_y, wx0, wy0, wx1, wy1 = views.T
+
+    n = len(planned)
+    matrix = np.empty((n, 3, 3))
+    shape = np.empty((n, 2), dtype=int)
+    overscan = np.empty(n)
+    quantize = np.empty(n, dtype=bool)
+    for j, i in enumerate(planned):
+        image = images[i]
+        matrix[j] = image._world2pixel.get_matrix()
+        shape[j] = image._full_res.shape[:2]
+        overscan[j] = image._overscan
+        quantize[j] = image._quantize_strides
+
+    # the transform may flip either axis, so sort the corners
+    ax0, ay0 = _affine(matrix, wx0, wy0)
+    ax1, ay1 = _affine(matrix, wx1, wy1)
+    ix0, ix1 = np.minimum(ax0, ax1), np.maximum(ax0, ax1)
+    iy0, iy1 = np.minimum(ay0, ay1), np.maximum(ay0, ay1)
+
+    ny, nx = shape.T
+    x0 = np.clip(np.floor(ix0 - (MARGIN + overscan * (ix1 - ix0))), 0, nx - 1)
+    x1 = np.clip(np.ceil(ix1 + (MARGIN + overscan * (ix1 - ix0))), 1, nx)
+    y0 = np.clip(np.floor(iy0 - (MARGIN + overscan * (iy1 - iy0))), 0, ny - 1)
+    y1 = np.clip(np.ceil(iy1 + (MARGIN + overscan * (iy1 - iy0))), 1, ny)
+    x0, x1, y0, y1 = [v.astype(int) for v in (x0, x1, y0, y1)]
+    sx = _strides(x0, x1, ix1 - ix0, ext_x, quantize)
+    sy = _strides(y0, y1, iy1 - iy0, ext_y, quantize)
+
+    for j, i in enumerate(planned):
+        result[i] = (int(x0[j]), int(x1[j]), int(sx[j]),
+                     int(y0[j]), int(y1[j]), int(sy[j]))
+    return result
+
+
+def figure_images(figure):
+    """The visible ModestImages of the (visible) Axes of a figure"""
+    images = []
+    for axes in figure.axes:
+        if not axes.get_visible():
+            continue
+        for artist in axes.images + axes.artists:
+            if (isinstance(artist, ModestImage) and artist.get_visible() and
+                    artist._full_res is not None and
+                    artist._full_res.shape is not None):
+                images.append(artist)
+    return images
+
+
+class SlicePlanner(Artist):
+
+    """
+    An invisible figure artist, drawn before any Axes, which plans the
+    slices of all the ModestImages of the figure with ``plan_slices``. Each
+    image then uses its planned slices when it is drawn, rather than
+    computing them itself. Plans not used by the end of the draw are
+    dropped.
+    """
+
+    zorder = -np.inf
+
+    def __init__(self):
+        super(SlicePlanner, self).__init__()
+        self._images = []
+        self._connection = None
+
+    def _finish(self, event=None):
+        if self._connection is not None:
+            canvas, cid = self._connection
+            canvas.mpl_disconnect(cid)
+            self._connection = None
+        for image in self._images:
+            image._planned_slices = None
+        self._images = []
+
+    def draw(self, renderer, *args, **kwargs):
+        self._finish()
+        if not self.get_visible():
+            return
+        canvas = self.figure.canvas
+        self._connection = (canvas,
+                            canvas.mpl_connect('draw_event', self._finish))
+        images = figure_images(self.figure)
+        for image, slices in zip(images, plan_slices(images, renderer)):
+            image._planned_slices = slices
+        self._images = images
+        self.stale = False
+
+
+def install_planner(figure):
+    """
+    Plan the slices of all the ModestImages in ``figure`` together at each
+    draw, returning the SlicePlanner (the one already installed, if any)
+    """
+    for artist in figure.artists:
+        if isinstance(artist, SlicePlanner):
+            return artist
+    planner = SlicePlanner()
+    planner.set_figure(figure)
+    figure.artists.append(planner)
+    return planner
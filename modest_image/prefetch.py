@@ -0,0 +1,172 @@
+"""
+Predictive prefetching of the windows of an image that are about to be
+drawn.
+
+While the view is panned or zoomed continuously, each new view usually
+continues the motion of the previous ones. The Prefetcher extrapolates
+that motion, and computes the window the next view will need in the
+background while the current one is being drawn, so that reading it from
+a slow array (e.g. a memmap, or a pyramid level that isn't built yet)
+overlaps with the interaction instead of stalling it.
+"""
+from __future__ import print_function, division
+
+from collections import deque
+from threading import Lock
+
+from .tiles import LRUCache
+
+DEFAULT_PREFETCH_BYTES = 2 ** 26
+
+
+def covers(geometry, request):
+    """
+    Whether a window with geometry (x0, x1, sx, y0, y1, sy) can be drawn
+    for the view ``request``: it contains the requested region, at least
+    as finely but not more than twice as finely sampled.
+    """
+    gx0, gx1, gsx, gy0, gy1, gsy = geometry
+    x0, x1, sx, y0, y1, sy = request
+    return (gx0 <= x0 and gx1 >= x1 and gy0 <= y0 and gy1 >= y1 and
+            gsx <= sx < 2 * gsx and gsy <= sy < 2 * gsy)
+
+
+def _predict_axis(p0, p1, ps, c0, c1, s, size):
+    """
+    Extrapolate the range (and stride) of one axis from its previous and
+    current values. The predicted range is extended by one more step in
+    the direction of motion.
+    """
+    shift = ((c0 + c1) - (p0 + p1)) / 2
+    zoom = (c1 - c0) / max(p1 - p0, 1)
+    center = (c0 + c1) / 2 + shift
+    half = (c1 - c0) / 2 * zoom
+    lo, hi = center - half, center + half
+    if shift > 0:
+        hi += shift
+    else:
+        lo += shift
+    lo = int(max(min(lo, size - 1), 0))
+    hi = int(max(min(hi, size), lo + 1))
+    return lo, hi, max(1, int(round(s * s / ps)))
+
+
+def predict_view(previous, current, shape):
+    """
+    Predict the region to prefetch after the views ``previous`` and
+    ``current`` (each given as x0, x1, sx, y0, y1, sy), assuming the motion
+    between them continues. Returns None if the view is not moving.
+    """
+    if previous == current:
+        return None
+    ny, nx = shape[:2]
+    x0, x1, sx = _predict_axis(previous[0], previous[1], previous[2],
+                               current[0], current[1], current[2], nx)
+    y0, y1, sy = _predict_axis(previous[3], previous[4], previous[5],
+                               current[3], current[4], current[5], ny)
+    predicted = (x0, x1, sx, y0, y1, sy)
+    if covers(current, predicted):
+        return None
+    return predicted
+
+
+class Prefetcher(object):
+
+    """
+    Keeps track of the recent views of an image, and computes the window of
+    the predicted next view in the background.
+
+    Prefetched windows are kept in a least-recently-used cache, limited to
+    ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_PREFETCH_BYTES):
+        self.windows = LRUCache(max_bytes)
+        self._history = deque(maxlen=2)
+        self._pending = []
+        self._generation = 0
+        self._lock = Lock()
+
+    def clear(self):
+        """Forget all views and windows, e.g. after the data have changed"""
+        with self._lock:
+            self._generation += 1
+            for _, _, future in self._pending:
+                future.cancel()
+            self._pending = []
+            self._history.clear()
+            self.windows.clear()
+
+    def find(self, request, key=None):
+        """
+        A prefetched window (array, geometry) for the view ``request`` and
+        colormap key ``key``, or None. If such a window is still being
+        computed, wait for it. The array is as stored, i.e. as returned by
+        the ``pack`` function given to ``update``.
+        """
+        with self._lock:
+            pending = [future for target, k, future in self._pending
+                       if k == key and covers(target, request)]
+        for future in pending:
+            if not future.cancelled():
+                # a failed prefetch is simply a miss; the error will show up
+                # when the window is computed in the foreground
+                future.exception()
+        for geometry, k in self.windows.keys():
+            if k == key and covers(geometry, request):
+                A = self.windows.get((geometry, k))
+                if A is not None:
+                    return A, geometry
+        return None
+
+    def update(self, request, key, compute, submit, shape, store=True,
+               pack=None):
+        """
+        Record that the view ``request`` is being drawn, and start computing
+        the window of the predicted next view.
+
+        :param compute: ``compute(x0, x1, sx, y0, y1, sy, key=key)`` returns
+                        a window and its effective geometry.
+        :param submit: Function to run ``compute`` in the background, e.g.
+                       ``ThreadPoolExecutor.submit``.
+        :param store: Whether to keep the computed windows. If False (e.g.
+                      when ``compute`` fills a cache of its own) they are
+                      discarded.
+        :param pack: Optional function converting windows to the form they
+                     are stored in (e.g. ``modest_image.codec.pack``)
+        """
+        with self._lock:
+            if self._history and self._history[-1] == request:
+                return
+            self._history.append(request)
+            if len(self._history) < 2:
+                return
+            predicted = predict_view(self._history[0], request, shape)
+            if predicted is None:
+                return
+
+            # only the latest prediction is worth computing, so cancel any
+            # earlier ones that haven't started yet
+            self._pending = [p for p in self._pending
+                             if not p[2].done() and not p[2].cancel()]
+            if any(k == key and covers(target, predicted)
+                   for target, k, _ in self._pending):
+                return
+            generation = self._generation
+
+        if any(k == key and covers(geometry, predicted)
+               for geometry, k in self.windows.keys()):
+            return
+
+        def prefetch():
+            A, geometry = compute(*predicted, key=key)
+            if store and pack is not None:
+                A = pack(A)
+            with self._lock:
+                if store and generation == self._generation:
+                    self.windows.put((geometry, key), A)
+
+        future = submit(prefetch)
+        with self._lock:
+            if generation == self._generation:
+                self._pending.append((predicted, key, future))
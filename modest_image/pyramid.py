@@ -0,0 +1,253 @@
+"""
+Lazily-built multi-resolution overviews of large image arrays.
+"""
+from __future__ import print_function, division
+
+import numpy as np
+
+from .downsample import block_reduce, reduce_window, check_reduction
+from .chunked import read_strided, bands, chunk_rows, map_bands
+
+# Upper bound on the number of source bytes touched in one step while
+# building a level, so that building overviews of a memmap never needs more
+# than a modest amount of memory.
+CHUNK_BYTES = 2 ** 25
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+class ImagePyramid(object):
+
+    """
+    Stack of power-of-two downsampled versions of an image array.
+
+    Level 0 is the original array, and level ``k`` has been decimated by a
+    factor ``2 ** k`` along both image axes. Levels are only computed when
+    they are first requested, each one from the level directly below it, so
+    the full resolution array is scanned at most once.
+
+    :param data: The full resolution array (2D, or 3D with trailing color
+                 channels). Anything supporting numpy-style strided slicing
+                 can be used, including ``numpy.memmap`` instances.
+
+    :param how: How to combine pixels when downsampling. If None, levels are
+                built (and read) by striding. Otherwise, one of the block
+                reductions in ``modest_image.downsample.REDUCTIONS``.
+
+    :param store: An optional ``OverviewStore``. Levels of file-backed data
+                  found in the store are memory-mapped from it instead of
+                  being computed, and newly computed levels are saved to it.
+
+    :param level_dtype: Floating point dtype (e.g. 'float16') to keep the
+                        levels of floating point data in, to save memory.
+                        Levels are computed from the one below at the
+                        precision of the data, and windows read from them
+                        are converted back to it. Ignored when levels are
+                        kept in a store, since those are memory-mapped.
+    """
+
+    def __init__(self, data, how=None, store=None, level_dtype=None):
+        check_reduction(how)
+        self.how = how
+        self.level_dtype = None
+        if (level_dtype is not None and store is None and
+                np.dtype(data.dtype).kind == 'f' and
+                np.dtype(level_dtype).itemsize < np.dtype(data.dtype).itemsize):
+            self.level_dtype = np.dtype(level_dtype)
+        self._levels = {0: data}
+        self._finite = {}
+        shape = data.shape[:2]
+        self.max_level = int(np.floor(np.log2(max(1, min(shape)))))
+        self.store = store
+        self._key = store.key(data, how) if store is not None else None
+
+    @property
+    def data(self):
+        """The full resolution array"""
+        return self._levels[0]
+
+    @property
+    def nbuilt(self):
+        """Number of levels available so far (including level 0)"""
+        return len(self._levels)
+
+    def has_level(self, k):
+        """
+        Whether level ``k`` can be read without computing it, i.e. has been
+        built already or is in the overview store.
+        """
+        if k in self._levels:
+            return True
+        if self._key is None:
+            return False
+        level = self.store.load(self._key, k)
+        if level is not None:
+            self._levels[k] = level
+        return level is not None
+
+    def level(self, k):
+        """Return level ``k``, building it (and any level below) if needed"""
+        if k < 0 or k > self.max_level:
+            raise ValueError("Pyramid level must be in the range 0-%i" %
+                             self.max_level)
+        if not self.has_level(k):
+            level = self._downsample(self.level(k - 1))
+            if self._key is not None:
+                self.store.save(self._key, k, level, data=self.data,
+                                how=self.how)
+            self._levels[k] = level
+        return self._levels[k]
+
+    def update(self, y0, y1, x0, x1, data=None):
+        """
+        Recompute the parts of all built levels that depend on the region
+        ``[y0:y1, x0:x1]`` of the full resolution array, after it has been
+        modified.
+
+        :param data: Replacement full resolution array (of the same shape),
+                     if the changes were not made in place.
+        """
+        if data is not None:
+            self._levels[0] = data
+        for k in sorted(self._levels):
+            if k == 0:
+                continue
+            if k - 1 not in self._levels:
+                # Level was loaded from the store without the one below it;
+                # it will be recomputed when next needed.
+                del self._levels[k]
+                self._finite.pop(k, None)
+                continue
+
+            f = 2 ** k
+            ly0, ly1 = y0 // f, _ceil_div(y1, f)
+            lx0, lx1 = x0 // f, _ceil_div(x1, f)
+            src = self._full_precision(
+                self._levels[k - 1][2 * ly0:2 * ly1, 2 * lx0:2 * lx1])
+            if self.how is None:
+                patch = src[::2, ::2]
+            else:
+                patch = block_reduce(src, 2, 2, self.how)
+
+            level = self._levels[k]
+            if not level.flags.writeable:
+                level = self._levels[k] = np.array(level)
+            level[ly0:ly1, lx0:lx1] = patch
+
+            # A level known to be finite stays so if the new values are
+            if not (self._finite.get(k) and np.isfinite(patch).all()):
+                self._finite.pop(k, None)
+
+    def finite(self, k):
+        """
+        Whether level ``k`` contains only finite values, so that windows
+        read from it need no masking. This is found once per level (the
+        first time it is asked for), by scanning the level a band of rows at
+        a time. The full resolution array is never scanned, so level 0 is
+        only reported as finite if its dtype cannot hold invalid values.
+        """
+        level = self.level(k)
+        if np.dtype(level.dtype).kind not in 'fc':
+            return True
+        if k == 0:
+            return False
+        if k not in self._finite:
+            rows = chunk_rows(level)
+            self._finite[k] = all(np.isfinite(level[lo:lo + rows]).all()
+                                  for lo in range(0, level.shape[0], rows))
+        return self._finite[k]
+
+    def _full_precision(self, values):
+        """Convert values read from a level to the dtype of the data"""
+        if self.level_dtype is None or values.dtype == self.data.dtype:
+            return values
+        return values.astype(self.data.dtype)
+
+    def _downsample(self, src):
+        ny, nx = src.shape[:2]
+        nout = _ceil_div(ny, 2)
+        row_bytes = max(1, np.dtype(src.dtype).itemsize *
+                        int(np.prod(src.shape[1:])))
+        band_list = bands(0, nout, 2, chunk_rows(src),
+                          max_rows=max(1, CHUNK_BYTES // (2 * row_bytes)))
+
+        def downsample_band(lo, hi):
+            if self.how is None:
+                return src[2 * lo:2 * hi:2, ::2]
+            band = self._full_precision(src[2 * lo:2 * hi])
+            return block_reduce(band, 2, 2, self.how)
+
+        # The first band tells us the data type of the level
+        first = downsample_band(*band_list[0])
+        out = np.empty((nout, _ceil_div(nx, 2)) + first.shape[2:],
+                       dtype=first.dtype if self.level_dtype is None
+                       else self.level_dtype)
+        out[:len(first)] = first
+
+        def fill(lo, hi):
+            out[lo:hi] = downsample_band(lo, hi)
+
+        map_bands(fill, band_list[1:])
+        return out
+
+    def level_for(self, sx, sy):
+        """The coarsest level which can still provide strides (sx, sy)"""
+        return min(self.max_level, int(np.floor(np.log2(max(1, min(sx, sy))))))
+
+    def extract(self, x0, x1, sx, y0, y1, sy):
+        """
+        Extract the full resolution slice ``[y0:y1:sy, x0:x1:sx]`` from the
+        coarsest suitable level. If the pyramid uses a block reduction, the
+        equivalent block-reduced region is returned instead.
+
+        Reading from a coarser level means the sampled region can differ
+        slightly from the one requested, so the effective slice parameters in
+        full resolution pixel coordinates are returned alongside the data.
+        The effective region always contains the requested one, and the
+        effective strides are never larger than those requested.
+
+        :rtype: tuple of array, (x0, x1, sx, y0, y1, sy)
+        """
+        return self._extract(self.level_for(sx, sy), x0, x1, sx, y0, y1, sy,
+                             self.how)
+
+    def preview(self, x0, x1, sx, y0, y1, sy):
+        """
+        A quick approximation of ``extract``, made by striding through the
+        coarsest level already built that does not exceed the level
+        ``extract`` would use. Returns None if no level other than the full
+        resolution array has been built yet.
+        """
+        k = max(j for j in list(self._levels) if j <= self.level_for(sx, sy))
+        if k == 0:
+            return None
+        return self._extract(k, x0, x1, sx, y0, y1, sy, None)
+
+    def _extract(self, k, x0, x1, sx, y0, y1, sy, how):
+        if k == 0:
+            return (self._read(self.data, x0, x1, sx, y0, y1, sy, how),
+                    (x0, x1, sx, y0, y1, sy))
+
+        f = 2 ** k
+        level = self.level(k)
+        ny, nx = self.data.shape[:2]
+
+        lx0, lx1, lsx = x0 // f, _ceil_div(x1, f), max(1, sx // f)
+        ly0, ly1, lsy = y0 // f, _ceil_div(y1, f), max(1, sy // f)
+        result = self._full_precision(
+            self._read(level, lx0, lx1, lsx, ly0, ly1, lsy, how))
+
+        sx, sy = lsx * f, lsy * f
+        x0, y0 = lx0 * f, ly0 * f
+        x1 = min(x0 + result.shape[1] * sx, nx)
+        y1 = min(y0 + result.shape[0] * sy, ny)
+
+        return result, (x0, x1, sx, y0, y1, sy)
+
+    @staticmethod
+    def _read(data, x0, x1, sx, y0, y1, sy, how):
+        if how is None:
+            return read_strided(data, x0, x1, sx, y0, y1, sy)
+        return reduce_window(data, x0, x1, sx, y0, y1, sy, how)
@@ -0,0 +1,230 @@
+"""
+Image data shared between several ModestImages.
+
+Showing the same large array in several axes (e.g. an overview and a zoomed
+inset, or linked panes) with separate ModestImages would read and decimate
+the same regions once per image. Wrapping the array in a DataSource, and
+passing that to each image instead, lets them share its pyramids, and the
+windows and colormapped tiles computed from it.
+
+The windows and tiles of all DataSources are kept in a single, process-wide
+cache, whose memory budget is set with ``set_cache_budget``. When the last
+image using a DataSource stops using it (by being removed, given other
+data, or garbage collected), the entries of the source are evicted from the
+cache and its pyramids are released. Those of a DataSource which is itself
+garbage collected are evicted too.
+"""
+from __future__ import print_function, division
+
+import itertools
+import weakref
+from threading import Lock
+
+from .pyramid import ImagePyramid
+from .tiles import LRUCache, tile_overlaps
+
+DEFAULT_BUDGET_BYTES = 2 ** 28
+
+_cache = LRUCache(DEFAULT_BUDGET_BYTES)
+_tokens = itertools.count()
+
+# Weak references to the live DataSources, by token, whose callbacks evict
+# the entries of collected sources
+_sources = {}
+
+
+def set_cache_budget(nbytes):
+    """Set the memory budget, in bytes, of the cache shared by DataSources"""
+    _cache.set_max_bytes(nbytes)
+
+
+def get_cache_budget():
+    """Return the memory budget, in bytes, of the cache shared by DataSources"""
+    return _cache.max_bytes
+
+
+def cache_nbytes():
+    """Return the number of bytes currently held by the shared cache"""
+    return _cache.nbytes
+
+
+class SourceCache(object):
+
+    """
+    The entries of one DataSource in the process-wide cache, with the
+    interface of an LRUCache. Its memory budget is that of the whole cache.
+    """
+
+    def __init__(self, prefix):
+        self._prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        return [key for prefix, key in _cache.keys() if prefix == self._prefix]
+
+    def get(self, key, default=None):
+        value = _cache.get((self._prefix, key))
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, value, nbytes=None):
+        _cache.put((self._prefix, key), value, nbytes)
+
+    def discard(self, predicate):
+        """Remove all entries whose key satisfies ``predicate(key)``"""
+        _cache.discard(lambda k: k[0] == self._prefix and predicate(k[1]))
+
+    def clear(self):
+        self.discard(lambda key: True)
+
+    @property
+    def max_bytes(self):
+        return _cache.max_bytes
+
+    def set_max_bytes(self, nbytes):
+        set_cache_budget(nbytes)
+
+
+def _evict_source(token):
+    """Callback evicting the entries of a collected DataSource"""
+    def callback(ref):
+        _sources.pop(token, None)
+        _cache.discard(lambda key: key[0][0] == token)
+    return callback
+
+
+def _forget_user(source_ref, key):
+    """Callback detaching a collected image from a DataSource"""
+    def callback(ref):
+        source = source_ref()
+        if source is not None:
+            source._forget(key)
+    return callback
+
+
+def _window_overlaps(key, y0, y1, x0, x1):
+    """
+    Whether the window cached under ``key``, which starts with the requested
+    ``(x0, x1, sx, y0, y1, sy)``, may overlap the region
+    ``[y0:y1, x0:x1]``. Windows read from a pyramid level can extend up to
+    one stride beyond the requested region.
+    """
+    wx0, wx1, sx, wy0, wy1, sy = key[0]
+    return (wx0 - sx < x1 and wx1 + sx > x0 and
+            wy0 - sy < y1 and wy1 + sy > y0)
+
+
+class DataSource(object):
+
+    """
+    An image array, together with the data derived from it (pyramids,
+    resampled windows and colormapped tiles), for sharing between several
+    ModestImages. Pass it to ``ModestImage.set_data`` or ``imshow`` in
+    place of the array.
+
+    :param data: The full resolution array. Any array ModestImage accepts
+                 can be used.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        token = next(_tokens)
+        self.windows = SourceCache((token, 'windows'))
+        self.tiles = SourceCache((token, 'tiles'))
+        self._pyramids = {}
+        # weak references to the images using the source, by id
+        self._users = {}
+        self._lock = Lock()
+        _sources[token] = weakref.ref(self, _evict_source(token))
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nusers(self):
+        """Number of images using the source"""
+        return len(self._users)
+
+    def attach(self, image):
+        """
+        Record that ``image`` uses the source, until it is detached or
+        garbage collected
+        """
+        key = id(image)
+        with self._lock:
+            if key not in self._users:
+                self._users[key] = weakref.ref(
+                    image, _forget_user(weakref.ref(self), key))
+
+    def detach(self, image):
+        """
+        Record that ``image`` no longer uses the source, releasing the
+        cached data if no other image does.
+        """
+        self._forget(id(image))
+
+    def _forget(self, key):
+        with self._lock:
+            self._users.pop(key, None)
+            unused = not self._users
+        if unused:
+            self.release()
+
+    def _images(self):
+        """The images using the source"""
+        with self._lock:
+            refs = list(self._users.values())
+        return [image for image in (ref() for ref in refs)
+                if image is not None]
+
+    def release(self):
+        """Evict the cached windows and tiles, and drop the pyramids"""
+        self.windows.clear()
+        self.tiles.clear()
+        with self._lock:
+            self._pyramids.clear()
+
+    def pyramid(self, how=None, store=None, level_dtype=None):
+        """
+        The (shared) ImagePyramid of the data for the downsampling method
+        ``how``, OverviewStore ``store`` and level dtype ``level_dtype``
+        """
+        key = (how, None if store is None else store.directory, level_dtype)
+        with self._lock:
+            pyramid = self._pyramids.get(key)
+            if pyramid is None:
+                pyramid = ImagePyramid(self.data, how=how, store=store,
+                                       level_dtype=level_dtype)
+                self._pyramids[key] = pyramid
+        return pyramid
+
+    def update(self, y0, y1, x0, x1):
+        """
+        Refresh everything depending on the region ``[y0:y1, x0:x1]`` of the
+        data, after it has been modified in place: pyramid levels, cached
+        windows and tiles, and the views of the images using the source.
+        """
+        with self._lock:
+            pyramids = list(self._pyramids.values())
+        for pyramid in pyramids:
+            pyramid.update(y0, y1, x0, x1)
+
+        shape = self.data.shape
+        self.tiles.discard(lambda key: tile_overlaps(key, y0, y1, x0, x1,
+                                                     shape))
+        self.windows.discard(lambda key: _window_overlaps(key, y0, y1,
+                                                          x0, x1))
+        for image in self._images():
+            image._refresh_region(y0, y1, x0, x1)
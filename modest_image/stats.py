@@ -0,0 +1,165 @@
+"""
+Instrumentation of the ModestImage draw path.
+
+Every draw of a ModestImage records a DrawStats, with the time spent in each
+phase of the draw, how much data was read, the shape and strides of the
+window drawn and whether it (or its tiles) came from a cache. These are
+accumulated in the ``stats`` of the image, and can be passed to a callback,
+such as ``log_stats``, after every draw.
+"""
+from __future__ import print_function, division
+
+import logging
+from collections import OrderedDict, Counter
+from contextlib import contextmanager
+from timeit import default_timer
+
+logger = logging.getLogger('modest_image')
+
+# Phases of a draw:
+#  slices:   matching the view to the screen resolution
+#  read:     reading the window from the array (or its pyramid)
+#  mask:     masking invalid values
+#  codec:    packing windows into caches, and unpacking them (see the
+#            ``cache_dtype`` and ``cache_codec`` options)
+#  colormap: colormapping tiles, or the window (see the ``lut`` option)
+#  render:   the rest of the draw, i.e. AxesImage resampling (and
+#            colormapping the window, unless done above) and drawing, or
+#            picking and colormapping the screen pixels (see ``direct``)
+PHASES = ('slices', 'read', 'mask', 'codec', 'colormap', 'render')
+
+
+def _phase_dict():
+    return OrderedDict((phase, 0.) for phase in PHASES)
+
+
+class DrawStats(object):
+
+    """
+    Measurements of a single draw of an image.
+
+    :ivar timings: Seconds spent in each phase of the draw (see ``PHASES``)
+    :ivar total: Seconds spent in the whole draw
+    :ivar cache: 'hit' if the window drawn was cached, 'miss' if it was
+                 computed, 'shared' if it was computed by another image
+                 sharing the same DataSource, 'prefetch' if it had been
+                 prefetched, 'frame' if it was cached for the frame of a
+                 cube being animated, or, in
+                 asynchronous mode, 'preview' or 'pending' if it is being
+                 computed in the background
+    :ivar bytes_read: Size of the data read into the window (after striding
+                      or downsampling)
+    :ivar shape: Shape of the window drawn
+    :ivar strides: (sx, sy) strides of the window through the array
+    :ivar bounds: (x0, x1, y0, y1) region of the array covered by the window
+    :ivar tile_hits: Number of tiles found in the tile cache
+    :ivar tile_misses: Number of tiles computed
+    """
+
+    def __init__(self):
+        self.timings = _phase_dict()
+        self.total = 0.
+        self.cache = None
+        self.bytes_read = 0
+        self.shape = None
+        self.strides = None
+        self.bounds = None
+        self.tile_hits = 0
+        self.tile_misses = 0
+
+    @contextmanager
+    def phase(self, name):
+        """Context manager adding the time spent in it to phase ``name``"""
+        t0 = default_timer()
+        try:
+            yield
+        finally:
+            self.timings[name] += default_timer() - t0
+
+    def as_dict(self):
+        return dict(timings=dict(self.timings), total=self.total,
+                    cache=self.cache, bytes_read=self.bytes_read,
+                    shape=self.shape, strides=self.strides,
+                    bounds=self.bounds, tile_hits=self.tile_hits,
+                    tile_misses=self.tile_misses)
+
+    def __str__(self):
+        phases = ', '.join('%s %.1f' % (name, t * 1000)
+                           for name, t in self.timings.items())
+        result = 'draw %.1f ms (%s) cache=%s shape=%s strides=%s read=%i B' % (
+            self.total * 1000, phases, self.cache, self.shape, self.strides,
+            self.bytes_read)
+        if self.tile_hits or self.tile_misses:
+            result += ' tiles=%i/%i' % (self.tile_hits,
+                                        self.tile_hits + self.tile_misses)
+        return result
+
+
+class ImageStats(object):
+
+    """
+    Running totals of the DrawStats of an image.
+
+    :ivar ndraws: Number of draws
+    :ivar timings: Total seconds spent in each phase
+    :ivar total: Total seconds spent drawing
+    :ivar cache: Counter of the ``cache`` outcomes of the draws
+    :ivar last: The DrawStats of the last draw
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.ndraws = 0
+        self.timings = _phase_dict()
+        self.total = 0.
+        self.bytes_read = 0
+        self.cache = Counter()
+        self.tile_hits = 0
+        self.tile_misses = 0
+        self.last = None
+
+    def add(self, stats):
+        """Include the DrawStats of another draw"""
+        self.ndraws += 1
+        for name, t in stats.timings.items():
+            self.timings[name] += t
+        self.total += stats.total
+        self.bytes_read += stats.bytes_read
+        self.cache[stats.cache] += 1
+        self.tile_hits += stats.tile_hits
+        self.tile_misses += stats.tile_misses
+        self.last = stats
+
+    @property
+    def hit_rate(self):
+        """Fraction of draws which reused a cached window"""
+        if self.ndraws == 0:
+            return 0.
+        return self.cache['hit'] / self.ndraws
+
+    @property
+    def tile_hit_rate(self):
+        """Fraction of tiles found in the tile cache"""
+        ntiles = self.tile_hits + self.tile_misses
+        if ntiles == 0:
+            return 0.
+        return self.tile_hits / ntiles
+
+    def as_dict(self):
+        return dict(ndraws=self.ndraws, timings=dict(self.timings),
+                    total=self.total, bytes_read=self.bytes_read,
+                    cache=dict(self.cache), hit_rate=self.hit_rate,
+                    tile_hits=self.tile_hits, tile_misses=self.tile_misses,
+                    tile_hit_rate=self.tile_hit_rate)
+
+
+def log_stats(stats, level=logging.DEBUG):
+    """
+    Log a DrawStats to the 'modest_image' logger. Can be used as the stats
+    callback of an image::
+
+        im.set_stats_callback(log_stats)
+    """
+    logger.log(level, '%s', stats)
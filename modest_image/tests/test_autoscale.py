@@ -0,0 +1,124 @@
+from __future__ import print_function, division
+
+import pytest
+import numpy as np
+import matplotlib.pyplot as plt
+
+from .. import autoscale
+from ..autoscale import (autoscale_limits, strided_sample, block_sample,
+                         stream_limits)
+from ..modest_image import imshow
+
+
+def _data():
+    random = np.random.RandomState(42)
+    return random.normal(size=(1000, 800))
+
+
+def test_full():
+    data = _data()
+    assert autoscale_limits(data, 'full') == (data.min(), data.max())
+    np.testing.assert_allclose(autoscale_limits(data, 'full', (1, 99)),
+                               np.percentile(data, [1, 99]))
+
+
+def test_stream_exact():
+    data = _data()
+    assert stream_limits(data) == (data.min(), data.max())
+
+
+@pytest.mark.parametrize('mode', ['sample', 'blocks', 'stream'])
+def test_percentile_estimates(mode):
+    data = _data()
+    lo, hi = autoscale_limits(data, mode, percentile=(1, 99))
+    expected = np.percentile(data, [1, 99])
+    np.testing.assert_allclose([lo, hi], expected, atol=0.1)
+
+
+def test_sample_sizes():
+    data = _data()
+    assert strided_sample(data, nsamples=1000).size <= 2000
+    assert block_sample(data, nsamples=10000, block_size=10).size == 10000
+    assert block_sample(np.zeros((5, 5)), nsamples=1000).size == 25
+
+
+def test_ignores_nan():
+    data = _data()
+    data[:500] = np.nan
+    for mode in ['full', 'sample', 'blocks', 'stream']:
+        lo, hi = autoscale_limits(data, mode)
+        assert np.isfinite(lo) and np.isfinite(hi)
+    assert autoscale_limits(np.full((10, 10), np.nan), 'stream') == (None,
+                                                                     None)
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        autoscale_limits(_data(), 'exact')
+
+
+def test_stream_memmap(tmpdir):
+    data = _data()
+    mm = np.memmap(str(tmpdir.join('data.raw')), dtype=data.dtype,
+                   mode='w+', shape=data.shape)
+    mm[:] = data
+    assert stream_limits(mm) == (data.min(), data.max())
+
+
+class _Chunked(object):
+    """An array stored in a single chunk, recording the rows read"""
+
+    def __init__(self, data):
+        self.data = data
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.chunks = data.shape
+        self.reads = []
+
+    def __getitem__(self, index):
+        self.reads.append(index)
+        return self.data[index]
+
+
+def test_stream_bands_bounded(monkeypatch):
+    monkeypatch.setattr(autoscale, 'BAND_BYTES', 10 * 8 * 30)
+    data = _Chunked(np.random.random((200, 30)))
+    assert stream_limits(data) == (data.data.min(), data.data.max())
+    assert len(data.reads) == 20
+    assert all(s.stop - s.start <= 10 for s in data.reads)
+
+
+@pytest.mark.parametrize('mode', ['full', 'sample', 'stream'])
+def test_imshow_autoscale(mode):
+    data = _data()
+    ax = plt.figure().add_subplot(111)
+    im = imshow(ax, data, autoscale=mode)
+    assert im.get_autoscale() == mode
+    if mode == 'sample':
+        assert data.min() <= im.norm.vmin and im.norm.vmax <= data.max()
+    else:
+        assert im.get_clim() == (data.min(), data.max())
+
+    im = imshow(ax, data, autoscale=mode, autoscale_percentile=(1, 99))
+    np.testing.assert_allclose(im.get_clim(), np.percentile(data, [1, 99]),
+                               atol=0.1)
+    plt.close(ax.figure)
+
+
+def test_autoscale_after_draw_uses_full_array():
+    data = _data()
+    ax = plt.figure().add_subplot(111)
+    im = imshow(ax, data, vmin=0, vmax=1, origin='lower')
+    ax.set_xlim(0, 10)
+    ax.set_ylim(0, 10)
+    ax.figure.canvas.draw()
+    im.autoscale()
+    assert im.get_clim() == (data.min(), data.max())
+    plt.close(ax.figure)
+
+
+def test_invalid_percentile():
+    ax = plt.figure().add_subplot(111)
+    with pytest.raises(ValueError):
+        imshow(ax, _data(), autoscale_percentile=(99, 1))
+    plt.close(ax.figure)
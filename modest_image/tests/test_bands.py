@@ -0,0 +1,81 @@
+from __future__ import print_function, division
+
+import pytest
+import numpy as np
+
+from ..bands import BandStack, STRETCHES
+
+
+def _bands(n=3, shape=(40, 30)):
+    return [np.random.random(shape) * (i + 1) for i in range(n)]
+
+
+def test_slices_read_from_each_band():
+    bands = _bands()
+    stack = BandStack(bands)
+    assert stack.shape == (40, 30, 3)
+    assert stack.dtype == np.float64
+    np.testing.assert_array_equal(stack[3:20:3, ::4],
+                                  np.dstack(bands)[3:20:3, ::4])
+    np.testing.assert_array_equal(stack[5:9], np.dstack(bands)[5:9])
+
+
+def test_invalid_bands():
+    with pytest.raises(ValueError):
+        BandStack(_bands(2))
+    with pytest.raises(ValueError):
+        BandStack(_bands(2) + [np.zeros((4, 4))])
+    with pytest.raises(ValueError):
+        BandStack(_bands(), stretch='cube')
+    with pytest.raises(ValueError):
+        BandStack(_bands(), limits=[(0, 1), (0, 2)])
+
+
+def test_limits():
+    bands = _bands()
+    stack = BandStack(bands, limits=(0, 1))
+    assert stack.get_limits() == [(0, 1)] * 3
+
+    stack.set_limits([(0, 1), None, (2, 3)])
+    limits = stack.get_limits()
+    assert limits[0] == (0, 1) and limits[2] == (2, 3)
+    assert limits[1] == (bands[1].min(), bands[1].max())
+
+
+@pytest.mark.parametrize('stretch', sorted(STRETCHES))
+def test_compose(stretch):
+    bands = _bands()
+    limits = [(0, 1), (.5, 1.5), (0, 2)]
+    stack = BandStack(bands, limits=limits, stretch=stretch)
+    rgba = stack.compose(stack[::2, ::2])
+    assert rgba.dtype == np.uint8
+    assert rgba.shape == (20, 15, 4)
+
+    for i, (lo, hi) in enumerate(limits):
+        x = np.clip((bands[i][::2, ::2] - lo) / (hi - lo), 0, 1)
+        expected = STRETCHES[stretch](x) * 255
+        np.testing.assert_allclose(rgba[..., i], expected, atol=1)
+    assert (rgba[..., 3] == 255).all()
+
+
+def test_compose_alpha_band_and_invalid():
+    bands = _bands(4)
+    bands[1][2, 3] = np.nan
+    stack = BandStack(bands, limits=(0, 4))
+    window = np.ma.masked_invalid(stack[:, :])
+    window[5, 6, 0] = np.ma.masked
+    rgba = stack.compose(window)
+    np.testing.assert_allclose(rgba[0, 0, 3], bands[3][0, 0] / 4 * 255,
+                               atol=1)
+    assert rgba[2, 3, 3] == 0
+    assert rgba[5, 6, 3] == 0
+
+    # unmasked invalid values are transparent too
+    assert stack.compose(stack[:, :])[2, 3, 3] == 0
+
+
+def test_key_changes_with_stretch():
+    stack = BandStack(_bands(), limits=(0, 1))
+    key = stack.key
+    stack.set_stretch(['linear', 'sqrt', 'linear'])
+    assert stack.key != key
@@ -0,0 +1,163 @@
+from __future__ import print_function, division
+
+import numpy as np
+from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from ..modest_image import imshow
+from ..blit import ImageBlitter
+
+
+def teardown_function(func):
+    plt.close('all')
+
+
+def _data():
+    y, x = np.mgrid[0:400, 0:500]
+    return np.sin(y / 10.) * np.cos(x / 30.)
+
+
+def _image(**kwargs):
+    fig = Figure(figsize=(5, 4), dpi=80)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    im = imshow(ax, _data(), vmin=-1, vmax=1, interpolation='nearest',
+                **kwargs)
+    return im
+
+
+def _pixels(canvas):
+    width, height = canvas.get_width_height()
+    return np.frombuffer(canvas.tostring_argb(),
+                         dtype=np.uint8).reshape(height, width, 4)
+
+
+def _interior(canvas, bbox):
+    """The pixels of the inside of a bbox, away from the axes spines"""
+    height = canvas.get_width_height()[1]
+    (x0, y0), (x1, y1) = bbox.get_points()
+    return _pixels(canvas)[int(height - y1) + 3:int(height - y0) - 3,
+                           int(x0) + 3:int(x1) - 3]
+
+
+class _Counter(object):
+
+    def __init__(self, canvas, name):
+        self.count = 0
+        canvas.mpl_connect(name, self)
+
+    def __call__(self, event):
+        self.count += 1
+
+
+def test_blit_matches_full_draw():
+    # with an equal aspect ratio, the axes box would only be adjusted to
+    # the new limits by the next full draw
+    im = _image(aspect='auto')
+    damages = []
+    blitter = ImageBlitter(im, damage_callback=damages.append)
+    canvas = im.figure.canvas
+    canvas.draw()
+    draws = _Counter(canvas, 'draw_event')
+
+    damage = blitter.set_view((100, 300), (350, 150))
+    assert draws.count == 0
+    assert damages == [damage]
+    # the whole axes changed, from the full view to a zoomed one
+    assert damage.width >= im.axes.bbox.width - 1
+    blitted = _interior(canvas, im.axes.bbox)
+
+    expected = _image(aspect='auto')
+    expected.axes.set_xlim(100, 300)
+    expected.axes.set_ylim(350, 150)
+    expected.figure.canvas.draw()
+    np.testing.assert_array_equal(
+        blitted, _interior(expected.figure.canvas, expected.axes.bbox))
+
+
+def test_damage_covers_old_and_new_region():
+    im = _image()
+    im.axes.set_aspect('auto')
+    blitter = ImageBlitter(im, settle=None)
+    im.figure.canvas.draw()
+
+    blitter.set_view((400, 700), (400, 100))
+    before = blitter._region
+    assert before.x1 < im.axes.bbox.x1
+    # pan further right: the image moves to the left of the axes, and the
+    # region it uncovers is damaged too
+    damage = blitter.set_view((450, 750), (400, 100))
+    assert blitter._region.x1 < before.x1
+    np.testing.assert_array_equal(damage.get_points(), before.get_points())
+
+
+def test_full_draw_before_background():
+    im = _image()
+    blitter = ImageBlitter(im)
+    draws = _Counter(im.figure.canvas, 'draw_event')
+    damage = blitter.blit()
+    assert draws.count == 1
+    np.testing.assert_array_equal(damage.get_points(),
+                                  im.axes.bbox.get_points())
+
+
+def test_background_excludes_image():
+    im = _image()
+    blitter = ImageBlitter(im)
+    canvas = im.figure.canvas
+    canvas.draw()
+    with_image = _interior(canvas, im.axes.bbox).copy()
+    canvas.restore_region(blitter._background)
+    # only the (white) axes patch
+    assert (_interior(canvas, im.axes.bbox) == 255).all()
+    assert not (with_image == 255).all()
+
+
+def test_savefig_draws_image(tmpdir):
+    im = _image()
+    ImageBlitter(im)
+    path = str(tmpdir.join('blit.png'))
+    im.figure.savefig(path)
+    assert im.stats.ndraws == 1
+
+
+def test_pan_and_zoom_with_mouse():
+    im = _image()
+    blitter = ImageBlitter(im)
+    blitter.connect()
+    canvas = im.figure.canvas
+    canvas.draw()
+    ax = im.axes
+    xlim, ylim = ax.get_xlim(), ax.get_ylim()
+    scale = ax.transData.get_matrix()[0, 0], ax.transData.get_matrix()[1, 1]
+    draws = _Counter(canvas, 'draw_event')
+
+    x, y = ax.bbox.x0 + 50, ax.bbox.y0 + 50
+    canvas.button_press_event(x, y, 1)
+    canvas.motion_notify_event(x + 20, y + 10)
+    canvas.motion_notify_event(x + 40, y + 20)
+    np.testing.assert_allclose(ax.get_xlim(),
+                               np.array(xlim) - 40 / scale[0])
+    np.testing.assert_allclose(ax.get_ylim(),
+                               np.array(ylim) - 20 / scale[1])
+    assert draws.count == 0
+    canvas.button_release_event(x + 40, y + 20, 1)
+
+    xlim = ax.get_xlim()
+    canvas.scroll_event(x, y, 1)
+    xdata = ax.transData.inverted().transform((x, y))[0]
+    width = (xlim[1] - xlim[0]) / 1.25
+    np.testing.assert_allclose(ax.get_xlim()[1] - ax.get_xlim()[0], width)
+    assert ax.get_xlim()[0] < xdata < ax.get_xlim()[1]
+
+
+def test_disconnect():
+    im = _image()
+    blitter = ImageBlitter(im)
+    blitter.connect()
+    blitter.disconnect()
+    assert not im.get_animated()
+    im.figure.canvas.draw()
+    assert im.stats.ndraws == 1
+    assert blitter._background is None
@@ -0,0 +1,106 @@
+from __future__ import print_function, division
+
+from threading import Lock
+
+import pytest
+import numpy as np
+
+from ..chunked import bands, chunk_rows, read_strided
+from ..downsample import reduce_window
+from ..modest_image import ModestImage
+
+
+class ChunkedArray(object):
+    """ Minimal h5py/zarr-like array, recording the slices read """
+
+    def __init__(self, data, chunks):
+        self._data = data
+        self.chunks = chunks
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.ndim = data.ndim
+        self.size = data.size
+        self.reads = []
+        self._lock = Lock()
+
+    def __getitem__(self, view):
+        with self._lock:
+            self.reads.append(view)
+        return self._data[view]
+
+
+def test_chunk_rows():
+    assert chunk_rows(ChunkedArray(np.zeros((100, 100)), (16, 16))) == 16
+    assert chunk_rows(ChunkedArray(np.zeros((100, 100)),
+                                   ((30, 30, 40), (100,)))) == 30
+    assert chunk_rows(np.zeros((10, 2 ** 20), dtype=np.uint8)) == 4
+
+
+@pytest.mark.parametrize(('y0', 'n', 'step', 'rows'),
+                         [(0, 100, 1, 16), (5, 37, 3, 16),
+                          (7, 20, 40, 16), (0, 1, 1, 1)])
+def test_bands_cover_rows(y0, n, step, rows):
+    result = bands(y0, n, step, rows, max_bands=8)
+    assert result[0][0] == 0 and result[-1][1] == n
+    for (lo0, hi0), (lo1, hi1) in zip(result[:-1], result[1:]):
+        assert hi0 == lo1
+        # bands never share a chunk
+        assert (y0 + (hi0 - 1) * step) // rows != (y0 + lo1 * step) // rows
+    assert len(result) <= 8
+
+
+def test_bands_max_rows():
+    result = bands(0, 100, 1, 1000, max_rows=7)
+    assert max(hi - lo for lo, hi in result) <= 7
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_read_strided_chunked(parallel):
+    data = np.random.random((300, 200))
+    chunked = ChunkedArray(data, (20, 50))
+    result = read_strided(chunked, 7, 190, 3, 11, 290, 4, parallel=parallel)
+    np.testing.assert_array_equal(result, data[11:290:4, 7:190:3])
+    assert len(chunked.reads) > 1
+
+
+def test_read_strided_memmap(tmpdir):
+    data = np.random.random((500, 300))
+    mm = np.memmap(str(tmpdir.join('data.raw')), dtype=data.dtype,
+                   mode='w+', shape=data.shape)
+    mm[:] = data
+    np.testing.assert_array_equal(read_strided(mm, 0, 300, 7, 3, 500, 5),
+                                  data[3:500:5, ::7])
+
+
+def test_read_strided_ndarray_is_view():
+    data = np.random.random((50, 50))
+    assert read_strided(data, 0, 50, 2, 0, 50, 2).base is data
+
+
+def test_reduce_window_chunked_array():
+    data = np.random.random((300, 200))
+    chunked = ChunkedArray(data, (20, 50))
+    serial = reduce_window(data, 7, 190, 3, 11, 290, 4, 'max',
+                           parallel=False)
+    result = reduce_window(chunked, 7, 190, 3, 11, 290, 4, 'max')
+    np.testing.assert_array_equal(result, serial)
+
+
+def test_modest_image_chunked_array():
+    import matplotlib.pyplot as plt
+    data = np.random.random((3000, 2000))
+    chunked = ChunkedArray(data, (64, 64))
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    modest = ModestImage(ax, data=chunked, interpolation='nearest')
+    ax.add_artist(modest)
+    modest.set_clim(0, 1)
+    ax.set_xlim(0, 2000)
+    ax.set_ylim(0, 3000)
+    fig.canvas.draw()
+
+    x0, x1, y0, y1 = modest._bounds
+    np.testing.assert_array_equal(modest._A,
+                                  data[y0:y1:modest._sy, x0:x1:modest._sx])
+    plt.close(fig)
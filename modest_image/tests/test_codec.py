@@ -0,0 +1,61 @@
+from __future__ import print_function, division
+
+import pytest
+import numpy as np
+
+from ..codec import PackedArray, pack, unpack
+
+
+def _window():
+    y, x = np.mgrid[0:120, 0:90]
+    data = np.sin(x / 10.) * np.cos(y / 7.) * 1000
+    data[:5, :7] = np.nan
+    return np.ma.masked_array(data, mask=~np.isfinite(data))
+
+
+@pytest.mark.parametrize('codec', [None, 'zlib', 'bz2'])
+@pytest.mark.parametrize(('dtype', 'atol'), [(None, 0), ('float32', 1e-3),
+                                             ('float16', 1),
+                                             ('uint16', 2000 / 65534.)])
+def test_roundtrip(dtype, codec, atol):
+    window = _window()
+    packed = pack(window, dtype=dtype, codec=codec)
+    result = unpack(packed)
+    assert result.dtype == window.dtype
+    assert result.shape == window.shape
+    np.testing.assert_array_equal(result.mask, window.mask)
+    np.testing.assert_allclose(result[~window.mask], window[~window.mask],
+                               atol=atol)
+    if dtype is None and codec is None:
+        assert packed is window
+    else:
+        assert packed.nbytes < window.nbytes
+
+
+def test_uint16_invalid_values():
+    data = np.array([[1., np.nan, 3.], [np.inf, 2., 5.]])
+    result = PackedArray(data, dtype='uint16').unpack()
+    assert not isinstance(result, np.ma.MaskedArray)
+    np.testing.assert_array_equal(np.isnan(result), ~np.isfinite(data))
+    np.testing.assert_allclose(result[np.isfinite(data)], [1, 3, 2, 5],
+                               atol=4 / 65534.)
+
+    constant = PackedArray(np.full((3, 3), 7.), dtype='uint16').unpack()
+    np.testing.assert_array_equal(constant, 7)
+
+
+def test_integer_windows_only_compressed():
+    data = (np.arange(3000) % 200).astype(np.int16).reshape(50, 60)
+    assert pack(data, dtype='float16') is data
+    packed = pack(data, dtype='uint16', codec='zlib')
+    assert packed.nbytes < data.nbytes / 4
+    result = packed.unpack()
+    assert result.dtype == np.int16
+    np.testing.assert_array_equal(result, data)
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        pack(np.zeros(3), dtype='int8')
+    with pytest.raises(ValueError):
+        pack(np.zeros(3), codec='gzip')
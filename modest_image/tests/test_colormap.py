@@ -0,0 +1,127 @@
+from __future__ import print_function, division
+
+import pytest
+import numpy as np
+import matplotlib.cm as cm
+import matplotlib.colors as mcolors
+
+from .. import colormap
+from ..colormap import (Colormapper, color_table, row_blocks, data_span,
+                        rescaled)
+
+
+def _cmap():
+    cmap = cm.get_cmap('viridis')
+    cmap = mcolors.ListedColormap(cmap(np.linspace(0, 1, 256)))
+    cmap.set_under('r')
+    cmap.set_over('b')
+    cmap.set_bad('g')
+    return cmap
+
+
+def _expected(data, norm, cmap):
+    return cm.ScalarMappable(norm, cmap).to_rgba(data, bytes=True)
+
+
+@pytest.mark.parametrize('dtype', ['u1', 'i1', 'u2', 'i2', '>i2', 'i4',
+                                   'f4', 'f8', '>f8'])
+@pytest.mark.parametrize('clip', [False, True])
+@pytest.mark.parametrize('limits', [(-50, 60), (3, 3), (0, 1)])
+def test_matches_matplotlib(dtype, clip, limits):
+    random = np.random.RandomState(0)
+    data = (random.randn(64, 48) * 100).astype(dtype)
+    masked = np.ma.masked_array(data, mask=random.rand(64, 48) < .1)
+    norm = mcolors.Normalize(*limits, clip=clip)
+    cmap = _cmap()
+
+    for values in [data, masked]:
+        np.testing.assert_array_equal(Colormapper()(values, norm, cmap),
+                                      _expected(values, norm, cmap))
+
+
+def test_nonlinear_norm():
+    data = np.random.random((30, 40)) * 200
+    norm = mcolors.LogNorm(1, 100)
+    cmap = _cmap()
+    np.testing.assert_array_equal(Colormapper()(data, norm, cmap),
+                                  _expected(data, norm, cmap))
+
+
+def test_autoscales_norm():
+    data = np.random.random((30, 40))
+    norm = mcolors.Normalize()
+    Colormapper()(data, norm, _cmap())
+    assert norm.vmin == data.min() and norm.vmax == data.max()
+
+
+def test_tables_reused_until_norm_changes():
+    data = np.arange(100, dtype=np.uint8).reshape(10, 10)
+    norm = mcolors.Normalize(0, 50)
+    cmap = _cmap()
+    colormapper = Colormapper()
+
+    colormapper(data, norm, cmap)
+    tables = list(colormapper._tables.values())
+    colormapper(data, norm, cmap)
+    assert list(colormapper._tables.values()) == tables
+
+    norm.vmax = 80
+    np.testing.assert_array_equal(colormapper(data, norm, cmap),
+                                  _expected(data, norm, cmap))
+    assert len(colormapper._tables) == 2
+
+
+@pytest.mark.parametrize('dtype', ['u2', 'i4', 'i8'])
+@pytest.mark.parametrize('norm', [mcolors.Normalize(100, 900),
+                                  mcolors.LogNorm(100, 900)])
+def test_span_gives_rescaled_colors(dtype, norm):
+    data = (np.arange(300 * 300) % 1000).astype(dtype).reshape(300, 300)
+    span = np.array(0, dtype=dtype), np.array(999, dtype=dtype)
+    values = rescaled(data, span, norm)
+    assert values.dtype == np.float32
+    np.testing.assert_allclose(values, data, rtol=1e-5)
+
+    cmap = _cmap()
+    np.testing.assert_array_equal(Colormapper()(data, norm, cmap, span=span),
+                                  _expected(values, norm, cmap))
+
+
+def test_data_span():
+    data = np.ma.masked_array(np.arange(12, dtype='u2').reshape(3, 4),
+                              mask=np.arange(12).reshape(3, 4) < 2)
+    if not colormap.RESCALES:
+        assert data_span(data) is None
+        return
+    assert data_span(data) == (2, 11)
+    assert data_span(np.ma.masked_all((2, 2), dtype='u2')) == (0, 1)
+    # floating point data are rescaled in their own precision
+    assert data_span(data.astype('f8')) is None
+
+
+def test_color_table():
+    cmap = _cmap()
+    table = color_table(cmap)
+    assert table.shape == (cmap.N + 3, 4)
+    np.testing.assert_array_equal(table[0], [255, 0, 0, 255])
+    np.testing.assert_array_equal(table[-2], [0, 0, 255, 255])
+    np.testing.assert_array_equal(table[-1], [0, 127, 0, 255])
+
+
+@pytest.mark.parametrize('norm', [mcolors.Normalize(-50, 60),
+                                  mcolors.LogNorm(1, 100)])
+def test_normalized_in_blocks(monkeypatch, norm):
+    monkeypatch.setattr(colormap, 'BLOCK_PIXELS', 100)
+    random = np.random.RandomState(0)
+    data = np.ma.masked_array(random.randn(64, 48) * 100,
+                              mask=random.rand(64, 48) < .1)
+    assert len(list(row_blocks(data.shape, colormap.BLOCK_PIXELS))) == 32
+    cmap = _cmap()
+    np.testing.assert_array_equal(Colormapper()(data, norm, cmap),
+                                  _expected(data, norm, cmap))
+
+
+def test_row_blocks():
+    blocks = list(row_blocks((10, 30), 100))
+    assert blocks == [slice(0, 3), slice(3, 6), slice(6, 9), slice(9, 10)]
+    # rows wider than a block are still colormapped one at a time
+    assert len(list(row_blocks((5, 1000), 100))) == 5
@@ -0,0 +1,119 @@
+from __future__ import print_function, division
+
+import os
+import json
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from ..diskcache import OverviewStore, source_info
+from ..pyramid import ImagePyramid
+from ..modest_image import ModestImage
+
+
+def _memmap(tmpdir, shape=(512, 384)):
+    path = str(tmpdir.join('image.raw'))
+    mm = np.memmap(path, dtype=np.float32, mode='w+', shape=shape)
+    mm[:] = np.random.random(shape)
+    mm.flush()
+    return np.memmap(path, dtype=np.float32, mode='r', shape=shape)
+
+
+def test_source_info(tmpdir):
+    mm = _memmap(tmpdir)
+    info = source_info(mm)
+    assert info['path'] == os.path.abspath(mm.filename)
+    assert info['shape'] == [512, 384]
+    assert source_info(np.zeros((3, 3))) is None
+
+    # slices of the same file are told apart
+    assert source_info(mm[10:]) != info
+    assert source_info(mm[:, ::2]) != info
+
+
+def test_key(tmpdir):
+    store = OverviewStore(str(tmpdir.join('cache')))
+    mm = _memmap(tmpdir)
+    assert store.key(mm) == store.key(mm)
+    assert store.key(mm) != store.key(mm, how='mean')
+    assert store.key(mm[1:]) != store.key(mm)
+    assert store.key(np.zeros((3, 3))) is None
+
+
+def test_levels_saved_and_reloaded(tmpdir):
+    store = OverviewStore(str(tmpdir.join('cache')))
+    mm = _memmap(tmpdir)
+    pyr = ImagePyramid(mm, store=store)
+    expected = pyr.level(3)
+
+    with open(os.path.join(store.directory, 'index.json')) as infile:
+        index = json.load(infile)
+    entry = index[store.key(mm)]
+    assert entry['levels'] == [1, 2, 3]
+    assert entry['path'] == os.path.abspath(mm.filename)
+
+    # A new pyramid for the same file reads level 3 straight from the store
+    pyr = ImagePyramid(_memmap_again(mm), store=store)
+    pyr._downsample = None
+    assert pyr.has_level(3)
+    level = pyr.level(3)
+    assert isinstance(level, np.memmap)
+    np.testing.assert_array_equal(level, expected)
+    assert not pyr.has_level(4)
+
+
+def _memmap_again(mm):
+    return np.memmap(mm.filename, dtype=mm.dtype, mode='r', shape=mm.shape)
+
+
+def test_modified_file_invalidates(tmpdir):
+    store = OverviewStore(str(tmpdir.join('cache')))
+    mm = _memmap(tmpdir)
+    key = store.key(mm)
+    ImagePyramid(mm, store=store).level(2)
+
+    stat = os.stat(mm.filename)
+    os.utime(mm.filename, (stat.st_atime, stat.st_mtime + 10))
+    mm = _memmap_again(mm)
+    assert store.key(mm) != key
+    assert not ImagePyramid(mm, store=store).has_level(2)
+
+    # saving levels for the new version removes those of the old one
+    ImagePyramid(mm, store=store).level(1)
+    assert store.load(key, 2) is None
+
+
+def test_clear(tmpdir):
+    store = OverviewStore(str(tmpdir.join('cache')))
+    mm = _memmap(tmpdir)
+    ImagePyramid(mm, store=store).level(2)
+    store.clear()
+    assert [f for f in os.listdir(store.directory)
+            if f.endswith('.npy')] == []
+
+
+def test_modest_image_overview_cache(tmpdir):
+    mm = _memmap(tmpdir, shape=(4000, 3000))
+    cache = str(tmpdir.join('cache'))
+
+    def draw(data):
+        fig = plt.figure()
+        ax = fig.add_subplot(111)
+        artist = ModestImage(ax, data=data, overview_cache=cache,
+                             interpolation='nearest')
+        ax.add_artist(artist)
+        artist.set_clim(0, 1)
+        ax.set_xlim(0, 3000)
+        ax.set_ylim(0, 4000)
+        fig.canvas.draw()
+        plt.close(fig)
+        return artist
+
+    first = draw(mm)
+    assert first.get_overview_cache() is not None
+    assert first.pyramid.nbuilt > 1
+
+    second = draw(_memmap_again(mm))
+    levels = second.pyramid._levels
+    assert any(isinstance(levels[k], np.memmap) for k in levels if k > 0)
+    np.testing.assert_array_equal(first._A, second._A)
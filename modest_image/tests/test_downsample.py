@@ -0,0 +1,80 @@
+from __future__ import print_function, division
+
+import pytest
+import numpy as np
+
+from ..downsample import block_reduce, reduce_window, REDUCTIONS
+
+FUNCS = {'mean': np.mean, 'max': np.max, 'min': np.min, 'sum': np.sum}
+
+
+def naive_reduce(data, sy, sx, how):
+    ny, nx = -(-data.shape[0] // sy), -(-data.shape[1] // sx)
+    result = np.zeros((ny, nx))
+    for i in range(ny):
+        for j in range(nx):
+            block = data[i * sy:(i + 1) * sy, j * sx:(j + 1) * sx]
+            result[i, j] = FUNCS[how](block)
+    return result
+
+
+@pytest.mark.parametrize('how', REDUCTIONS)
+@pytest.mark.parametrize(('shape', 'sy', 'sx'), [((20, 30), 2, 3),
+                                                 ((21, 31), 4, 5),
+                                                 ((7, 9), 1, 4),
+                                                 ((3, 3), 8, 8)])
+def test_block_reduce(how, shape, sy, sx):
+    data = np.random.random(shape)
+    result = block_reduce(data, sy, sx, how)
+    np.testing.assert_allclose(result, naive_reduce(data, sy, sx, how))
+
+
+def test_block_reduce_integer():
+    data = np.random.randint(0, 2 ** 16, (30, 30)).astype(np.uint16)
+    assert block_reduce(data, 3, 3, 'max').dtype == np.uint16
+    assert block_reduce(data, 3, 3, 'mean').dtype == np.float32
+    np.testing.assert_allclose(block_reduce(data, 3, 3, 'sum'),
+                               naive_reduce(data, 3, 3, 'sum'))
+
+
+def test_block_reduce_rgb():
+    data = np.random.randint(0, 256, (10, 10, 3)).astype(np.uint8)
+    result = block_reduce(data, 2, 2, 'mean')
+    assert result.shape == (5, 5, 3)
+    assert result.dtype == np.uint8
+    with pytest.raises(ValueError):
+        block_reduce(data, 2, 2, 'sum')
+
+
+def test_invalid_reduction():
+    with pytest.raises(ValueError):
+        block_reduce(np.zeros((4, 4)), 2, 2, 'median')
+
+
+def test_hot_pixel_survives():
+    data = np.zeros((100, 100))
+    data[37, 61] = 1
+    assert data[::10, ::10].max() == 0
+    assert block_reduce(data, 10, 10, 'max').max() == 1
+
+
+@pytest.mark.parametrize('chunk_bytes', [1, 1000, 2 ** 25])
+def test_reduce_window_chunked(chunk_bytes):
+    data = np.random.random((97, 89))
+    x0, x1, sx, y0, y1, sy = 3, 80, 4, 10, 97, 3
+    result = reduce_window(data, x0, x1, sx, y0, y1, sy, 'mean',
+                           chunk_bytes=chunk_bytes)
+    assert result.shape == data[y0:y1:sy, x0:x1:sx].shape
+    np.testing.assert_allclose(result,
+                               naive_reduce(data[y0:y1, x0:x1], sy, sx,
+                                            'mean'))
+
+
+def test_reduce_window_memmap(tmpdir):
+    data = np.random.random((64, 64))
+    mm = np.memmap(str(tmpdir.join('data.raw')), dtype=data.dtype,
+                   mode='w+', shape=data.shape)
+    mm[:] = data
+    np.testing.assert_allclose(reduce_window(mm, 0, 64, 8, 0, 64, 8, 'min',
+                                             chunk_bytes=600),
+                               naive_reduce(data, 8, 8, 'min'))
@@ -0,0 +1,116 @@
+from __future__ import print_function, division
+
+import pytest
+import numpy as np
+from matplotlib import pyplot as plt
+
+da = pytest.importorskip('dask.array')
+
+from ..chunked import read_strided
+from ..downsample import reduce_window, block_reduce
+from ..autoscale import autoscale_limits, block_sample
+from ..modest_image import ModestImage
+
+
+class Recorder(object):
+
+    """Array wrapper recording the regions read from it"""
+
+    def __init__(self, data):
+        self.data = data
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.ndim = data.ndim
+        self.reads = []
+
+    def __getitem__(self, key):
+        self.reads.append(key)
+        return self.data[key]
+
+
+def _lazy(data, chunks=50):
+    recorder = Recorder(data)
+    return da.from_array(recorder, chunks=chunks), recorder
+
+
+def _rows_read(recorder):
+    """The (start, stop) rows of the non-empty regions read"""
+    rows = set()
+    for key in recorder.reads:
+        if key[0].stop > key[0].start:
+            rows.add((key[0].start, key[0].stop))
+    return rows
+
+
+def test_read_strided_only_computes_visible_chunks():
+    data = np.random.random((400, 300))
+    lazy, recorder = _lazy(data)
+    window = read_strided(lazy, 20, 140, 3, 110, 190, 2)
+    assert isinstance(window, np.ndarray)
+    np.testing.assert_array_equal(window, data[110:190:2, 20:140:3])
+    rows = _rows_read(recorder)
+    assert rows and all(100 <= lo and hi <= 200 for lo, hi in rows)
+
+
+@pytest.mark.parametrize(('how', 'shape'), [('mean', (400, 300)),
+                                            ('max', (401, 303)),
+                                            ('sum', (250, 260)),
+                                            ('mean', (120, 130, 3))])
+def test_reduce_window(how, shape):
+    data = np.random.random(shape)
+    if len(shape) == 3:
+        data = (data * 255).astype(np.uint8)
+    lazy, recorder = _lazy(data, chunks=(50, 50) + shape[2:])
+    result = reduce_window(lazy, 7, shape[1], 4, 3, shape[0] - 20, 3, how)
+    expected = block_reduce(data[3:shape[0] - 20, 7:], 3, 4, how)
+    assert result.dtype == expected.dtype
+    np.testing.assert_allclose(result, expected)
+
+
+def _chunks_read(keys, chunk):
+    """The (row, column) indices of the chunks the regions read overlap"""
+    chunks = set()
+    for ys, xs in keys:
+        if ys.stop <= ys.start or xs.stop <= xs.start:
+            continue
+        for cy in range(ys.start // chunk, (ys.stop - 1) // chunk + 1):
+            for cx in range(xs.start // chunk, (xs.stop - 1) // chunk + 1):
+                chunks.add((cy, cx))
+    return chunks
+
+
+def test_full_autoscale_samples_lazy_arrays():
+    data = np.random.random((4000, 4000)).astype(np.float32)
+    lazy, recorder = _lazy(data, chunks=100)
+    vmin, vmax = autoscale_limits(lazy, 'full')
+    assert data.min() <= vmin < vmax <= data.max()
+
+    # only the chunks holding the sampled blocks are computed
+    blocks = Recorder(data)
+    block_sample(blocks)
+    needed = _chunks_read(blocks.reads, 100)
+    assert _chunks_read(recorder.reads, 100) == needed
+    assert len(needed) < 1600 / 2
+
+
+@pytest.mark.parametrize('kwargs', [{}, dict(downsample='max'),
+                                    dict(tile_size=64), dict(pyramid=True)])
+def test_modest_image(kwargs):
+    x, y = np.mgrid[0:1000, 0:1000]
+    data = np.sin(x / 10.) * np.cos(y / 30.)
+    lazy = da.from_array(data, chunks=128)
+
+    images = []
+    for d in (data, lazy):
+        fig = plt.figure()
+        ax = fig.add_subplot(111)
+        im = ModestImage(ax, data=d, clim=(-1, 1), **kwargs)
+        ax.add_artist(im)
+        ax.set_xlim(200, 700)
+        ax.set_ylim(100, 600)
+        fig.canvas.draw()
+        images.append(im)
+
+    np.testing.assert_array_equal(np.asarray(images[0]._A),
+                                  np.asarray(images[1]._A))
+    plt.close('all')
@@ -1,14 +1,23 @@
 from __future__ import print_function, division
 
+import io
 import itertools
+import threading
+import warnings
+from functools import partial
 import pytest
 
 from matplotlib import pyplot as plt
 import matplotlib.image as mi
+from matplotlib.transforms import Affine2D, Transform
+from matplotlib.backends.backend_mixed import MixedModeRenderer
 
 import numpy as np
 
-from ..modest_image import ModestImage
+from .. import modest_image
+from ..modest_image import ModestImage, extract_matched_slices, warped_slices
+from ..bands import BandStack
+from ..pyramid import ImagePyramid
 
 x, y = np.mgrid[0:300, 0:300]
 _data = np.sin(x / 10.) * np.cos(y / 30.)
@@ -138,6 +147,396 @@ def test_zoom_out():
     check('zoom_out', modest.axes, axim.axes, thresh=0.4)
 
 
+def test_pyramid_zoom_out():
+    """ zoom out, reading from the image pyramid """
+    data = default_data()
+    modest = init(partial(ModestImage, pyramid=True), data)
+    axim = init(mi.AxesImage, data)
+    lohi = -1000, 1000
+    modest.axes.set_xlim(lohi)
+    axim.axes.set_xlim(lohi)
+    modest.axes.set_ylim(lohi)
+    axim.axes.set_ylim(lohi)
+
+    check('pyramid_zoom_out', modest.axes, axim.axes, thresh=0.4)
+    assert modest.pyramid.nbuilt > 1
+
+
+def test_pyramid_zoom():
+    """ zoom in with pyramid enabled uses full resolution data """
+    data = default_data()
+    modest = init(partial(ModestImage, pyramid=True), data)
+    axim = init(mi.AxesImage, data)
+    lohi = 200, 250
+    for ax in [modest.axes, axim.axes]:
+        ax.set_xlim(lohi)
+        ax.set_ylim(lohi)
+
+    check('pyramid_zoom', modest.axes, axim.axes)
+    assert modest.pyramid.nbuilt == 1
+
+
+def test_pyramid_reset_on_set_data():
+    data = default_data()
+    modest = init(partial(ModestImage, pyramid=True), data)
+    pyramid = modest.pyramid
+    modest.set_data(data * 2)
+    assert modest.pyramid is not pyramid
+    modest.set_pyramid(False)
+    assert modest.pyramid is None
+
+
+@pytest.mark.parametrize('pyramid', [False, True])
+def test_tiles(pyramid):
+    """ tiled rendering matches AxesImage, at several zooms """
+    data = default_data()
+    modest = init(partial(ModestImage, tile_size=64, pyramid=pyramid), data)
+    axim = init(mi.AxesImage, data)
+    check('tiles', modest.axes, axim.axes)
+
+    for lohi in [(200, 250), (-1000, 1000)]:
+        for ax in [modest.axes, axim.axes]:
+            ax.set_xlim(lohi)
+            ax.set_ylim(lohi)
+        check('tiles', modest.axes, axim.axes, thresh=0.4)
+
+
+def test_tiles_reused_when_panning():
+    data = default_data()
+    modest = init(partial(ModestImage, tile_size=32), data)
+    ax = modest.axes
+    ax.set_xlim(0, 100)
+    ax.set_ylim(0, 100)
+    ax.figure.canvas.draw()
+    ntiles = len(modest._tiles)
+    misses = modest._tiles.misses
+
+    # moving by one tile width only needs one new column of tiles
+    ax.set_xlim(50, 150)
+    ax.figure.canvas.draw()
+    assert modest._tiles.misses - misses < ntiles
+    assert modest._tiles.hits > 0
+
+
+def test_tiles_recolored_on_clim_change():
+    data = default_data()
+    modest = init(partial(ModestImage, tile_size=64), data)
+    axim = init(mi.AxesImage, data)
+    modest.axes.figure.canvas.draw()
+    for im in [modest, axim]:
+        im.set_clim(0, .5)
+    check('tiles_clim', modest.axes, axim.axes)
+
+
+def test_lut():
+    """ colormapping with lookup tables matches AxesImage """
+    data = default_data()
+    modest = init(partial(ModestImage, lut=True), data)
+    axim = init(mi.AxesImage, data)
+    check('lut', modest.axes, axim.axes)
+
+    for im in [modest, axim]:
+        im.cmap.set_under('r')
+        im.set_clim(0, .5)
+    check('lut_clim', modest.axes, axim.axes)
+
+
+@pytest.mark.parametrize('lut', [False, True])
+def test_clim_change_does_not_reslice(lut):
+    data = default_data()
+    modest = init(partial(ModestImage, lut=lut), data)
+    modest.axes.set_xlim(100, 150)
+    modest.axes.figure.canvas.draw()
+    window = modest._window
+
+    modest.set_clim(0, .5)
+    modest.axes.figure.canvas.draw()
+    assert modest._window is window
+
+    axim = init(mi.AxesImage, data)
+    axim.axes.set_xlim(100, 150)
+    axim.set_clim(0, .5)
+    check('clim_no_reslice', modest.axes, axim.axes)
+
+
+def test_lut_integer_data():
+    data = (np.arange(300 * 300) % 1000).astype(np.uint16).reshape(300, 300)
+    modest = init(partial(ModestImage, lut=True), data)
+    axim = init(mi.AxesImage, data)
+    for im in [modest, axim]:
+        im.set_clim(100, 900)
+    # the window is rounded by its own span, and AxesImage (from matplotlib
+    # 2.1) by that of the whole array: allow a few colors off by one
+    check('lut_integer', modest.axes, axim.axes, thresh=1e-3)
+
+
+DIRECT_VIEWS = [((0, 300), (0, 300)), ((37.3, 61.2), (120.4, 90.1)),
+                ((-50, 30), (250, 400)), ((3, 4), (5, 6))]
+
+
+@pytest.mark.parametrize(('origin', 'view', 'kwargs'),
+                         itertools.product(['upper', 'lower'], DIRECT_VIEWS,
+                                           [{}, dict(lut=True),
+                                            dict(tile_size=64)]))
+def test_direct_matches_resampled(origin, view, kwargs):
+    """ drawing screen pixels directly gives the same image as AxesImage """
+    data = default_data().copy()
+    data[50:60, 20:80] = np.nan
+    modest = init(partial(ModestImage, **kwargs), data, origin=origin)
+    resampled = init(partial(ModestImage, direct=False, **kwargs), data,
+                     origin=origin)
+    for im in [modest, resampled]:
+        im.axes.set_aspect('auto')
+        im.axes.set_xlim(*view[0])
+        im.axes.set_ylim(*view[1])
+    check('direct_%s' % origin, modest.axes, resampled.axes)
+
+
+def test_direct_integer_and_alpha():
+    data = (np.arange(300 * 300) % 1000).astype(np.uint16).reshape(300, 300)
+    modest = init(ModestImage, data, extent=(-3, 7, 20, 10))
+    axim = init(mi.AxesImage, data, extent=(-3, 7, 20, 10))
+    for im in [modest, axim]:
+        im.set_clim(100, 900)
+        im.set_alpha(.4)
+        im.axes.set_xlim(-2.1, 3.7)
+    # as in test_lut_integer_data, a few colors may be off by one
+    check('direct_integer', modest.axes, axim.axes, thresh=1e-3)
+
+
+def _darken(image, dpi):
+    return image * [.5, .5, .5, 1], 0, 0
+
+
+def test_agg_filter():
+    data = default_data()
+    modest = init(ModestImage, data)
+    axim = init(mi.AxesImage, data)
+    for im in [modest, axim]:
+        im.set_agg_filter(_darken)
+    check('agg_filter', modest.axes, axim.axes)
+
+
+def test_rasterized(monkeypatch):
+    starts = []
+    start_rasterizing = MixedModeRenderer.start_rasterizing
+
+    def record(self):
+        starts.append(self)
+        start_rasterizing(self)
+
+    monkeypatch.setattr(MixedModeRenderer, 'start_rasterizing', record)
+    modest = init(ModestImage, default_data())
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        modest.set_rasterized(True)
+    modest.figure.savefig(io.BytesIO(), format='pdf')
+    assert len(starts) == 1
+    assert modest.stats.ndraws == 1
+
+
+@pytest.mark.parametrize(('kwargs', 'direct'),
+                         [({}, True), (dict(direct=False), False),
+                          (dict(interpolation='bilinear'), False)])
+def test_direct_skips_make_image(monkeypatch, kwargs, direct):
+    calls = []
+    make_image = mi.AxesImage.make_image
+
+    def record(self, *args, **kwargs):
+        calls.append(self)
+        return make_image(self, *args, **kwargs)
+
+    monkeypatch.setattr(mi.AxesImage, 'make_image', record)
+    modest = init(ModestImage, default_data())
+    modest.update(kwargs)
+    modest.axes.figure.canvas.draw()
+    assert (calls == []) == direct
+
+    # not for non-affine (e.g. logarithmic) axes
+    modest.axes.set_xscale('log')
+    modest.axes.set_xlim(1, 300)
+    modest.axes.figure.canvas.draw()
+    assert calls
+
+
+def test_nearest_pixels():
+    pixels = modest_image.nearest_pixels(7, .5, 0.25)
+    np.testing.assert_array_equal(pixels, [0, 1, 1, 2, 2, 3, 3])
+    span = modest_image.nearest_pixels(7, .5, 0.25, span=True)
+    np.testing.assert_array_equal(span, pixels)
+    np.testing.assert_array_equal(
+        modest_image.nearest_pixels(4, -1., 3.5), [3, 2, 1, 0])
+
+
+@pytest.mark.parametrize('pyramid', [False, True])
+def test_downsample_max(pyramid):
+    """ isolated pixels survive zooming out with max downsampling """
+    data = np.zeros((3000, 3000))
+    data[1501, 1502] = 1
+    modest = init(partial(ModestImage, downsample='max', pyramid=pyramid),
+                  data)
+    modest.axes.figure.canvas.draw()
+    assert modest._sx > 1
+    assert modest._A.max() == 1
+
+
+def test_downsample_mean_matches_zoomed_in():
+    """ with no downsampling needed, all modes agree with AxesImage """
+    data = default_data()
+    modest = init(partial(ModestImage, downsample='mean'), data)
+    axim = init(mi.AxesImage, data)
+    check('downsample_mean', modest.axes, axim.axes)
+
+
+def test_invalid_downsample():
+    with pytest.raises(ValueError):
+        init(partial(ModestImage, downsample='median'), default_data())
+
+
+def _big_data():
+    x, y = np.mgrid[0:2000, 0:2000]
+    return np.sin(x / 10.) * np.cos(y / 30.)
+
+
+def _init_async(data, **kwargs):
+    """ asynchronous ModestImage, recording (rather than doing) redraws """
+    modest = init(partial(ModestImage, asynchronous=True, **kwargs), data)
+    modest.redraws = []
+    canvas = modest.figure.canvas
+    canvas.draw_idle = lambda: modest.redraws.append(
+        threading.current_thread())
+    return modest
+
+
+def _fire_async_timer(modest):
+    """ run the callbacks of the timer, which Agg canvases never start """
+    modest._async_timer[1]._on_timer()
+
+
+@pytest.mark.parametrize('tile_size', [None, 256])
+def test_asynchronous(tile_size):
+    """ background results match synchronous ones """
+    data = _big_data()
+    sync = init(partial(ModestImage, tile_size=tile_size), data)
+    modest = _init_async(data, tile_size=tile_size)
+    sync.axes.figure.canvas.draw()
+
+    modest.axes.figure.canvas.draw()
+    future = modest._async_future
+    assert future is not None
+    future.result()
+    # the redraw is requested from the timer, in the main thread
+    assert modest.redraws == []
+    _fire_async_timer(modest)
+    assert modest.redraws == [threading.current_thread()]
+    modest.axes.figure.canvas.draw()
+
+    assert modest._async_future is None
+    assert modest._bounds == sync._bounds
+    np.testing.assert_array_equal(modest._A, sync._A)
+
+
+def test_asynchronous_cancels_stale_requests():
+    data = _big_data()
+    modest = _init_async(data)
+    modest.axes.figure.canvas.draw()
+    first = modest._async_future
+    generation = modest._generation
+
+    modest.axes.set_xlim(500, 1500)
+    modest.axes.set_ylim(500, 1500)
+    modest.axes.figure.canvas.draw()
+    assert modest._async_future is not first
+    assert modest._generation > generation
+
+    # whatever the first request produced, it is never shown
+    modest._async_future.result()
+    modest.axes.figure.canvas.draw()
+    assert modest._bounds[0] >= 495 and modest._bounds[1] <= 1505
+
+
+def test_asynchronous_preview_from_pyramid():
+    data = _big_data()
+    modest = _init_async(data, pyramid=True)
+    modest.pyramid.level(1)
+
+    # level 1 is already built, so can be read without waiting
+    modest.axes.set_xlim(0, 1000)
+    modest.axes.set_ylim(0, 1000)
+    modest.axes.figure.canvas.draw()
+    assert modest._async_future is None
+    assert modest._bounds is not None
+
+    # zooming out needs level 2, which is built in the background while
+    # level 1 is shown
+    modest.axes.set_xlim(-4000, 6000)
+    modest.axes.set_ylim(-4000, 6000)
+    modest.axes.figure.canvas.draw()
+    assert modest._async_future is not None
+    assert modest._is_preview
+
+    modest._async_future.result()
+    modest.axes.figure.canvas.draw()
+    assert not modest._is_preview
+    assert modest.pyramid.nbuilt > 2
+
+
+@pytest.mark.parametrize(('pyramid', 'downsample', 'tile_size'),
+                         [(False, None, None), (True, None, None),
+                          (True, 'mean', None), (False, 'max', 64),
+                          (True, None, 64)])
+def test_update_region(pyramid, downsample, tile_size):
+    """ partial updates match a full set_data """
+    options = dict(pyramid=pyramid, downsample=downsample,
+                   tile_size=tile_size)
+    data = _big_data()
+    modest = init(partial(ModestImage, **options), data.copy())
+    modest.axes.set_xlim(100, 1800)
+    modest.axes.set_ylim(200, 1900)
+    modest.axes.figure.canvas.draw()
+    ntiles = len(modest._tiles)
+
+    patch = np.random.random((256, 2000))
+    modest.update_region(patch, 700, 0)
+    modest.axes.figure.canvas.draw()
+
+    data[700:956] = patch
+    expected = init(partial(ModestImage, **options), data)
+    expected.axes.set_xlim(100, 1800)
+    expected.axes.set_ylim(200, 1900)
+    expected.axes.figure.canvas.draw()
+
+    np.testing.assert_array_equal(modest._A, expected._A)
+    if tile_size is not None:
+        assert modest._tiles.misses < 2 * ntiles
+
+
+def test_set_data_dirty():
+    data = default_data().copy()
+    modest = init(partial(ModestImage, pyramid=True), data)
+    axim = init(mi.AxesImage, data)
+    # zoomed out, so that a pyramid level is built
+    modest.axes.set_xlim(-1000, 1300)
+    modest.axes.set_ylim(-1000, 1300)
+    modest.axes.figure.canvas.draw()
+    pyramid_before = modest._pyramid
+    assert pyramid_before is not None and pyramid_before.has_level(1)
+
+    data[10:20, :] = 0
+    modest.set_data(data, dirty=(slice(10, 20), slice(None)))
+    axim.set_data(data)
+    # the pyramid is updated rather than rebuilt
+    assert modest._pyramid is pyramid_before
+    np.testing.assert_array_equal(pyramid_before.level(1),
+                                  ImagePyramid(data).level(1))
+    modest.axes.set_xlim(axim.axes.get_xlim())
+    modest.axes.set_ylim(axim.axes.get_ylim())
+    check('set_data_dirty', modest.axes, axim.axes)
+
+    with pytest.raises(ValueError):
+        modest.set_data(data, dirty=(slice(0, 10, 2), slice(None)))
+
+
 INTRP_METHODS = ('nearest', 'bilinear', 'bicubic',
                  'spline16', 'spline36', 'hanning',
                  'hamming', 'hermite', 'kaiser',
@@ -215,6 +614,50 @@ def test_nan():
 
     check('nan', modest.axes, axim.axes)
 
+@pytest.mark.parametrize(('dtype', 'kwargs', 'masked'),
+                         [(np.uint16, {}, False),
+                          (np.float64, {}, True),
+                          (np.float64, dict(finite=True), False),
+                          (np.float64, dict(pyramid=True), False)])
+def test_finite_windows_not_masked(dtype, kwargs, masked):
+    data = _big_data().astype(dtype)
+    modest = init(partial(ModestImage, **kwargs), data)
+    modest.axes.figure.canvas.draw()
+    assert modest._sx > 1
+    assert isinstance(modest._window, np.ma.MaskedArray) == masked
+
+
+@pytest.mark.parametrize(('dtype', 'kwargs'),
+                         [(np.int16, dict(lut=False)), (np.uint16, {}),
+                          (np.float64, dict(finite=True)),
+                          (np.float64, dict(pyramid=True))])
+def test_unmasked_windows_interpolated(dtype, kwargs):
+    """ windows without a mask can be resampled by AxesImage """
+    # not default_data(), to which test_nan adds NaNs
+    data = np.sin(x / 10.) * np.cos(y / 30.)
+    if dtype != np.float64:
+        data = (data * 1000).astype(dtype)
+    modest = init(partial(ModestImage, **kwargs), data)
+    axim = init(mi.AxesImage, data)
+    for im in [modest, axim]:
+        im.set_interpolation('bilinear')
+        im.set_clim(data.min(), data.max())
+        im.axes.set_xlim(100, 150)
+        im.axes.set_ylim(100, 150)
+    check('unmasked_%s' % np.dtype(dtype).name, modest.axes, axim.axes,
+          thresh=1e-4)
+
+
+def test_nan_pyramid():
+    """ nan values are still masked in pyramid levels """
+    data = _big_data()
+    data[:1000] = np.nan
+    modest = init(partial(ModestImage, pyramid=True), data)
+    axim = init(partial(ModestImage, pyramid=True, finite=False), data)
+    check('nan_pyramid', modest.axes, axim.axes)
+    assert isinstance(modest._window, np.ma.MaskedArray)
+
+
 def test_get_array():
     """ get_array should return full-res data"""
     data = default_data()
@@ -232,6 +675,25 @@ def test_get_array():
                                   ax.get_array())
 
 
+@pytest.mark.parametrize('flip', ['x', 'y'])
+def test_matched_slices_flipped_transform(flip):
+    modest = init(ModestImage, default_data())
+    ax = modest.axes
+    ax.set_xlim(100, 150)
+    ax.set_ylim(50, 100)
+    # e.g. an extent with top < bottom, as imshow makes for origin='upper'
+    if flip == 'x':
+        transform = Affine2D().scale(-1, 1).translate(300, 0)
+    else:
+        transform = Affine2D().scale(1, -1).translate(0, 300)
+    x0, x1, sx, y0, y1, sy = extract_matched_slices(
+        axes=ax, shape=(300, 300), transform=transform)
+    if flip == 'x':
+        assert (x0, x1, y0, y1) == (145, 205, 45, 105)
+    else:
+        assert (x0, x1, y0, y1) == (95, 155, 195, 255)
+
+
 EXTENT_OPTIONS = itertools.product(['upper', 'lower'],
                                    [None, [1., 7., -1., 5.]],
                                    ['', 'x', 'y', 'xy'])
@@ -279,3 +741,375 @@ def test_extent(origin, extent, flip):
 
     check('extent2_{0}_{1}_{2}'.format(origin, extent is not None, flip),
           modest.axes, axim.axes, thresh=0.0)
+
+
+def _band_list():
+    return [np.sin(x / 10.), np.cos(y / 30.) ** 2, np.sin((x + y) / 20.)]
+
+
+@pytest.mark.parametrize('kwargs', [{}, dict(tile_size=64),
+                                    dict(pyramid=True)])
+def test_band_stack(kwargs):
+    """ composites of separate bands match the composed RGBA array """
+    bands = _band_list()
+    stack = BandStack(bands, limits=[(-1, 1), (0, 1), (-1, 1)],
+                      stretch=['linear', 'sqrt', 'linear'])
+    modest = init(partial(ModestImage, **kwargs), stack)
+    axim = init(mi.AxesImage, stack.compose(np.dstack(bands)))
+    check('band_stack', modest.axes, axim.axes)
+    for im in [modest, axim]:
+        im.axes.set_xlim(100, 150)
+        im.axes.set_ylim(20, 70)
+    check('band_stack_zoom', modest.axes, axim.axes)
+
+
+def test_band_list():
+    bands = _band_list()
+    modest = init(ModestImage, BandStack(bands))
+    modest.set_data(bands)
+    assert isinstance(modest.get_array(), BandStack)
+    modest.axes.figure.canvas.draw()
+    assert modest._A.dtype == np.uint8
+
+
+def test_band_stretch_change_does_not_reslice():
+    bands = _band_list()
+    stack = BandStack(bands, limits=(-1, 1))
+    modest = init(ModestImage, stack)
+    modest.axes.figure.canvas.draw()
+    window = modest._window
+
+    stack.set_stretch('asinh')
+    modest.changed()
+    modest.axes.figure.canvas.draw()
+    assert modest._window is window
+
+    axim = init(mi.AxesImage, stack.compose(np.dstack(bands)))
+    check('band_stretch', modest.axes, axim.axes)
+
+
+def test_matched_slices_overscan_and_quantize():
+    modest = init(ModestImage, default_data())
+    ax = modest.axes
+    ax.set_xlim(100, 200)
+    ax.set_ylim(50, 150)
+    x0, x1, sx, y0, y1, sy = extract_matched_slices(
+        axes=ax, shape=(300, 300), transform=modest._world2pixel)
+    assert (x0, x1, y0, y1) == (95, 205, 45, 155)
+
+    x0, x1, sx, y0, y1, sy = extract_matched_slices(
+        axes=ax, shape=(300, 300), transform=modest._world2pixel,
+        overscan=.5)
+    assert (x0, x1, y0, y1) == (45, 255, 0, 205)
+
+    ax.set_xlim(0, 300)
+    ax.set_ylim(0, 300)
+    scale = Affine2D().scale(17)
+    exact = extract_matched_slices(axes=ax, shape=(5100, 5100),
+                                   transform=scale)[2::3]
+    quantized = extract_matched_slices(axes=ax, shape=(5100, 5100),
+                                       transform=scale, quantize=True)[2::3]
+    for s, q in zip(exact, quantized):
+        assert q & (q - 1) == 0
+        assert s / 2 < q <= s
+
+
+def test_quantized_strides_reused_while_zooming():
+    data = _big_data()
+    modest = init(partial(ModestImage, quantize_strides=True,
+                          overscan=.1), data)
+    ax = modest.axes
+    for i in range(6):
+        half = 1000 * .95 ** i
+        ax.set_xlim(1000 - half, 1000 + half)
+        ax.set_ylim(1000 - half, 1000 + half)
+        ax.figure.canvas.draw()
+        sx, sy = modest.stats.last.strides
+        assert sx & (sx - 1) == 0 and sy & (sy - 1) == 0
+    assert modest.stats.hit_rate >= .5
+
+
+def test_fine_window_not_reused_when_zooming_out():
+    data = _big_data()
+    modest = init(ModestImage, data)
+    ax = modest.axes
+    ax.set_xlim(900, 1000)
+    ax.set_ylim(900, 1000)
+    ax.figure.canvas.draw()
+    ax.set_xlim(950, 960)
+    ax.set_ylim(950, 960)
+    ax.figure.canvas.draw()
+    assert modest.stats.last.cache == 'hit'
+
+    # a window sampled much more finely than needed is not drawn again
+    ax.set_xlim(0, 2000)
+    ax.set_ylim(0, 2000)
+    ax.figure.canvas.draw()
+    assert modest.stats.last.cache == 'miss'
+
+
+class _Cube(object):
+
+    """Array-like cube recording the frames read from it"""
+
+    def __init__(self, data):
+        self.data = data
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.ndim = data.ndim
+        self.frames = []
+
+    def __getitem__(self, key):
+        self.frames.append(key[0])
+        return self.data[key]
+
+
+def _cube(nframes=4):
+    return np.array([_data * (1 - i / 4.) for i in range(nframes)])
+
+
+@pytest.mark.parametrize('wrap', [False, True])
+def test_set_frame(wrap):
+    data = _cube()
+    cube = _Cube(data) if wrap else data
+    modest = init(ModestImage, data[0])
+    modest.set_cube(cube)
+    ax = modest.axes
+    ax.set_xlim(50, 200)
+    ax.set_ylim(100, 250)
+    ax.figure.canvas.draw()
+    request = modest.stats.last.strides
+
+    modest.set_frame(2)
+    assert modest.get_frame() == 2
+    ax.figure.canvas.draw()
+    assert modest.stats.last.strides == request
+    if wrap:
+        assert set(cube.frames) == set([0, 2])
+
+    axim = init(mi.AxesImage, data[2])
+    axim.axes.set_xlim(50, 200)
+    axim.axes.set_ylim(100, 250)
+    check('set_frame', ax, axim.axes)
+
+    # frames shown before are cached
+    modest.set_frame(-4)
+    assert modest.get_frame() == 0
+    ax.figure.canvas.draw()
+    assert modest.stats.last.cache == 'frame'
+
+
+def test_update_region_of_frame():
+    data = _cube()
+    modest = init(ModestImage, data[0])
+    modest.set_cube(data)
+    ax = modest.axes
+    ax.set_xlim(50, 200)
+    ax.set_ylim(100, 250)
+    ax.figure.canvas.draw()
+
+    modest.update_region(np.zeros((50, 50)), 120, 60)
+    ax.figure.canvas.draw()
+    modest.set_frame(1)
+    ax.figure.canvas.draw()
+
+    # the window of frame 0 cached before the update is not shown again
+    modest.set_frame(0)
+    ax.figure.canvas.draw()
+    assert modest.stats.last.cache != 'frame'
+    axim = init(mi.AxesImage, data[0])
+    axim.axes.set_xlim(50, 200)
+    axim.axes.set_ylim(100, 250)
+    check('update_frame', ax, axim.axes)
+
+
+def test_set_frame_errors():
+    modest = init(ModestImage, default_data())
+    with pytest.raises(ValueError):
+        modest.set_frame(1)
+    with pytest.raises(TypeError):
+        modest.set_cube(default_data())
+    modest.set_cube(_cube())
+    with pytest.raises(IndexError):
+        modest.set_frame(4)
+
+    # new data replace the cube
+    modest.set_data(default_data())
+    assert modest.get_cube() is None
+
+
+def test_frame_prefetch():
+    cube = _Cube(_cube())
+    modest = init(ModestImage, cube.data[0])
+    modest.set_cube(cube)
+    modest.set_frame_prefetch(2)
+    modest.axes.figure.canvas.draw()
+    executor = modest_image._get_executor()
+    executor.submit(lambda: None).result()
+    while modest._frame_pending:
+        executor.submit(lambda: None).result()
+    assert set(cube.frames) == set([0, 1, 2])
+
+    modest.set_frame(1)
+    modest.axes.figure.canvas.draw()
+    assert modest.stats.last.cache == 'frame'
+    modest.set_frame(2)
+    modest.axes.figure.canvas.draw()
+    assert modest.stats.last.cache == 'frame'
+
+
+def test_lut_auto_integer_data():
+    data = (np.arange(300 * 300) % 1000).astype(np.uint16).reshape(300, 300)
+    modest = init(ModestImage, data)
+    assert modest.get_lut() == 'auto'
+    axim = init(mi.AxesImage, data)
+    for im in [modest, axim]:
+        im.set_clim(100, 900)
+    check('lut_auto', modest.axes, axim.axes, thresh=1e-3)
+    assert modest._A.dtype == np.uint8
+    assert modest.stats.last.timings['colormap'] > 0
+
+    # data are handed to AxesImage when interpolating
+    modest.set_interpolation('bilinear')
+    modest.axes.figure.canvas.draw()
+    assert modest._A is modest._window
+
+    modest.set_lut(False)
+    modest.set_interpolation('nearest')
+    modest.axes.figure.canvas.draw()
+    assert modest._A.dtype == np.uint16
+
+
+@pytest.mark.parametrize(('dtype', 'codec'), [('uint16', None),
+                                              ('float16', 'zlib')])
+def test_packed_frame_windows(dtype, codec):
+    data = _cube()
+    modest = init(partial(ModestImage, cache_dtype=dtype, cache_codec=codec),
+                  data[0])
+    modest.set_cube(data)
+    ax = modest.axes
+    ax.figure.canvas.draw()
+    modest.set_frame(1)
+    ax.figure.canvas.draw()
+    assert modest._frame_windows.nbytes < 2 * modest._window.nbytes / 3
+
+    modest.set_frame(0)
+    ax.figure.canvas.draw()
+    assert modest.stats.last.cache == 'frame'
+    assert modest.stats.last.timings['codec'] > 0
+
+    axim = init(mi.AxesImage, data[0])
+    check('packed_frame', ax, axim.axes, thresh=1)
+
+
+def test_pyramid_levels_cache_dtype():
+    modest = init(partial(ModestImage, pyramid=True, cache_dtype='float16'),
+                  _big_data())
+    modest.axes.figure.canvas.draw()
+    assert modest.pyramid.level(2).dtype == np.float16
+    assert modest._window.dtype == _big_data().dtype
+    modest.set_cache_dtype(None)
+    assert modest.pyramid.level(2).dtype == _big_data().dtype
+
+
+class _Bend(Transform):
+
+    """A non-affine transform, bending rows into parabolas"""
+
+    input_dims = output_dims = 2
+    is_separable = False
+
+    def __init__(self, a=1e-3, b=1.5):
+        super(_Bend, self).__init__()
+        self.a, self.b = a, b
+
+    def transform_non_affine(self, values):
+        x, y = np.asarray(values, dtype=float).T
+        return np.column_stack([x + self.a * y ** 2, y * self.b])
+
+    def inverted(self):
+        return _Unbend(self.a, self.b)
+
+
+class _Unbend(_Bend):
+
+    def transform_non_affine(self, values):
+        x, y = np.asarray(values, dtype=float).T
+        y = y / self.b
+        return np.column_stack([x - self.a * y ** 2, y])
+
+    def inverted(self):
+        return _Bend(self.a, self.b)
+
+
+def _init_warped(data, transform, **kwargs):
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    modest = ModestImage(ax, data=data, interpolation='nearest',
+                         pixel_transform=transform, clim=(-1, 1), **kwargs)
+    ax.add_artist(modest)
+
+    fig2 = plt.figure()
+    ax2 = fig2.add_subplot(111)
+    axim = mi.AxesImage(ax2, data=data, interpolation='nearest',
+                        origin='lower', clim=(-1, 1),
+                        extent=(-.5, data.shape[1] - .5,
+                                -.5, data.shape[0] - .5))
+    axim.set_transform(transform + ax2.transData)
+    ax2.add_artist(axim)
+    return modest, axim
+
+
+@pytest.mark.parametrize('transform', [Affine2D().rotate_deg(30),
+                                       _Bend()])
+def test_pixel_transform(transform):
+    modest, axim = _init_warped(default_data(), transform)
+    for ax in (modest.axes, axim.axes):
+        ax.set_xlim(50, 200)
+        ax.set_ylim(100, 250)
+    check('pixel_transform', modest.axes, axim.axes, thresh=1)
+
+
+def test_pixel_transform_reads_visible_region():
+    data = _big_data()
+    transform = _Bend(a=1e-4)
+    modest = init(partial(ModestImage, pixel_transform=transform), data)
+    ax = modest.axes
+    ax.set_xlim(1000, 1100)
+    ax.set_ylim(1500, 1600)
+    ax.figure.canvas.draw()
+    x0, x1, y0, y1 = modest.stats.last.bounds
+    corners = transform.inverted().transform([(1000, 1500), (1100, 1500),
+                                              (1000, 1600), (1100, 1600)])
+    lo, hi = corners.min(axis=0), corners.max(axis=0)
+    assert x0 <= lo[0] and x1 >= hi[0] and y0 <= lo[1] and y1 >= hi[1]
+    assert (x1 - x0) * (y1 - y0) < 2 * (hi - lo + 12).prod()
+    assert modest.stats.last.strides == (1, 1)
+
+    ax.set_xlim(-500, 3000)
+    ax.set_ylim(0, 3000)
+    ax.figure.canvas.draw()
+    assert modest._window.size < data.size / 4
+
+
+def test_warped_slices_match_affine():
+    modest = init(ModestImage, default_data())
+    ax = modest.axes
+    ax.set_xlim(20, 280)
+    ax.set_ylim(10, 200)
+    ax.figure.canvas.draw()
+    transform = Affine2D().scale(1.5, 2)
+    expected = extract_matched_slices(ax, (300, 300),
+                                      transform=transform.inverted())
+    assert warped_slices(ax, (300, 300), transform) == expected
+
+
+def test_imshow_pixel_transform():
+    ax = plt.figure().add_subplot(111)
+    im = modest_image.imshow(ax, default_data(),
+                             pixel_transform=Affine2D().rotate_deg(45))
+    xlim, ylim = ax.get_xlim(), ax.get_ylim()
+    assert xlim[0] < -200 and xlim[1] > 200
+    assert ylim[0] < 1 and ylim[1] > 400
+    ax.figure.canvas.draw()
+    assert im.get_window_extent().width > 0
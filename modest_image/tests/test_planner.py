@@ -0,0 +1,124 @@
+from __future__ import print_function, division
+
+import itertools
+
+import pytest
+import numpy as np
+from matplotlib import pyplot as plt
+
+from .. import modest_image
+from ..modest_image import ModestImage, extract_matched_slices, imshow
+from ..planner import plan_slices, install_planner, figure_images
+
+
+def teardown_function(func):
+    plt.close('all')
+
+
+def _mosaic(nrows=3, ncols=4, sharex=True, sharey=True, **kwargs):
+    fig, axes = plt.subplots(nrows, ncols, sharex=sharex, sharey=sharey,
+                             squeeze=False)
+    random = np.random.RandomState(0)
+    images = []
+    for ax in axes.flat:
+        data = random.random_sample((200 + random.randint(100), 300))
+        im = ModestImage(ax, data=data, interpolation='nearest', **kwargs)
+        ax.add_artist(im)
+        images.append(im)
+    axes.flat[0].set_xlim(20, 150)
+    axes.flat[0].set_ylim(10, 190)
+    return fig, images
+
+
+def _expected(image):
+    return extract_matched_slices(image.axes, image._full_res.shape,
+                                  transform=image._world2pixel,
+                                  overscan=image._overscan,
+                                  quantize=image._quantize_strides)
+
+
+@pytest.mark.parametrize(('origin', 'extent', 'overscan', 'quantize'),
+                         itertools.product(['upper', 'lower'],
+                                           [None, (-3., 7., 20., 10.)],
+                                           [0., .3], [False, True]))
+def test_matches_extract_matched_slices(origin, extent, overscan, quantize):
+    fig, images = _mosaic(sharex=False, sharey=False, origin=origin,
+                          extent=extent, overscan=overscan,
+                          quantize_strides=quantize)
+    random = np.random.RandomState(1)
+    for im in images:
+        ax = im.axes
+        if extent is None:
+            ax.set_xlim(*sorted(random.uniform(-50, 350, 2)))
+            ax.set_ylim(*random.uniform(-50, 350, 2))
+        else:
+            ax.set_xlim(*sorted(random.uniform(-5, 9, 2)))
+            ax.set_ylim(*random.uniform(5, 25, 2))
+    assert plan_slices(images) == [_expected(im) for im in images]
+
+
+def test_images_of_shared_axes():
+    fig, images = _mosaic(nrows=1, ncols=1)
+    ax = images[0].axes
+    for extent in [None, (0, 100, 0, 100)]:
+        im = ModestImage(ax, data=np.ones((500, 400)), extent=extent)
+        ax.add_artist(im)
+        images.append(im)
+    assert plan_slices(images) == [_expected(im) for im in images]
+
+
+def test_planner_draw(monkeypatch):
+    fig, images = _mosaic()
+    fig.canvas.draw()
+    unplanned = fig.canvas.tostring_rgb()
+    expected = [im.stats.last.bounds for im in images]
+
+    planner = install_planner(fig)
+    assert install_planner(fig) is planner
+    assert figure_images(fig) == images
+
+    def unplanned_slices(*args, **kwargs):
+        raise AssertionError("slices not planned")
+
+    monkeypatch.setattr(modest_image, 'extract_matched_slices',
+                        unplanned_slices)
+    images[0].axes.set_xlim(40, 170)
+    images[0].axes.set_xlim(20, 150)
+    fig.canvas.draw()
+    assert fig.canvas.tostring_rgb() == unplanned
+    assert [im.stats.last.bounds for im in images] == expected
+    # plans are used once
+    assert all(im._planned_slices is None for im in images)
+
+
+def test_unused_plans_dropped():
+    fig, images = _mosaic(nrows=1, ncols=2)
+    install_planner(fig)
+    images[1].set_animated(True)
+    fig.canvas.draw()
+    assert images[1]._planned_slices is None
+
+
+def _imshow_grid():
+    fig, axes = plt.subplots(2, 2)
+    data = np.random.RandomState(0).random_sample((2000, 2000))
+    images = [imshow(ax, data, interpolation='nearest') for ax in axes.flat]
+    return fig, images
+
+
+def test_planned_after_aspect_applied():
+    """ plans are made for the axes box imshow's equal aspect gives """
+    fig, images = _imshow_grid()
+    install_planner(fig)
+    expected, unplanned = _imshow_grid()
+    for f in [fig, expected]:
+        f.canvas.draw()
+        # a view of another aspect ratio changes the axes box at next draw
+        for ax in f.axes:
+            ax.set_xlim(0, 2000)
+            ax.set_ylim(0, 300)
+        f.canvas.draw()
+
+    assert ([im.stats.last.strides for im in images] ==
+            [im.stats.last.strides for im in unplanned])
+    assert fig.canvas.tostring_rgb() == expected.canvas.tostring_rgb()
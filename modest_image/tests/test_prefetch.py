@@ -0,0 +1,117 @@
+from __future__ import print_function, division
+
+from concurrent.futures import Future
+
+import pytest
+import numpy as np
+from matplotlib import pyplot as plt
+
+from ..modest_image import ModestImage
+from ..prefetch import Prefetcher, predict_view, covers
+
+
+def teardown_function(func):
+    plt.close('all')
+
+
+def _submit(func):
+    """Run func immediately, instead of in the background"""
+    future = Future()
+    future.set_result(func())
+    return future
+
+
+def _compute(x0, x1, sx, y0, y1, sy, key=None):
+    return np.zeros(((y1 - y0) // sy, (x1 - x0) // sx)), (x0, x1, sx,
+                                                          y0, y1, sy)
+
+
+def test_predict_pan():
+    predicted = predict_view((0, 100, 1, 0, 100, 1),
+                             (10, 110, 1, 5, 105, 1), (1000, 1000))
+    assert predicted == (20, 130, 1, 10, 115, 1)
+
+
+def test_predict_zoom_out():
+    predicted = predict_view((400, 600, 2, 400, 600, 2),
+                             (300, 700, 4, 300, 700, 4), (1000, 1000))
+    assert predicted == (100, 900, 8, 100, 900, 8)
+
+
+def test_predict_still():
+    view = (0, 100, 1, 0, 100, 1)
+    assert predict_view(view, view, (1000, 1000)) is None
+
+
+def test_covers():
+    assert covers((0, 100, 2, 0, 100, 2), (10, 90, 2, 10, 90, 3))
+    assert not covers((0, 100, 2, 0, 100, 2), (10, 101, 2, 10, 90, 2))
+    assert not covers((0, 100, 2, 0, 100, 2), (10, 90, 1, 10, 90, 2))
+    assert not covers((0, 100, 2, 0, 100, 2), (10, 90, 4, 10, 90, 4))
+
+
+def test_prefetcher():
+    prefetcher = Prefetcher()
+    shape = (1000, 1000)
+    views = [(0, 100, 1, 0, 100, 1), (10, 110, 1, 0, 100, 1)]
+    for view in views:
+        assert prefetcher.find(view) is None
+        prefetcher.update(view, None, _compute, _submit, shape)
+
+    A, geometry = prefetcher.find((20, 120, 1, 0, 100, 1))
+    assert geometry == (20, 130, 1, 0, 100, 1)
+    assert prefetcher.find((20, 120, 1, 0, 100, 1), key='other') is None
+
+    prefetcher.clear()
+    assert prefetcher.find((20, 120, 1, 0, 100, 1)) is None
+
+
+def test_prefetcher_budget():
+    prefetcher = Prefetcher(max_bytes=1)
+    shape = (1000, 1000)
+    for i in range(5):
+        prefetcher.update((10 * i, 100 + 10 * i, 1, 0, 100, 1), None,
+                          _compute, _submit, shape)
+    assert len(prefetcher.windows) == 1
+
+
+@pytest.mark.parametrize('tile_size', [None, 64])
+def test_prefetch_while_panning(tile_size):
+    x, y = np.mgrid[0:1000, 0:2000]
+    data = np.sin(x / 10.) * np.cos(y / 30.)
+
+    images = []
+    for prefetch in [True, False]:
+        fig = plt.figure()
+        ax = fig.add_subplot(111)
+        im = ModestImage(ax, data=data, prefetch=prefetch,
+                         tile_size=tile_size, interpolation='nearest')
+        ax.add_artist(im)
+        im.set_clim(-1, 1)
+        images.append(im)
+
+    for i in range(6):
+        for im in images:
+            im.axes.set_xlim(100 * i, 100 * i + 300)
+            im.axes.set_ylim(0, 300)
+            im.figure.canvas.draw()
+        assert (images[0].figure.canvas.tostring_rgb() ==
+                images[1].figure.canvas.tostring_rgb())
+
+    stats = images[0].stats
+    if tile_size is None:
+        assert stats.cache['prefetch'] >= 3
+    else:
+        assert stats.tile_hit_rate > images[1].stats.tile_hit_rate
+
+
+def test_prefetch_discarded_on_set_data():
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    im = ModestImage(ax, data=np.zeros((1000, 1000)), prefetch=True)
+    ax.add_artist(im)
+    for i in range(3):
+        ax.set_xlim(100 * i, 100 * i + 300)
+        fig.canvas.draw()
+    im.set_data(np.ones((1000, 1000)))
+    assert len(im._prefetcher.windows) == 0
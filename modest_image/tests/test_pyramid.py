@@ -0,0 +1,143 @@
+from __future__ import print_function, division
+
+import pytest
+import numpy as np
+
+from ..pyramid import ImagePyramid
+from ..downsample import block_reduce
+
+
+def test_levels_built_lazily():
+    data = np.arange(64 * 48).reshape(64, 48)
+    pyr = ImagePyramid(data)
+    assert pyr.nbuilt == 1
+    assert pyr.max_level == 5
+
+    pyr.level(2)
+    assert pyr.nbuilt == 3
+
+
+@pytest.mark.parametrize('shape', [(64, 48), (65, 47), (33, 31, 3)])
+def test_levels_match_striding(shape):
+    data = np.random.random(shape)
+    pyr = ImagePyramid(data)
+    for k in range(pyr.max_level + 1):
+        np.testing.assert_array_equal(pyr.level(k),
+                                      data[::2 ** k, ::2 ** k])
+
+
+def test_invalid_level():
+    pyr = ImagePyramid(np.zeros((8, 8)))
+    with pytest.raises(ValueError):
+        pyr.level(4)
+
+
+def test_level_for():
+    pyr = ImagePyramid(np.zeros((100, 100)))
+    assert pyr.level_for(1, 1) == 0
+    assert pyr.level_for(3, 7) == 1
+    assert pyr.level_for(9, 8) == 3
+    assert pyr.level_for(1000, 1000) == pyr.max_level
+
+
+@pytest.mark.parametrize(('x0', 'x1', 'sx', 'y0', 'y1', 'sy'),
+                         [(0, 100, 1, 0, 100, 1),
+                          (3, 91, 4, 7, 88, 5),
+                          (0, 99, 8, 0, 99, 8),
+                          (13, 14, 3, 50, 97, 17)])
+def test_extract(x0, x1, sx, y0, y1, sy):
+    data = np.random.random((99, 100))
+    pyr = ImagePyramid(data)
+    result, (ex0, ex1, esx, ey0, ey1, esy) = pyr.extract(x0, x1, sx,
+                                                         y0, y1, sy)
+
+    # effective region contains the requested one, at least as finely
+    assert ex0 <= x0 and ex1 >= x1 and esx <= sx
+    assert ey0 <= y0 and ey1 >= y1 and esy <= sy
+
+    # and the data are what striding the full array would have given
+    np.testing.assert_array_equal(result, data[ey0:ey1:esy, ex0:ex1:esx])
+
+
+@pytest.mark.parametrize('how', ['mean', 'max'])
+def test_reduced_levels(how):
+    data = np.random.random((65, 47))
+    pyr = ImagePyramid(data, how=how)
+    for k in range(1, pyr.max_level + 1):
+        np.testing.assert_allclose(pyr.level(k),
+                                   block_reduce(pyr.level(k - 1), 2, 2, how))
+
+
+def test_reduced_extract():
+    data = np.random.random((99, 100))
+    pyr = ImagePyramid(data, how='max')
+    result, (x0, x1, sx, y0, y1, sy) = pyr.extract(3, 91, 4, 7, 88, 5)
+    np.testing.assert_allclose(result, block_reduce(data[y0:y1, x0:x1],
+                                                    sy, sx, 'max'))
+
+
+@pytest.mark.parametrize('how', [None, 'mean'])
+def test_update(how):
+    data = np.random.random((130, 100))
+    pyr = ImagePyramid(data, how=how)
+    pyr.level(4)
+
+    data[37:60, 10:91] = np.random.random((23, 81))
+    pyr.update(37, 60, 10, 91)
+
+    fresh = ImagePyramid(data, how=how)
+    for k in range(5):
+        np.testing.assert_allclose(pyr.level(k), fresh.level(k))
+
+
+def test_finite():
+    data = np.random.random((64, 64))
+    data[4, 6] = np.nan
+    pyr = ImagePyramid(data)
+    assert not pyr.finite(0)
+    assert not pyr.finite(1)
+    assert pyr.finite(2)
+    assert ImagePyramid(data.astype(int)).finite(0)
+
+
+def test_finite_after_update():
+    data = np.random.random((64, 64))
+    pyr = ImagePyramid(data)
+    assert pyr.finite(1)
+
+    data[10, 10] = np.inf
+    pyr.update(10, 11, 10, 11)
+    assert not pyr.finite(1)
+
+    data[10, 10] = 0
+    pyr.update(10, 11, 10, 11)
+    assert pyr.finite(1)
+
+
+@pytest.mark.parametrize('how', [None, 'mean', 'sum'])
+def test_level_dtype(how):
+    # away from 0, where float16 loses relative precision
+    data = np.random.RandomState(0).random_sample((130, 100)) + 1
+    pyr = ImagePyramid(data, how=how, level_dtype='float16')
+    full = ImagePyramid(data, how=how)
+    for k in range(1, 4):
+        assert pyr.level(k).dtype == np.float16
+        np.testing.assert_allclose(pyr.level(k), full.level(k), rtol=1e-3)
+
+    result, geometry = pyr.extract(3, 91, 4, 7, 88, 5)
+    expected, expected_geometry = full.extract(3, 91, 4, 7, 88, 5)
+    assert result.dtype == data.dtype
+    assert geometry == expected_geometry
+    np.testing.assert_allclose(result, expected, rtol=1e-3)
+
+    data[37:60, 10:91] = 0
+    pyr.update(37, 60, 10, 91)
+    full.update(37, 60, 10, 91)
+    np.testing.assert_allclose(pyr.level(3), full.level(3), rtol=1e-3)
+
+
+def test_level_dtype_only_shrinks_float_levels():
+    assert ImagePyramid(np.zeros((8, 8), dtype=np.uint16),
+                        level_dtype='float16').level(1).dtype == np.uint16
+    assert ImagePyramid(np.zeros((8, 8), dtype=np.float16),
+                        level_dtype='float32').level(1).dtype == np.float16
@@ -0,0 +1,134 @@
+from __future__ import print_function, division
+
+import gc
+
+import pytest
+import numpy as np
+from matplotlib import pyplot as plt
+
+from ..modest_image import imshow
+from ..source import (DataSource, set_cache_budget, get_cache_budget,
+                      cache_nbytes)
+
+
+def teardown_function(func):
+    plt.close('all')
+
+
+def _data():
+    x, y = np.mgrid[0:1000, 0:800]
+    return np.sin(x / 10.) * np.cos(y / 30.)
+
+
+def _image(data, **kwargs):
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    im = imshow(ax, data, vmin=-1, vmax=1, interpolation='nearest',
+                **kwargs)
+    return im
+
+
+def _render(im):
+    im.figure.canvas.draw()
+    return im.figure.canvas.tostring_rgb()
+
+
+def test_shared_window():
+    source = DataSource(_data())
+    first, second = _image(source), _image(source)
+    private = _image(_data())
+
+    assert _render(first) == _render(private)
+    assert first.stats.last.cache == 'miss'
+    assert _render(second) == _render(private)
+    assert second.stats.last.cache == 'shared'
+    assert second.stats.last.bytes_read == 0
+    assert source.nusers == 2
+
+
+def test_shared_pyramid_and_tiles():
+    source = DataSource(_data())
+    first = _image(source, pyramid=True, tile_size=64)
+    second = _image(source, pyramid=True, tile_size=64)
+    other_size = _image(source, pyramid=True, tile_size=32)
+    assert first.pyramid is second.pyramid
+
+    _render(first)
+    _render(second)
+    assert second.stats.last.tile_misses == 0
+    assert second.stats.last.tile_hits > 0
+
+    # tiles of another size are not confused with these
+    _render(other_size)
+    assert other_size.stats.last.tile_hits == 0
+
+
+def test_released_when_unused():
+    source = DataSource(_data())
+    images = [_image(source, tile_size=64) for i in range(2)]
+    for im in images:
+        _render(im)
+    assert len(source.tiles) > 0
+
+    images[0].remove()
+    assert source.nusers == 1
+    assert len(source.tiles) > 0
+
+    images[1].set_data(_data())
+    assert source.nusers == 0
+    assert len(source.tiles) == 0
+    assert images[1].get_source() is None
+
+
+def test_released_when_collected():
+    source = DataSource(_data())
+    images = [_image(source, tile_size=64) for i in range(2)]
+    for im in images:
+        _render(im)
+    assert len(source.tiles) > 0
+
+    del images, im
+    plt.close('all')
+    gc.collect()
+    assert source.nusers == 0
+    assert len(source.tiles) == 0 and len(source.windows) == 0
+
+
+def test_entries_evicted_with_source():
+    source = DataSource(_data())
+    source.windows.put('window', np.zeros(1000), 8000)
+    tiles = source.tiles
+    tiles.put('tile', np.zeros(1000), 8000)
+    before = cache_nbytes()
+
+    del source
+    gc.collect()
+    assert len(tiles) == 0
+    assert cache_nbytes() == before - 16000
+
+
+def test_cache_budget():
+    budget = get_cache_budget()
+    try:
+        set_cache_budget(10000)
+        source = DataSource(_data())
+        for size in [64, 32, 16]:
+            _render(_image(source, tile_size=size))
+        assert cache_nbytes() < 10000 + 64 * 64 * 4
+    finally:
+        set_cache_budget(budget)
+
+
+@pytest.mark.parametrize('tile_size', [None, 64])
+def test_update_region_refreshes_all_images(tile_size):
+    data = _data()
+    source = DataSource(data)
+    first = _image(source, tile_size=tile_size)
+    second = _image(source, tile_size=tile_size)
+    _render(first)
+    _render(second)
+
+    first.update_region(np.zeros((300, 200)), 100, 100)
+    expected = _render(_image(data.copy()))
+    assert _render(first) == expected
+    assert _render(second) == expected
@@ -1,93 +1,65 @@
 from __future__ import print_function, division
 
-from time import time
+import json
 
-from matplotlib import pyplot as plt
-import matplotlib.image as mi
+from .. import benchmark
 
-import numpy as np
 
-from ..modest_image import ModestImage
+def test_run_benchmarks(tmpdir):
+    results = benchmark.run(classes=['AxesImage', 'ModestImage'],
+                            sizes=[200], dtypes=['float32', 'uint8'],
+                            storages=['memory', 'memmap'],
+                            layouts=['upper+extent'], repeat=2,
+                            directory=str(tmpdir))
 
+    assert len(results) == 2 * 2 * 2 * len(benchmark.OPERATIONS)
+    names = set(r['name'] for r in results)
+    assert len(names) == len(results)
+    assert 'ModestImage/zoom/200/uint8/memmap/upper+extent' in names
+    for result in results:
+        assert len(result['times_ms']) == 2
+        assert result['min_ms'] <= result['median_ms']
+        assert ('hit_rate' in result) == (result['cls'] == 'ModestImage')
 
-x, y = np.mgrid[0:1000, 0:1000]
-data = np.sin(x / 10.) * np.cos(y / 30.)
 
+def test_memmap_data(tmpdir):
+    data = benchmark.make_data(100, 'int16', 'memmap', str(tmpdir))
+    assert data.shape == (100, 100) and data.dtype == 'int16'
+    lo, hi = benchmark.data_range(data.dtype)
+    assert lo <= data.min() and data.max() <= hi
 
-def setup(img_cls):
 
-    plt.clf()
-    plt.cla()
-    ax = plt.gca()
+def test_compare():
+    baseline = [dict(name='a', median_ms=10.), dict(name='b', median_ms=.1),
+                dict(name='c', median_ms=10.)]
+    results = [dict(name='a', median_ms=20.), dict(name='b', median_ms=.5),
+               dict(name='c', median_ms=11.), dict(name='d', median_ms=5.)]
+    assert benchmark.compare(results, baseline) == [('a', 10., 20.)]
 
-    artist = img_cls(ax, data=data)
 
-    ax.add_artist(artist)
-    ax.set_aspect('equal')
-    artist.norm.vmin = -1
-    artist.norm.vmax = 1
-    ax.set_xlim(0, 2000)
-    ax.set_ylim(0, 2000)
+def test_main(tmpdir):
+    output = str(tmpdir.join('results.json'))
+    args = ['--classes', 'ModestImage', '--operations', 'draw', 'clim',
+            '--sizes', '100', '--dtypes', 'float64', '--storages', 'memory',
+            '--layouts', 'lower',
+            '--repeat', '1', '--output', output]
+    assert benchmark.main(args) == 0
 
-    return artist, time()
+    with open(output) as infile:
+        report = json.load(infile)
+    assert len(report['results']) == 2
+    assert 'matplotlib' in report['environment']
 
-
-def report(label, t0, t1, niter):
-    print('%15s: %i ms per operation' % (label,
-                                         (t1 - t0) * 1000 / niter))
-
-
-def time_draw(img_cls, repeat=5):
-    """render time for first draw after cache clear
-
-    Simulates render after changing data or cmap
-    """
-
-    a, t = setup(img_cls)
-    for i in range(repeat):
-        a.changed()  # clear caches, simulate first render
-        a.axes.figure.canvas.draw()
-    report('time_draw', t, time(), repeat)
-
-
-def time_move(img_cls, repeat=10):
-    """ Render time for moving an image without cache clear """
-    lims = [(0, 2000), (500, 2500)]
-    a, t = setup(img_cls)
-    ax = plt.gca()
-    a.axes.figure.canvas.draw()
-    t = time()
-    for i in range(repeat):
-        ax.set_xlim(lims[i % 2])
-        ax.set_ylim(lims[i % 2])
-        a.axes.figure.canvas.draw()
-    report('time_move', t, time(), repeat)
-
-
-def time_move_zoom(img_cls, repeat=10):
-    """ Move image, at high zoom setting """
-    delta = 100
-    lims = [(0, 100), (500, 600)]
-    a, t = setup(img_cls)
-    ax = plt.gca()
-    a.axes.figure.canvas.draw()
-    t = time()
-    for i in range(repeat):
-        ax.set_xlim(lims[i % 2])
-        ax.set_ylim(lims[i % 2])
-        a.axes.figure.canvas.draw()
-    report('time_move_zoom', t, time(), repeat)
+    # pretend everything used to be much faster
+    for result in report['results']:
+        result['median_ms'] = -10
+    with open(output, 'w') as outfile:
+        json.dump(report, outfile)
+    assert benchmark.main(args[:-2] + ['--baseline', output]) == 1
 
 
 def main():
-    print('Test image dimensions: %i x %i' % data.shape)
-    for im in [mi.AxesImage, ModestImage]:
-        print('**********************************')
-        print("Performace Tests for %s" % im.__name__)
-        print('**********************************')
-        time_draw(im)
-        time_move(im)
-        time_move_zoom(im)
+    benchmark.main(['--quick'])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+from __future__ import print_function, division
+
+import logging
+
+import pytest
+import numpy as np
+from matplotlib import pyplot as plt
+
+from ..modest_image import ModestImage
+from ..stats import DrawStats, ImageStats, PHASES, log_stats
+
+
+def teardown_function(func):
+    plt.close('all')
+
+
+def _image(**kwargs):
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    data = np.random.random((500, 400))
+    im = ModestImage(ax, data=data, **kwargs)
+    ax.add_artist(im)
+    ax.set_xlim(0, 400)
+    ax.set_ylim(0, 500)
+    return im
+
+
+def test_phase_timing():
+    stats = DrawStats()
+    with stats.phase('read'):
+        sum(range(10000))
+    with stats.phase('read'):
+        pass
+    assert list(stats.timings) == list(PHASES)
+    assert stats.timings['read'] > 0
+    assert stats.timings['render'] == 0
+
+
+def test_image_stats_totals():
+    totals = ImageStats()
+    for cache in ['miss', 'hit', 'hit', 'hit']:
+        stats = DrawStats()
+        stats.cache = cache
+        stats.total = 1.
+        stats.bytes_read = 10
+        totals.add(stats)
+    assert totals.ndraws == 4
+    assert totals.total == 4.
+    assert totals.bytes_read == 40
+    assert totals.hit_rate == .75
+    assert totals.last is stats
+
+    totals.reset()
+    assert totals.ndraws == 0 and totals.hit_rate == 0
+
+
+def test_draw_records_stats():
+    im = _image()
+    canvas = im.figure.canvas
+    canvas.draw()
+
+    stats = im.stats.last
+    assert stats.cache == 'miss'
+    assert stats.bytes_read == np.prod(stats.shape) * 8
+    assert stats.bounds == im._bounds
+    assert stats.strides == (im._sx, im._sy)
+    assert stats.timings['render'] > 0
+    assert stats.total >= sum(stats.timings.values())
+
+    canvas.draw()
+    assert im.stats.last.cache == 'hit'
+    assert im.stats.last.bytes_read == 0
+    assert im.stats.ndraws == 2
+    assert im.stats.hit_rate == .5
+
+
+@pytest.mark.parametrize('kwargs', [dict(tile_size=64), dict(lut=True)])
+def test_colormap_stats(kwargs):
+    im = _image(**kwargs)
+    im.figure.canvas.draw()
+    assert im.stats.last.timings['colormap'] > 0
+    if 'tile_size' in kwargs:
+        assert im.stats.last.tile_misses > 0
+        im.invalidate_cache()
+        im.figure.canvas.draw()
+        assert im.stats.last.tile_misses == 0
+        assert im.stats.tile_hit_rate == .5
+
+
+def test_stats_callback(caplog):
+    im = _image()
+    seen = []
+    im.set_stats_callback(seen.append)
+    im.figure.canvas.draw()
+    assert seen == [im.stats.last]
+
+    im.set_stats_callback(log_stats)
+    with caplog.at_level(logging.DEBUG, logger='modest_image'):
+        im.figure.canvas.draw()
+    assert 'cache=hit' in caplog.text
@@ -0,0 +1,92 @@
+from __future__ import print_function, division
+
+import os
+
+import pytest
+import numpy as np
+import matplotlib.cm as cm
+import matplotlib.colors as mcolors
+import matplotlib.image as mi
+
+from .. import thumbnails
+from ..thumbnails import thumbnail_shape, render_thumbnail, batch_render
+
+
+def _data(ny=1024, nx=512):
+    y, x = np.mgrid[0:ny, 0:nx]
+    return np.sin(y / 10.) * np.cos(x / 30.)
+
+
+@pytest.mark.parametrize(('shape', 'size', 'expected'),
+                         [((1024, 512), 256, (256, 128)),
+                          ((100, 300), 256, (85, 256)),
+                          ((100, 300), (64, 128), (21, 64)),
+                          ((10, 10), 256, (256, 256)),
+                          ((10000, 1), 100, (100, 1))])
+def test_thumbnail_shape(shape, size, expected):
+    assert thumbnail_shape(shape, size) == expected
+
+
+def test_render_thumbnail():
+    data = _data()
+    rgba = render_thumbnail(data, size=256, cmap='viridis', vmin=-1, vmax=1)
+    expected = cm.get_cmap('viridis')(mcolors.Normalize(-1, 1)(
+        data[::4, ::4]), bytes=True)
+    np.testing.assert_array_equal(rgba, expected)
+
+    lower = render_thumbnail(data, size=256, cmap='viridis', vmin=-1, vmax=1,
+                             origin='lower')
+    np.testing.assert_array_equal(lower, rgba[::-1])
+
+
+def test_render_thumbnail_autoscale_and_nan():
+    data = _data(300, 200) * 10
+    data[:30] = np.nan
+    norm = mcolors.Normalize()
+    rgba = render_thumbnail(data, size=100, norm=norm)
+    assert rgba.shape == (100, 67, 4)
+    # the given norm is not modified
+    assert not norm.scaled()
+    assert (rgba[:10, :, 3] == 0).all()
+    assert (rgba[10:, :, 3] == 255).all()
+    assert rgba[10:, :, :3].min() < 10 and rgba[10:, :, :3].max() > 245
+
+
+def test_render_thumbnail_rgb():
+    data = (np.random.random((200, 200, 3)) * 255).astype(np.uint8)
+    rgba = render_thumbnail(data, size=50, downsample='mean')
+    assert rgba.shape == (50, 50, 4)
+    assert (rgba[..., 3] == 255).all()
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_batch_render(tmpdir, processes):
+    paths = []
+    for i in range(4):
+        path = str(tmpdir.join('image%i.npy' % i))
+        np.save(path, _data(200 + 10 * i, 100))
+        paths.append(path)
+    broken = str(tmpdir.join('broken.npy'))
+    with open(broken, 'w') as outfile:
+        outfile.write('not an array')
+    output_dir = str(tmpdir.join('out'))
+
+    report = batch_render(paths + [broken], output_dir, processes=processes,
+                          size=64)
+    assert len(report.rendered) == 4
+    assert [src for src, _ in report.failed] == [broken]
+    assert report.throughput > 0
+    assert '4 thumbnails' in str(report)
+
+    image = mi.imread(os.path.join(output_dir, 'image0.png'))
+    assert image.shape == (64, 32, 4)
+
+
+def test_main(tmpdir):
+    path = str(tmpdir.join('image.npy'))
+    np.save(path, _data(100, 100))
+    output_dir = str(tmpdir.join('out'))
+    assert thumbnails.main([path, '--output-dir', output_dir, '--size',
+                            '40', '20', '--processes', '1']) == 0
+    assert mi.imread(os.path.join(output_dir, 'image.png')).shape[:2] == \
+        (20, 20)
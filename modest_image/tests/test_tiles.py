@@ -0,0 +1,60 @@
+from __future__ import print_function, division
+
+import numpy as np
+
+from ..tiles import LRUCache, tile_range, tile_bounds, assemble
+
+
+def test_lru_eviction():
+    cache = LRUCache(max_bytes=250)
+    for i in range(3):
+        cache.put(i, np.zeros(100, dtype=np.uint8))
+    assert len(cache) == 2
+    assert 0 not in cache
+    assert cache.nbytes == 200
+
+    # touching an entry makes it the most recently used
+    cache.get(1)
+    cache.put(3, np.zeros(100, dtype=np.uint8))
+    assert 1 in cache and 2 not in cache
+
+
+def test_lru_stats():
+    cache = LRUCache()
+    cache.put('a', np.zeros(3))
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lru_shrink_and_discard():
+    cache = LRUCache()
+    for i in range(5):
+        cache.put(i, np.zeros(10, dtype=np.uint8))
+    cache.discard(lambda k: k % 2 == 0)
+    assert sorted(cache._data) == [1, 3]
+    cache.set_max_bytes(10)
+    assert len(cache) == 1 and cache.nbytes == 10
+
+
+def test_tile_range():
+    assert list(tile_range(0, 100, 1, 32)) == [0, 1, 2, 3]
+    assert list(tile_range(40, 64, 1, 32)) == [1]
+    assert list(tile_range(40, 65, 2, 16)) == [1, 2]
+    assert list(tile_range(5, 6, 1, 32)) == [0]
+
+
+def test_tile_bounds_cover_axis():
+    size, step, n = 16, 3, 100
+    bounds = [tile_bounds(i, step, size, n)
+              for i in tile_range(0, n, step, size)]
+    assert bounds[0][0] == 0 and bounds[-1][1] == n
+    for (lo0, hi0), (lo1, hi1) in zip(bounds[:-1], bounds[1:]):
+        assert hi0 == lo1
+
+
+def test_assemble():
+    data = np.arange(35).reshape(5, 7)
+    tiles = [[data[:3, :4], data[:3, 4:]],
+             [data[3:, :4], data[3:, 4:]]]
+    np.testing.assert_array_equal(assemble(tiles), data)
@@ -0,0 +1,258 @@
+"""
+Headless rendering of thumbnails (quicklooks) of large arrays.
+
+Drawing a ModestImage in a figure only to save a small PNG of it pays for
+creating, laying out and rendering the figure and axes. The functions here
+use the same resolution matching and reading as ModestImage (strided or
+block-reduced reads of just the pixels needed, and lookup-table
+colormapping), but produce the RGBA thumbnail directly, without a figure.
+``batch_render`` renders many files in a pool of processes::
+
+    python -m modest_image.thumbnails --output-dir quicklooks data/*.npy
+
+Run with ``--help`` for the available options.
+"""
+from __future__ import print_function, division
+
+import os
+import sys
+import copy
+import argparse
+import traceback
+from functools import partial
+from multiprocessing import Pool
+from timeit import default_timer
+
+import numpy as np
+import matplotlib.cm as cm
+import matplotlib.colors as mcolors
+import matplotlib.cbook as cbook
+import matplotlib.image as mi
+
+from .modest_image import matched_slices
+from .chunked import read_strided, reset_executor
+from .downsample import reduce_window, check_reduction
+from .autoscale import autoscale_limits, check_autoscale
+from .colormap import Colormapper
+
+DEFAULT_SIZE = 256
+
+_colormapper = Colormapper()
+
+
+def thumbnail_shape(shape, size=DEFAULT_SIZE):
+    """
+    The (height, width) of the largest thumbnail of an array of the given
+    shape which fits in ``size`` (an int, for a square box, or a
+    (width, height) tuple), keeping the aspect ratio of the array.
+    """
+    if np.ndim(size) == 0:
+        size = (size, size)
+    width, height = size
+    ny, nx = shape[:2]
+    scale = min(width / nx, height / ny)
+    return (max(1, min(height, int(round(ny * scale)))),
+            max(1, min(width, int(round(nx * scale)))))
+
+
+def _nearest(rgba, shape):
+    """Nearest-neighbour resampling of an image to ``shape``"""
+    rows = ((np.arange(shape[0]) + .5) * rgba.shape[0] / shape[0]).astype(int)
+    cols = ((np.arange(shape[1]) + .5) * rgba.shape[1] / shape[1]).astype(int)
+    return rgba.take(rows, axis=0).take(cols, axis=1)
+
+
+def render_thumbnail(data, size=DEFAULT_SIZE, cmap=None, norm=None,
+                     vmin=None, vmax=None, downsample=None,
+                     autoscale='sample', percentile=None, origin='upper'):
+    """
+    Render a thumbnail of an image array, as ModestImage would show it in
+    axes of that size.
+
+    :param data: 2D array (or 3D, with trailing RGB(A) channels). Anything
+                 ModestImage accepts, e.g. a memmap or dask array.
+    :param size: Size of the box the thumbnail fits in: an int for a square
+                 box, or a (width, height) tuple.
+    :param cmap: Colormap, or the name of one (the default colormap if None)
+    :param norm: Normalize instance (which is copied before autoscaling)
+    :param vmin, vmax: Color limits, if ``norm`` is not given. Limits left
+                       as None are estimated with ``autoscale`` and
+                       ``percentile``, as in ModestImage.
+    :param downsample: None to stride through the array, or a reduction
+                       ('mean', 'max', 'min', 'sum') to combine the pixels
+                       of each block.
+    :param origin: 'upper' to put the first row of the array at the top
+                   (like imshow), or 'lower'
+
+    :rtype: uint8 array of shape (height, width, 4)
+    """
+    check_reduction(downsample)
+    check_autoscale(autoscale)
+    shape = thumbnail_shape(data.shape, size)
+    ny, nx = data.shape[:2]
+    x0, x1, sx, y0, y1, sy = matched_slices((0, 0), (nx, ny),
+                                            shape[::-1], data.shape)
+    if downsample is None:
+        window = read_strided(data, x0, x1, sx, y0, y1, sy)
+    else:
+        window = reduce_window(data, x0, x1, sx, y0, y1, sy, downsample)
+
+    if window.ndim == 3:
+        rgba = cm.ScalarMappable().to_rgba(window, bytes=True)
+    else:
+        if norm is None:
+            norm = mcolors.Normalize(vmin, vmax)
+        else:
+            norm = copy.copy(norm)
+        if not norm.scaled():
+            lo, hi = autoscale_limits(data, autoscale, percentile)
+            if lo is not None:
+                norm.autoscale_None(np.array([lo, hi]))
+        if window.dtype.kind in 'fc':
+            window = cbook.safe_masked_invalid(window)
+        rgba = _colormapper(window, norm, cm.get_cmap(cmap))
+
+    rgba = _nearest(rgba, shape)
+    if origin == 'lower':
+        rgba = rgba[::-1]
+    return rgba
+
+
+def load_array(path):
+    """Open a .npy file as a read-only memmap (the default loader)"""
+    return np.load(path, mmap_mode='r')
+
+
+def save_thumbnail(path, data, **kwargs):
+    """
+    Render a thumbnail of ``data`` (see ``render_thumbnail`` for the
+    keywords), and save it as an image file, e.g. a PNG
+    """
+    rgba = render_thumbnail(data, **kwargs)
+    mi.imsave(path, rgba)
+    return rgba
+
+
+class BatchReport(object):
+
+    """
+    Outcome of a ``batch_render`` run.
+
+    :ivar rendered: (input, output) paths of the thumbnails saved
+    :ivar failed: (input path, error message) of the files which could not
+                  be rendered
+    :ivar elapsed: Wall-clock seconds taken
+    """
+
+    def __init__(self, rendered, failed, elapsed):
+        self.rendered = rendered
+        self.failed = failed
+        self.elapsed = elapsed
+
+    @property
+    def throughput(self):
+        """Thumbnails rendered per second"""
+        if self.elapsed <= 0:
+            return 0.
+        return len(self.rendered) / self.elapsed
+
+    def as_dict(self):
+        return dict(rendered=len(self.rendered), failed=len(self.failed),
+                    elapsed=self.elapsed, throughput=self.throughput)
+
+    def __str__(self):
+        return ('%i thumbnails in %.2f s (%.1f / s), %i failed' %
+                (len(self.rendered), self.elapsed, self.throughput,
+                 len(self.failed)))
+
+
+def output_path(path, output_dir, format='png'):
+    """Where the thumbnail of ``path`` is saved in ``output_dir``"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(output_dir, '%s.%s' % (name, format))
+
+
+def _render_file(path, output_dir, format, loader, kwargs):
+    """Render one file, in a worker process. Errors are returned."""
+    dest = output_path(path, output_dir, format)
+    try:
+        save_thumbnail(dest, loader(path), **kwargs)
+    except Exception:
+        return path, None, traceback.format_exc()
+    return path, dest, None
+
+
+def batch_render(paths, output_dir, processes=None, loader=load_array,
+                 format='png', **kwargs):
+    """
+    Render thumbnails of many files, each saved in ``output_dir`` under the
+    name of the file with the extension of ``format``.
+
+    :param processes: Number of worker processes (the number of CPUs by
+                      default). With 1, files are rendered in this process.
+    :param loader: Function opening a file as an array. It must be
+                   picklable (e.g. a module-level function) to be used by
+                   the worker processes. Opens .npy files as memmaps by
+                   default.
+
+    Other keywords are passed to ``render_thumbnail``. Files which cannot be
+    rendered are reported rather than stopping the batch.
+
+    :rtype: BatchReport
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    render = partial(_render_file, output_dir=output_dir, format=format,
+                     loader=loader, kwargs=kwargs)
+
+    t0 = default_timer()
+    if processes == 1:
+        results = [render(path) for path in paths]
+    else:
+        # Workers are forked from this process, but not the threads of its
+        # read pool
+        pool = Pool(processes, initializer=reset_executor)
+        try:
+            results = list(pool.imap_unordered(render, paths))
+        finally:
+            pool.close()
+            pool.join()
+    elapsed = default_timer() - t0
+
+    rendered = [(src, dest) for src, dest, _ in results if dest is not None]
+    failed = [(src, error) for src, dest, error in results if dest is None]
+    return BatchReport(rendered, failed, elapsed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render thumbnails of .npy image arrays")
+    parser.add_argument('paths', nargs='+', help=".npy files to render")
+    parser.add_argument('--output-dir', required=True)
+    parser.add_argument('--size', type=int, nargs='+', default=[DEFAULT_SIZE],
+                        help="size of the (square) box, or its width and "
+                             "height")
+    parser.add_argument('--cmap')
+    parser.add_argument('--vmin', type=float)
+    parser.add_argument('--vmax', type=float)
+    parser.add_argument('--percentile', type=float, nargs=2)
+    parser.add_argument('--downsample', choices=['mean', 'max', 'min', 'sum'])
+    parser.add_argument('--origin', choices=['upper', 'lower'],
+                        default='upper')
+    parser.add_argument('--processes', type=int)
+    args = parser.parse_args(argv)
+
+    size = args.size[0] if len(args.size) == 1 else tuple(args.size[:2])
+    report = batch_render(args.paths, args.output_dir,
+                          processes=args.processes, size=size,
+                          cmap=args.cmap, vmin=args.vmin, vmax=args.vmax,
+                          percentile=args.percentile,
+                          downsample=args.downsample, origin=args.origin)
+    for path, error in report.failed:
+        print('FAILED %s\n%s' % (path, error))
+    print(report)
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Caching of colormapped image tiles, so that panning only needs to compute
+the parts of the image which come into view.
+"""
+from __future__ import print_function, division
+
+from collections import OrderedDict
+from threading import RLock
+
+import numpy as np
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_CACHE_BYTES = 2 ** 27
+
+
+class LRUCache(object):
+
+    """
+    A dictionary-like cache of arrays, limited by total memory.
+
+    When the total ``nbytes`` of the cached values exceeds ``max_bytes``,
+    the least recently used entries are discarded. The cache can safely be
+    shared between threads.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self._lock = RLock()
+        self._data = OrderedDict()
+        self._sizes = {}
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value, nbytes=None):
+        """
+        Add an entry. The size of ``value`` is taken from its ``nbytes``
+        attribute, unless given.
+        """
+        if nbytes is None:
+            nbytes = value.nbytes
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = value
+            self._sizes[key] = nbytes
+            self.nbytes += nbytes
+            self._evict()
+
+    def _pop(self, key):
+        self.nbytes -= self._sizes.pop(key)
+        return self._data.pop(key)
+
+    def set_max_bytes(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        # always keep the most recent entry, even if it is over budget
+        while self.nbytes > self.max_bytes and len(self._data) > 1:
+            self._pop(next(iter(self._data)))
+
+    def discard(self, predicate):
+        """Remove all entries whose key satisfies ``predicate(key)``"""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+
+def tile_range(lo, hi, step, tile_size):
+    """
+    Indices of the tiles needed to cover pixels ``lo:hi`` of an axis sampled
+    every ``step`` pixels, where tile ``i`` holds samples ``i * tile_size``
+    to ``(i + 1) * tile_size`` on a grid anchored at pixel 0.
+    """
+    first = (lo // step) // tile_size
+    last = (-(-hi // step) - 1) // tile_size
+    return range(first, max(first, last) + 1)
+
+
+def tile_bounds(index, step, tile_size, size):
+    """Pixel range ``(lo, hi)`` along an axis of length ``size`` of a tile"""
+    return index * tile_size * step, min((index + 1) * tile_size * step, size)
+
+
+def tile_overlaps(key, y0, y1, x0, x1, shape):
+    """
+    Whether the tile with cache key ``key``, which starts with
+    ``(sx, sy, ty, tx, tile_size)``, overlaps the region ``[y0:y1, x0:x1]``
+    of an array of the given shape.
+    """
+    sx, sy, ty, tx, size = key[:5]
+    tx0, tx1 = tile_bounds(tx, sx, size, shape[1])
+    ty0, ty1 = tile_bounds(ty, sy, size, shape[0])
+    return tx0 < x1 and tx1 > x0 and ty0 < y1 and ty1 > y0
+
+
+def assemble(tiles):
+    """
+    Join a 2D (row-major) nested list of tile arrays into one array.
+    """
+    return np.concatenate([np.concatenate(row, axis=1) for row in tiles],
+                          axis=0)